@@ -0,0 +1,6 @@
+"""
+    Herramienta de línea de órdenes de BiblioGest (python -m bibliogest).
+    Da acceso a las operaciones por lotes de la capa de datos (importar, exportar, estadísticas,
+    vencidos, copias, mantenimiento, préstamos y devoluciones) sin cargar la interfaz gráfica:
+    no importa tkinter ni customtkinter, así que funciona en un servidor sin pantalla.
+"""
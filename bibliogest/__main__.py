@@ -0,0 +1,336 @@
+"""
+    python -m bibliogest <orden> ...
+    Se ejecuta desde la carpeta del proyecto, como main.py (la base de datos es ./biblioteca.db).
+    Solo importa la capa de datos (db/), nunca la interfaz gráfica.
+
+    Ejemplos:
+        python -m bibliogest import books libros.csv
+        python -m bibliogest export readers -o lectores.csv
+        python -m bibliogest overdue --by-reader
+        python -m bibliogest backup
+        python -m bibliogest maintenance --fines --archive
+        python -m bibliogest checkout prestamos.csv
+        python -m bibliogest return 9788437604947 9788420412146
+        python -m bibliogest sync-roster padron.csv --dry-run
+"""
+import argparse
+import csv
+import sys
+from contextlib import contextmanager
+
+from config import RETURN_BATCH_SIZE
+
+# Columnas de los CSV (cabecera obligatoria; el orden de las columnas da igual al importar)
+COLUMNAS_LIBROS = ("isbn", "titulo", "autor", "categoria", "disponible")
+COLUMNAS_LECTORES = ("nombre", "dni", "telefono", "prestamos_activos", "marcado_baja")
+COLUMNAS_PRESTAMOS = ("prestamo_id", "titulo", "nombre", "dni", "fecha_prestamo")
+COLUMNAS_VENCIDOS = ("prestamo_id", "titulo", "nombre", "dni", "fecha_prestamo", "fecha_vencimiento")
+
+# Códigos de salida
+OK = 0
+FALLOS = 1 # La orden terminó, pero alguna fila u operación falló
+ERROR_USO = 2 # Argumentos o archivo no válidos (el mismo código que usa argparse)
+
+
+def _numero(n):
+    """Entero con separador de miles."""
+    return f"{n:,}".replace(",", ".")
+
+@contextmanager
+def _abrir(ruta, modo):
+    """Abre un CSV ('-' es la entrada o la salida estándar)."""
+    if ruta == "-":
+        yield sys.stdin if modo == "r" else sys.stdout
+        return
+    # utf-8-sig: acepta los CSV guardados desde Excel (con BOM)
+    with open(ruta, modo, newline="", encoding="utf-8-sig" if modo == "r" else "utf-8") as archivo:
+        yield archivo
+
+def _leer_csv(ruta, obligatorias, opcionales=()):
+    """
+    Filas del CSV como tuplas con las columnas obligatorias y opcionales, en ese orden
+    (las opcionales que falten quedan vacías). Lanza ValueError si falta una obligatoria.
+    """
+    with _abrir(ruta, "r") as archivo:
+        lector = csv.DictReader(archivo)
+        faltan = [c for c in obligatorias if c not in (lector.fieldnames or ())]
+        if faltan:
+            raise ValueError(f"faltan las columnas {', '.join(faltan)} en la cabecera de {ruta}")
+        columnas = list(obligatorias) + list(opcionales)
+        return [tuple(fila.get(c) or "" for c in columnas) for fila in lector]
+
+def _escribir_csv(ruta, columnas, filas):
+    with _abrir(ruta, "w") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(columnas)
+        escritor.writerows(filas)
+
+
+# -------------------------------------------------------------
+# Órdenes
+# -------------------------------------------------------------
+
+def orden_import(args):
+    from db.database import importar_libros, importar_usuarios
+
+    if args.tipo == "books":
+        filas = _leer_csv(args.archivo, ("titulo", "autor"), ("isbn", "categoria"))
+        # importar_libros espera (titulo, autor, isbn, categoria)
+        resultado = importar_libros(filas)
+    else:
+        filas = _leer_csv(args.archivo, ("nombre", "dni"), ("telefono",))
+        resultado = importar_usuarios(filas)
+
+    if resultado is None:
+        return FALLOS
+    insertados, omitidos = resultado
+    print(f"Importados: {_numero(insertados)}. Omitidos (ya existían o incompletos): {_numero(omitidos)}.")
+    return OK
+
+def orden_export(args):
+    from db.database import obtener_todos_los_libros, obtener_todos_los_usuarios, obtener_prestamos_activos
+
+    if args.tipo == "books":
+        columnas = COLUMNAS_LIBROS
+        filas = [(isbn or "", titulo, autor, categoria, disponible)
+                 for isbn, titulo, autor, categoria, disponible, *_ in obtener_todos_los_libros()]
+    elif args.tipo == "readers":
+        columnas = COLUMNAS_LECTORES
+        filas = [(nombre, dni, telefono or "", activos, marcado)
+                 for _, nombre, dni, telefono, activos, _, marcado in obtener_todos_los_usuarios()]
+    else:
+        columnas = COLUMNAS_PRESTAMOS
+        filas = [fila[:5] for fila in obtener_prestamos_activos()]
+
+    _escribir_csv(args.salida, columnas, filas)
+    if args.salida != "-":
+        print(f"Exportadas {_numero(len(filas))} filas a {args.salida}.")
+    return OK
+
+def orden_stats(args):
+    from db.estadisticas import obtener_indicadores, obtener_top_libros, obtener_top_usuarios
+
+    indicadores = obtener_indicadores()
+    if not indicadores:
+        return FALLOS
+    etiquetas = {
+        "libros": "Libros en catálogo", "usuarios": "Lectores",
+        "prestamos_activos": "Préstamos activos", "vencidos": "Préstamos vencidos",
+        "prestamos_hoy": "Préstamos hoy", "devoluciones_hoy": "Devoluciones hoy",
+    }
+    for clave, etiqueta in etiquetas.items():
+        print(f"{etiqueta + ':':<22}{_numero(indicadores[clave]):>10}")
+
+    print("\nLibros más prestados:")
+    for _, titulo, autor, prestamos in obtener_top_libros(args.top):
+        print(f"  {prestamos:>6}  {titulo} ({autor})")
+    print("\nLectores con más préstamos:")
+    for _, nombre, dni, prestamos in obtener_top_usuarios(args.top):
+        print(f"  {prestamos:>6}  {nombre} ({dni})")
+    return OK
+
+def orden_overdue(args):
+    from db.vencimientos import obtener_prestamos_vencidos, obtener_vencidos_por_usuario
+
+    if args.by_reader:
+        filas = obtener_vencidos_por_usuario()
+        if args.csv:
+            _escribir_csv("-", ("nombre", "dni", "vencidos"), [fila[1:] for fila in filas])
+        else:
+            for _, nombre, dni, vencidos in filas:
+                print(f"{vencidos:>4}  {nombre} ({dni})")
+    else:
+        filas = obtener_prestamos_vencidos()
+        if args.csv:
+            _escribir_csv("-", COLUMNAS_VENCIDOS, [fila[:6] for fila in filas])
+        else:
+            for _, titulo, nombre, dni, _, vencimiento, _ in filas:
+                print(f"{vencimiento.isoformat()}  {titulo}  ->  {nombre} ({dni})")
+    if not args.csv:
+        print(f"Total: {_numero(len(filas))}")
+    return OK
+
+def orden_backup(args):
+    from db.copias import crear_copia, listar_copias
+
+    if args.list:
+        for ruta in listar_copias():
+            print(ruta)
+        return OK
+    try:
+        print(f"Copia creada: {crear_copia()}")
+        return OK
+    except Exception as e:
+        print(f"Error al crear la copia de seguridad: {e}", file=sys.stderr)
+        return FALLOS
+
+def orden_maintenance(args):
+    from db.mantenimiento import ejecutar_mantenimiento
+    from db.multas import calcular_multas
+    from db.archivo import archivar_prestamos_antiguos
+    from db.consistencia import reparar_disponibilidad
+
+    # Las tareas opcionales van antes: el mantenimiento deja la base ya optimizada y con checkpoint
+    resultado = OK
+    if args.repair:
+        corregidos = reparar_disponibilidad()
+        print(f"Disponibilidad corregida en {_numero(corregidos)} libros." if corregidos is not None
+              else "Error al reparar la disponibilidad.")
+        resultado = resultado if corregidos is not None else FALLOS
+    if args.fines:
+        multas = calcular_multas()
+        print(f"Multas calculadas: {_numero(multas)}." if multas is not None else "Error al calcular multas.")
+        resultado = resultado if multas is not None else FALLOS
+    if args.archive:
+        archivados = archivar_prestamos_antiguos()
+        print(f"Préstamos archivados: {_numero(archivados)}." if archivados is not None
+              else "Error al archivar préstamos.")
+        resultado = resultado if archivados is not None else FALLOS
+
+    # Incluye el VACUUM completo: se espera que la aplicación no esté en uso
+    ejecutadas = ejecutar_mantenimiento(args.budget, completo=True)
+    if not ejecutadas:
+        print("Mantenimiento: ninguna tarea pendiente.")
+    for tarea, estado in ejecutadas:
+        print(f"Mantenimiento: {tarea}: {estado}")
+        if estado.startswith("error"):
+            resultado = FALLOS
+    return resultado
+
+def orden_checkout(args):
+    from db.database import checkout
+
+    filas = _leer_csv(args.archivo, ("isbn", "dni"))
+    registrados = 0
+    for numero, (isbn, dni) in enumerate(filas, start=2): # La fila 1 es la cabecera
+        _, error = checkout(isbn.strip(), dni.strip())
+        if error:
+            print(f"Fila {numero}: {error}", file=sys.stderr)
+        else:
+            registrados += 1
+    print(f"Préstamos registrados: {_numero(registrados)} de {_numero(len(filas))}.")
+    return OK if registrados == len(filas) else FALLOS
+
+def orden_return(args):
+    from db.database import registrar_devoluciones_por_isbn
+
+    isbns = list(args.isbn)
+    if args.file:
+        with _abrir(args.file, "r") as archivo:
+            isbns += [linea.strip() for linea in archivo if linea.strip()]
+    if not isbns:
+        print("No se indicó ningún ISBN.", file=sys.stderr)
+        return ERROR_USO
+
+    # Lotes pequeños, como el escaneo de la interfaz: si la aplicación está abierta
+    # sobre la misma base, cada lote solo la bloquea un momento
+    devueltos, fallos = 0, 0
+    for inicio in range(0, len(isbns), RETURN_BATCH_SIZE):
+        resultado = registrar_devoluciones_por_isbn(isbns[inicio:inicio + RETURN_BATCH_SIZE])
+        if resultado is None:
+            fallos += len(isbns[inicio:inicio + RETURN_BATCH_SIZE])
+            continue
+        lote_devueltos, no_encontrados = resultado
+        devueltos += len(lote_devueltos)
+        fallos += len(no_encontrados)
+        for isbn in no_encontrados:
+            print(f"Sin préstamo abierto: {isbn}", file=sys.stderr)
+    print(f"Devoluciones registradas: {_numero(devueltos)} de {_numero(len(isbns))}.")
+    return OK if not fallos else FALLOS
+
+def orden_sync_roster(args):
+    from db.padron import sincronizar_padron
+
+    borrar_ausentes = not args.keep_missing
+    diferencias, resultado = sincronizar_padron(args.archivo, simular=args.dry_run, borrar_ausentes=borrar_ausentes)
+    if diferencias is None:
+        return FALLOS
+    print(diferencias.informe(borrar_ausentes=borrar_ausentes))
+    if args.dry_run:
+        print("\nSimulación: no se ha modificado nada.")
+        return OK
+    if not diferencias.hay_cambios():
+        print("\nLos lectores ya coinciden con el padrón.")
+        return OK
+    if resultado is None:
+        return FALLOS
+    print(f"\nInsertados: {_numero(resultado['insertados'])}. Actualizados: {_numero(resultado['actualizados'])}. "
+          f"Eliminados: {_numero(resultado['eliminados'])}. Marcados como baja: {_numero(resultado['marcados'])}.")
+    return OK
+
+
+# -------------------------------------------------------------
+# Argumentos
+# -------------------------------------------------------------
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m bibliogest",
+        description="BiblioGest - operaciones por lotes sin interfaz gráfica"
+    )
+    ordenes = parser.add_subparsers(dest="orden", required=True, metavar="orden")
+
+    p = ordenes.add_parser("import", help="Importa libros o lectores desde un CSV")
+    p.add_argument("tipo", choices=("books", "readers"))
+    p.add_argument("archivo", help="CSV con cabecera ('-' para la entrada estándar). "
+                                   "Libros: titulo,autor[,isbn,categoria]. Lectores: nombre,dni[,telefono]")
+    p.set_defaults(funcion=orden_import)
+
+    p = ordenes.add_parser("export", help="Exporta libros, lectores o préstamos activos a CSV")
+    p.add_argument("tipo", choices=("books", "readers", "loans"))
+    p.add_argument("-o", "--salida", default="-", help="Archivo de salida (por defecto, la salida estándar)")
+    p.set_defaults(funcion=orden_export)
+
+    p = ordenes.add_parser("stats", help="Muestra los indicadores y los más prestados")
+    p.add_argument("--top", type=int, default=10, help="Tamaño de las listas (por defecto, 10)")
+    p.set_defaults(funcion=orden_stats)
+
+    p = ordenes.add_parser("overdue", help="Lista los préstamos vencidos")
+    p.add_argument("--by-reader", action="store_true", help="Agrupa por lector")
+    p.add_argument("--csv", action="store_true", help="Salida en CSV")
+    p.set_defaults(funcion=orden_overdue)
+
+    p = ordenes.add_parser("backup", help="Crea una copia de seguridad comprimida (con rotación)")
+    p.add_argument("--list", action="store_true", help="Solo lista las copias existentes")
+    p.set_defaults(funcion=orden_backup)
+
+    p = ordenes.add_parser("maintenance", help="Ejecuta las tareas de mantenimiento pendientes")
+    p.add_argument("--budget", type=float, default=60.0,
+                   help="Tiempo máximo en segundos para las tareas (por defecto, 60)")
+    p.add_argument("--fines", action="store_true", help="Recalcula también las multas")
+    p.add_argument("--archive", action="store_true", help="Archiva también los préstamos antiguos")
+    p.add_argument("--repair", action="store_true", help="Corrige también la disponibilidad de los libros")
+    p.set_defaults(funcion=orden_maintenance)
+
+    p = ordenes.add_parser("checkout", help="Registra préstamos desde un CSV con columnas isbn,dni")
+    p.add_argument("archivo", help="CSV con cabecera ('-' para la entrada estándar)")
+    p.set_defaults(funcion=orden_checkout)
+
+    p = ordenes.add_parser("return", help="Registra devoluciones por ISBN")
+    p.add_argument("isbn", nargs="*", help="ISBN de los libros devueltos")
+    p.add_argument("-f", "--file", help="Archivo con un ISBN por línea ('-' para la entrada estándar)")
+    p.set_defaults(funcion=orden_return)
+
+    p = ordenes.add_parser("sync-roster", help="Sincroniza los lectores con el padrón de alumnos (CSV)")
+    p.add_argument("archivo", help="CSV con cabecera: nombre,dni[,telefono]")
+    p.add_argument("--dry-run", action="store_true", help="Solo muestra las diferencias, sin aplicarlas")
+    p.add_argument("--keep-missing", action="store_true",
+                   help="No elimina a los lectores que no están en el padrón (sin préstamos abiertos ni multas)")
+    p.set_defaults(funcion=orden_sync_roster)
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+
+    from db.database import inicializar_db
+    # Crea la base de datos o aplica las migraciones pendientes, como al abrir la aplicación
+    inicializar_db()
+    try:
+        return args.funcion(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return ERROR_USO
+
+
+if __name__ == "__main__":
+    sys.exit(main())
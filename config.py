@@ -18,4 +18,73 @@ DEFAULT_THEME = "dark" # "light" o "dark"
 DEFAULT_COLOR_THEME = "blue" # Colores de CTK
 
 # Mínimo de caracteres requerido para una contraseña
-MIN_PASSWORD_LENGTH = 6
\ No newline at end of file
+MIN_PASSWORD_LENGTH = 6
+
+# --- Devolución por escaneo ---
+# Los ISBN escaneados se acumulan y se confirman en lotes pequeños
+RETURN_BATCH_SIZE = 20 # Máximo de devoluciones por transacción
+RETURN_BATCH_DELAY_MS = 400 # Espera tras el último escaneo antes de confirmar el lote
+
+# --- Autocompletado ---
+AUTOCOMPLETE_LIMIT = 8 # Máximo de sugerencias mostradas por campo
+
+# --- Plazos de préstamo ---
+LOAN_PERIOD_DAYS = 14 # Plazo por defecto (días)
+# Plazos específicos por categoría (nombre en minúsculas -> días), p. ej. {"consulta": 3}
+LOAN_PERIODS_BY_CATEGORY = {}
+
+# --- Multas por retraso (importes en céntimos) ---
+FINE_PER_DAY_CENTS = 20 # Importe por cada día de retraso
+FINE_GRACE_DAYS = 2 # Días de retraso sin multa
+FINE_CAP_CENTS = 1000 # Importe máximo por préstamo
+
+# --- Panel de estadísticas ---
+DASHBOARD_CACHE_TTL_S = 300 # Segundos que se reutilizan los agregados ya calculados
+
+# --- Archivo de préstamos cerrados ---
+ARCHIVE_AFTER_DAYS = 365 # Los préstamos devueltos hace más de estos días se mueven al archivo
+ARCHIVE_PER_YEAR = False # True: un fichero de archivo por año de préstamo
+ARCHIVE_BATCH_SIZE = 500 # Préstamos movidos por transacción
+
+# --- Copias de seguridad ---
+BACKUP_PAGES_PER_STEP = 256 # Páginas copiadas por paso (la app puede escribir entre pasos)
+BACKUP_STEP_PAUSE_MS = 5 # Pausa entre pasos
+BACKUP_MAX_RESTARTS = 3 # Reinicios por escrituras concurrentes antes de copiar en un solo paso
+BACKUP_KEEP = 10 # Copias comprimidas que se conservan
+BACKUP_INTERVAL_HOURS = 24 # Antigüedad mínima de la última copia para lanzar otra en inactividad
+BACKUP_ON_EXIT = True # Copia al cerrar la aplicación
+
+# --- Inactividad ---
+IDLE_THRESHOLD_S = 300 # Segundos sin teclado ni ratón para considerar la app inactiva
+IDLE_CHECK_INTERVAL_MS = 60000 # Cada cuánto se comprueba la inactividad
+
+# --- Mantenimiento de la base de datos (en inactividad) ---
+MAINTENANCE_TASK_BUDGET_S = 2.0 # Tiempo máximo por tarea; al superarlo se interrumpe
+MAINTENANCE_RUN_BUDGET_S = 5.0 # Tiempo máximo de cada ronda de mantenimiento
+MAINTENANCE_LONG_TASK_BUDGET_S = 60.0 # Tareas que recorren toda la base (quick_check; VACUUM completo solo por CLI)
+VACUUM_MIN_FREE_RATIO = 0.2 # Fracción de páginas libres que justifica un VACUUM completo
+
+# --- Conciliación de disponibilidad ---
+RECONCILE_BATCH_SIZE = 500 # Libros corregidos por transacción
+
+# --- Catálogo ---
+FACET_MAX_AUTHORS = 30 # Autores (los más frecuentes) que se muestran en el panel de filtros
+
+# --- Búsqueda tolerante a erratas ---
+FUZZY_MAX_DISTANCE = 2 # Erratas admitidas por palabra (menos en palabras cortas)
+FUZZY_MIN_QUERY_LENGTH = 3 # Longitud mínima de la búsqueda para buscar con erratas
+FUZZY_BUDGET_MS = 50 # Tiempo máximo de cada búsqueda con erratas
+FUZZY_LIMIT = 200 # Máximo de resultados aproximados
+
+# --- Búsqueda global (Ctrl+K) ---
+PALETTE_LIMIT = 20 # Resultados que muestra la paleta
+PALETTE_MAX_SCANNED = 2000 # Entradas del índice revisadas por consulta (acota el tiempo de respuesta)
+PALETTE_REFRESH_MS = 100 # Cada cuánto se repite la búsqueda mientras el índice sigue cargando
+
+# --- Relleno progresivo de tablas ---
+RENDER_CHUNK_BUDGET_MS = 12 # Tiempo máximo de cada tanda de filas insertadas (menos de un fotograma)
+RENDER_CHUNK_PAUSE_MS = 1 # Pausa entre tandas; con after(0) Tk no llegaría a redibujar entre ellas
+
+# --- Sincronización del padrón de lectores ---
+ROSTER_BATCH_SIZE = 500 # Lectores escritos por transacción (la interfaz espera como mucho un lote)
+ROSTER_REPORT_LIMIT = 20 # Lectores que se listan por apartado en el informe de la sincronización
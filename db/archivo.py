@@ -0,0 +1,171 @@
+"""
+    Archivo histórico de préstamos cerrados.
+    Los préstamos devueltos antes de una fecha de corte se mueven de 'prestamos' a una base de datos
+    aparte (adjuntada con ATTACH), de modo que biblioteca.db solo conserva los préstamos abiertos
+    y los recientes: se mantiene pequeña, cabe en caché y se copia rápido.
+    Las consultas de historial pueden incluir el archivo a petición (ver adjuntar_archivos).
+"""
+import os
+import glob
+import sqlite3
+import datetime
+from utils.path_utils import DATABASE_PATH
+from db.fechas import a_dia, migrar_prestamos_a_dias, DIA_JULIANO_EPOCA
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_PER_YEAR, ARCHIVE_BATCH_SIZE
+
+# Carpeta de los ficheros de archivo, junto a la base de datos
+ARCHIVO_DIR = os.path.join(os.path.dirname(DATABASE_PATH), "archivo")
+
+# SQLite admite 10 bases adjuntas por conexión (SQLITE_MAX_ATTACHED); se deja margen
+MAX_ARCHIVOS_ADJUNTOS = 8
+
+# Mismas columnas que 'prestamos' en biblioteca.db, sin claves foráneas (libros y usuarios viven en main)
+ESQUEMA_ARCHIVO = """
+CREATE TABLE IF NOT EXISTS {esquema}.prestamos (
+    id INTEGER PRIMARY KEY,
+    usuario_id INTEGER,
+    libro_id INTEGER,
+    dia_prestamo INTEGER,
+    dia_devolucion INTEGER,
+    dia_vencimiento INTEGER,
+    fecha_prestamo TEXT GENERATED ALWAYS AS (date(2440587.5 + dia_prestamo)) VIRTUAL,
+    fecha_devolucion TEXT GENERATED ALWAYS AS (date(2440587.5 + dia_devolucion)) VIRTUAL,
+    fecha_vencimiento TEXT GENERATED ALWAYS AS (date(2440587.5 + dia_vencimiento)) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS {esquema}.idx_prestamos_usuario_fecha ON prestamos(usuario_id, dia_prestamo);
+CREATE INDEX IF NOT EXISTS {esquema}.idx_prestamos_libro_fecha ON prestamos(libro_id, dia_prestamo);
+"""
+
+# Columnas almacenadas (las fecha_* son generadas y no se copian)
+COLUMNAS_PRESTAMO = "id, usuario_id, libro_id, dia_prestamo, dia_devolucion, dia_vencimiento"
+
+def ruta_archivo(anio=None):
+    """Ruta del fichero de archivo: uno único o uno por año de préstamo."""
+    nombre = f"prestamos_{anio}.db" if anio else "prestamos.db"
+    return os.path.join(ARCHIVO_DIR, nombre)
+
+def archivos_existentes():
+    """Ficheros de archivo presentes en disco, del más reciente al más antiguo."""
+    return sorted(glob.glob(os.path.join(ARCHIVO_DIR, "prestamos*.db")), reverse=True)
+
+def adjuntar_archivos(conn):
+    """
+    Adjunta a la conexión los ficheros de archivo existentes como 'archivo0', 'archivo1', ...
+    Retorna la lista de nombres de esquema adjuntados (vacía si aún no se ha archivado nada).
+    """
+    archivos = archivos_existentes()
+    if len(archivos) > MAX_ARCHIVOS_ADJUNTOS:
+        print(f"Aviso: solo se consultan los {MAX_ARCHIVOS_ADJUNTOS} archivos de préstamos más recientes.")
+    esquemas = []
+    for i, ruta in enumerate(archivos[:MAX_ARCHIVOS_ADJUNTOS]):
+        esquema = f"archivo{i}"
+        conn.execute(f"ATTACH DATABASE ? AS {esquema}", (ruta,))
+        esquemas.append(esquema)
+    return esquemas
+
+def archivar_prestamos(antes_de, por_anio=ARCHIVE_PER_YEAR, lote=ARCHIVE_BATCH_SIZE):
+    """
+    Mueve al archivo los préstamos devueltos antes de la fecha 'antes_de' (datetime.date).
+    Cada lote de 'lote' préstamos se copia y se borra de biblioteca.db en su propia transacción,
+    así la interfaz nunca espera más que un lote.
+    Retorna el número de préstamos archivados, o None si hubo un error.
+    Las multas y los contadores de estadísticas no se tocan: siguen contando el historial completo.
+    """
+    corte = a_dia(antes_de)
+    conn = None
+    try:
+        os.makedirs(ARCHIVO_DIR, exist_ok=True)
+        # Usa la ruta dinámica para la conexión; autocommit para controlar cada transacción
+        conn = sqlite3.connect(DATABASE_PATH, isolation_level=None, timeout=10)
+        cursor = conn.cursor()
+
+        if por_anio:
+            cursor.execute(
+                f"SELECT DISTINCT strftime('%Y', {DIA_JULIANO_EPOCA} + dia_prestamo) FROM prestamos "
+                "WHERE dia_devolucion IS NOT NULL AND dia_devolucion < ?",
+                (corte,)
+            )
+            anios = [fila[0] for fila in cursor.fetchall()]
+        else:
+            anios = [None]
+
+        total = 0
+        for anio in anios:
+            # ATTACH no se permite dentro de una transacción: se adjunta un fichero cada vez
+            cursor.execute("ATTACH DATABASE ? AS destino", (ruta_archivo(anio),))
+            try:
+                cursor.executescript(ESQUEMA_ARCHIVO.format(esquema="destino"))
+                total += _mover_lotes(cursor, corte, anio, lote)
+            finally:
+                cursor.execute("DETACH DATABASE destino")
+        return total
+    except Exception as e:
+        print(f"Error al archivar préstamos: {e}")
+        if conn and conn.in_transaction:
+            conn.rollback()
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def _mover_lotes(cursor, corte, anio, lote):
+    """Copia y borra por lotes, avanzando por id (sin volver a recorrer lo ya archivado)."""
+    filtro_anio = ""
+    parametros = {"corte": corte, "lote": lote, "ultimo": 0}
+    if anio:
+        filtro_anio = "AND dia_prestamo >= :desde AND dia_prestamo < :hasta"
+        parametros["desde"] = a_dia(datetime.date(int(anio), 1, 1))
+        parametros["hasta"] = a_dia(datetime.date(int(anio) + 1, 1, 1))
+
+    movidos = 0
+    while True:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            f"""
+            SELECT id FROM prestamos
+            WHERE id > :ultimo AND dia_devolucion IS NOT NULL AND dia_devolucion < :corte {filtro_anio}
+            ORDER BY id
+            LIMIT :lote
+            """,
+            parametros
+        )
+        ids = [fila[0] for fila in cursor.fetchall()]
+        if not ids:
+            cursor.execute("COMMIT")
+            return movidos
+
+        marcadores = ",".join("?" * len(ids))
+        # OR REPLACE: si un lote anterior quedó copiado pero no borrado (caída), se repite sin duplicar
+        cursor.execute(
+            f"INSERT OR REPLACE INTO destino.prestamos ({COLUMNAS_PRESTAMO}) "
+            f"SELECT {COLUMNAS_PRESTAMO} FROM main.prestamos WHERE id IN ({marcadores})",
+            ids
+        )
+        cursor.execute(f"DELETE FROM main.prestamos WHERE id IN ({marcadores})", ids)
+        cursor.execute("COMMIT")
+
+        movidos += len(ids)
+        parametros["ultimo"] = ids[-1]
+
+def archivar_prestamos_antiguos():
+    """Archiva los préstamos devueltos hace más de ARCHIVE_AFTER_DAYS días."""
+    return archivar_prestamos(datetime.date.today() - datetime.timedelta(days=ARCHIVE_AFTER_DAYS))
+
+def migrar_archivos():
+    """
+    Convierte a números de día las fechas de los ficheros de archivo creados con fechas en texto.
+    Se llama desde inicializar_db(); los ficheros ya convertidos no se tocan.
+    """
+    for ruta in archivos_existentes():
+        conn = None
+        try:
+            conn = sqlite3.connect(ruta)
+            if migrar_prestamos_a_dias(conn.cursor()):
+                conn.commit()
+        except Exception as e:
+            print(f"Error al migrar el archivo {ruta}: {e}")
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                conn.close()
@@ -0,0 +1,247 @@
+"""
+    Índice de búsqueda global (paleta Ctrl+K).
+    Reúne en una sola lista ordenada las palabras normalizadas de libros (título, autor, ISBN),
+    lectores (nombre, DNI) y préstamos abiertos, además de las acciones de la aplicación.
+    Cada consulta es una búsqueda binaria del rango de la palabra más larga y una comprobación
+    de las demás palabras sobre un número acotado de candidatos, para responder en menos de
+    un fotograma aunque el índice tenga cientos de miles de entradas.
+    El índice se carga por secciones en un hilo propio (se puede buscar en cuanto termina cada una)
+    y se mantiene al día con los eventos de db/eventos.py, releyendo solo los registros cambiados.
+"""
+import queue
+import sqlite3
+from bisect import bisect_left, insort
+from threading import Thread, Lock
+from utils.path_utils import DATABASE_PATH
+from utils.normalizacion import normalizar
+from db import eventos
+from config import PALETTE_MAX_SCANNED
+
+# Tipos de resultado, en el orden en que se muestran a igualdad de coincidencia
+ACCION = "accion"
+LIBRO = "libro"
+USUARIO = "usuario"
+PRESTAMO = "prestamo"
+_ORDEN_TIPOS = {ACCION: 0, LIBRO: 1, USUARIO: 2, PRESTAMO: 3}
+
+# Secciones que se cargan desde la base de datos, en este orden
+SECCIONES = (LIBRO, USUARIO, PRESTAMO)
+
+# Acciones fijas: (id, etiqueta)
+ACCIONES = (
+    ("vista:Biblioteca", "Ir a Biblioteca"),
+    ("vista:Usuarios", "Ir a Usuarios"),
+    ("vista:Historial", "Ir a Historial de préstamos"),
+    ("vista:Vencidos", "Ir a Vencidos"),
+    ("vista:Estadísticas", "Ir a Estadísticas"),
+    ("nuevo:libro", "Nuevo libro"),
+    ("nuevo:usuario", "Nuevo lector"),
+)
+
+# Carácter mayor que cualquier otro usado en las claves: cierra el rango del prefijo
+_FIN_RANGO = "\U0010ffff"
+
+_CONSULTA_LIBROS = """
+    SELECT l.id, l.titulo, a.nombre, l.isbn, l.titulo_norm, a.nombre_norm
+    FROM libros l LEFT JOIN autores a ON a.id = l.autor_id
+"""
+_CONSULTA_USUARIOS = "SELECT id, nombre, dni, nombre_norm FROM usuarios"
+_CONSULTA_PRESTAMOS = """
+    SELECT p.id, l.titulo, u.nombre, u.dni, l.titulo_norm, u.nombre_norm
+    FROM prestamos p
+    JOIN libros l ON l.id = p.libro_id
+    JOIN usuarios u ON u.id = p.usuario_id
+    WHERE p.dia_devolucion IS NULL
+"""
+
+
+def _leer(consulta, condicion="", parametros=()):
+    """Ejecuta una de las consultas del índice, con una condición opcional."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        if condicion:
+            enlace = " AND " if "WHERE" in consulta else " WHERE "
+            consulta = consulta + enlace + condicion
+        cursor.execute(consulta, parametros)
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al leer datos para la búsqueda global: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def _registro_libro(fila):
+    """(id, etiqueta, texto normalizado) de un libro."""
+    libro_id, titulo, autor, isbn, titulo_norm, autor_norm = fila
+    return libro_id, f"{titulo} — {autor or ''} ({isbn})", f"{titulo_norm or ''} {autor_norm or ''} {normalizar(isbn)}"
+
+def _registro_usuario(fila):
+    """(id, etiqueta, texto normalizado) de un lector."""
+    usuario_id, nombre, dni, nombre_norm = fila
+    return usuario_id, f"{nombre} ({dni})", f"{nombre_norm or ''} {normalizar(dni)}"
+
+def _registro_prestamo(fila):
+    """(id, etiqueta, texto normalizado) de un préstamo abierto."""
+    prestamo_id, titulo, nombre, dni, titulo_norm, nombre_norm = fila
+    return (prestamo_id, f"Préstamo #{prestamo_id}: {titulo} — {nombre} ({dni})",
+            f"{titulo_norm or ''} {nombre_norm or ''} {normalizar(dni)} {prestamo_id}")
+
+_REGISTROS = {
+    LIBRO: (_CONSULTA_LIBROS, "l.id", _registro_libro),
+    USUARIO: (_CONSULTA_USUARIOS, "id", _registro_usuario),
+    PRESTAMO: (_CONSULTA_PRESTAMOS, "p.id", _registro_prestamo),
+}
+
+
+class IndiceGlobal:
+    """
+    Lista ordenada de (palabra, orden del tipo, id) con las etiquetas de cada registro.
+    Todas las escrituras las hace el hilo del índice; buscar() se puede llamar desde el hilo de Tk.
+    """
+    def __init__(self):
+        self._entradas = [] # (palabra, orden_tipo, tipo, id), ordenadas
+        self._registros = {} # (tipo, id) -> (etiqueta, palabras)
+        self._lock = Lock()
+        self._pendientes = queue.Queue() # Eventos por aplicar; None detiene el hilo
+        self.listos = set() # Secciones ya cargadas (buscables)
+        self._hilo = None
+        for accion_id, etiqueta in ACCIONES:
+            self._poner(ACCION, accion_id, etiqueta, normalizar(etiqueta))
+
+    @property
+    def completo(self):
+        """Indica si ya se cargaron todas las secciones."""
+        return self.listos.issuperset(SECCIONES)
+
+    def iniciar(self):
+        """Se suscribe a los eventos de datos y carga las secciones en segundo plano."""
+        if self._hilo is not None:
+            return
+        for tema in SECCIONES:
+            eventos.suscribir(tema, self._encolar)
+        self._hilo = Thread(target=self._trabajar, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Cancela las suscripciones y termina el hilo del índice."""
+        for tema in SECCIONES:
+            eventos.cancelar_suscripcion(tema, self._encolar)
+        self._pendientes.put(None)
+
+    def _encolar(self, tema, accion, id_):
+        """Suscriptor de eventos: solo encola (se llama desde el hilo que escribió)."""
+        self._pendientes.put((tema, accion, id_))
+
+    def _trabajar(self):
+        """Carga cada sección y después aplica los eventos según llegan."""
+        for tipo in SECCIONES:
+            consulta, _, registro = _REGISTROS[tipo]
+            self._cargar(tipo, (registro(fila) for fila in _leer(consulta)))
+            self.listos.add(tipo)
+        while True:
+            evento = self._pendientes.get()
+            if evento is None:
+                return
+            try:
+                self._aplicar(*evento)
+            except Exception as e:
+                print(f"Error al actualizar la búsqueda global: {e}")
+
+    def _aplicar(self, tema, accion, id_):
+        """Relee el registro cambiado (y los préstamos que muestran sus datos)."""
+        self._releer(tema, id_, accion == eventos.BAJA)
+        if tema == LIBRO and accion == eventos.CAMBIO:
+            for fila in _leer(_CONSULTA_PRESTAMOS, "p.libro_id = ?", (id_,)):
+                self._poner(PRESTAMO, *_registro_prestamo(fila))
+        elif tema == USUARIO and accion == eventos.CAMBIO:
+            for fila in _leer(_CONSULTA_PRESTAMOS, "p.usuario_id = ?", (id_,)):
+                self._poner(PRESTAMO, *_registro_prestamo(fila))
+
+    def _releer(self, tipo, id_, eliminado):
+        """Actualiza o quita un registro (un préstamo devuelto deja de estar en la consulta)."""
+        filas = [] if eliminado else _leer(_REGISTROS[tipo][0], f"{_REGISTROS[tipo][1]} = ?", (id_,))
+        if filas:
+            self._poner(tipo, *_REGISTROS[tipo][2](filas[0]))
+        else:
+            self._quitar(tipo, id_)
+
+    def _cargar(self, tipo, registros):
+        """
+        Añade una sección completa: ordena una copia fuera del lock y la sustituye de una vez
+        (insertar uno a uno en la lista ordenada sería cuadrático).
+        """
+        orden = _ORDEN_TIPOS[tipo]
+        nuevos = {}
+        entradas = []
+        for id_, etiqueta, texto in registros:
+            palabras = tuple(dict.fromkeys(texto.split()))
+            nuevos[(tipo, id_)] = (etiqueta, palabras)
+            entradas.extend((palabra, orden, tipo, id_) for palabra in palabras)
+        # Solo este hilo escribe en el índice: la copia no puede quedar desfasada
+        entradas.extend(self._entradas)
+        entradas.sort()
+        with self._lock:
+            self._entradas = entradas
+            self._registros.update(nuevos)
+
+    def _poner(self, tipo, id_, etiqueta, texto):
+        """Añade o sustituye un registro."""
+        palabras = tuple(dict.fromkeys(texto.split()))
+        orden = _ORDEN_TIPOS[tipo]
+        with self._lock:
+            self._quitar_entradas(tipo, id_)
+            self._registros[(tipo, id_)] = (etiqueta, palabras)
+            for palabra in palabras:
+                insort(self._entradas, (palabra, orden, tipo, id_))
+
+    def _quitar(self, tipo, id_):
+        """Quita un registro del índice."""
+        with self._lock:
+            self._quitar_entradas(tipo, id_)
+
+    def _quitar_entradas(self, tipo, id_):
+        """Quita las entradas de un registro (con el lock tomado)."""
+        anterior = self._registros.pop((tipo, id_), None)
+        if anterior is None:
+            return
+        orden = _ORDEN_TIPOS[tipo]
+        for palabra in anterior[1]:
+            clave = (palabra, orden, tipo, id_)
+            posicion = bisect_left(self._entradas, clave)
+            if posicion < len(self._entradas) and self._entradas[posicion] == clave:
+                del self._entradas[posicion]
+
+    def buscar(self, texto, limite=20):
+        """
+        Registros cuyas palabras empiezan por todas las palabras de la consulta.
+        Retorna [(tipo, id, etiqueta)]: primero los que tienen alguna palabra exacta,
+        después por tipo (acciones, libros, lectores, préstamos) y por etiqueta.
+        """
+        consulta = normalizar(texto).split()
+        if not consulta:
+            return []
+        # La palabra más larga acota más el rango que hay que recorrer
+        clave = max(consulta, key=len)
+        otras = list(consulta)
+        otras.remove(clave)
+        encontrados = []
+        vistos = set()
+        with self._lock:
+            inicio = bisect_left(self._entradas, (clave,))
+            fin = min(bisect_left(self._entradas, (clave + _FIN_RANGO,), inicio), inicio + PALETTE_MAX_SCANNED)
+            # El rango empieza por la palabra exacta: basta con los primeros 'limite' registros que cumplan
+            for palabra, orden, tipo, id_ in self._entradas[inicio:fin]:
+                if (tipo, id_) in vistos:
+                    continue
+                vistos.add((tipo, id_))
+                etiqueta, palabras = self._registros[(tipo, id_)]
+                if all(any(p.startswith(o) for p in palabras) for o in otras):
+                    encontrados.append((palabra != clave, orden, etiqueta.casefold(), tipo, id_, etiqueta))
+                    if len(encontrados) >= limite:
+                        break
+        encontrados.sort()
+        return [(tipo, id_, etiqueta) for _, _, _, tipo, id_, etiqueta in encontrados]
@@ -0,0 +1,135 @@
+"""
+    Conciliación de libros.disponible con los préstamos abiertos.
+    'disponible' es un dato duplicado: debe valer 1 si y solo si el libro no tiene ningún préstamo
+    sin fecha de devolución. Aquí se detectan las discrepancias con una sola consulta sobre el índice
+    parcial de préstamos abiertos y se reparan por lotes.
+"""
+import sqlite3
+from utils.path_utils import DATABASE_PATH
+from config import RECONCILE_BATCH_SIZE
+
+# Libros cuyo indicador no coincide con sus préstamos abiertos.
+# Solo se agregan los préstamos abiertos (índice parcial), no todo el historial.
+_DISCREPANCIAS_SQL = """
+SELECT l.id, l.titulo, l.disponible, COALESCE(a.abiertos, 0)
+FROM libros l
+LEFT JOIN (
+    SELECT libro_id, COUNT(*) AS abiertos
+    FROM prestamos INDEXED BY idx_prestamos_libro_abiertos
+    WHERE dia_devolucion IS NULL
+    GROUP BY libro_id
+) a ON a.libro_id = l.id
+WHERE l.disponible IS NOT (COALESCE(a.abiertos, 0) = 0)
+ORDER BY l.id
+"""
+
+# Libros con más de un préstamo abierto (no se reparan solos: hay que devolver uno de ellos)
+_DUPLICADOS_SQL = """
+SELECT libro_id, COUNT(*), GROUP_CONCAT(id)
+FROM prestamos INDEXED BY idx_prestamos_libro_abiertos
+WHERE dia_devolucion IS NULL
+GROUP BY libro_id
+HAVING COUNT(*) > 1
+"""
+
+# Recalcula el indicador de un lote; la condición final evita tocar libros que ya cuadran
+# (por ejemplo, si alguien prestó o devolvió el libro entre la detección y la reparación).
+_REPARAR_SQL = """
+UPDATE libros
+SET disponible = NOT EXISTS (
+    SELECT 1 FROM prestamos p WHERE p.libro_id = libros.id AND p.dia_devolucion IS NULL
+)
+WHERE id IN ({marcadores})
+  AND disponible IS NOT (NOT EXISTS (
+    SELECT 1 FROM prestamos p WHERE p.libro_id = libros.id AND p.dia_devolucion IS NULL
+  ))
+"""
+
+def detectar_inconsistencias():
+    """
+    Retorna (discrepancias, duplicados):
+      discrepancias: [(libro_id, titulo, disponible, prestamos_abiertos)]
+      duplicados: [(libro_id, prestamos_abiertos, 'id1,id2,...')]
+    o None si hubo un error.
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute(_DISCREPANCIAS_SQL)
+        discrepancias = cursor.fetchall()
+        cursor.execute(_DUPLICADOS_SQL)
+        return discrepancias, cursor.fetchall()
+    except Exception as e:
+        print(f"Error al comprobar la disponibilidad de los libros: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def reparar_disponibilidad(lote=RECONCILE_BATCH_SIZE, conn=None):
+    """
+    Corrige libros.disponible en los libros con discrepancias, 'lote' libros por transacción.
+    Acepta una conexión en modo autocommit (la del mantenimiento); si no, abre una propia.
+    Retorna el número de libros corregidos, o None si hubo un error.
+    """
+    propia = conn is None
+    try:
+        if propia:
+            # Usa la ruta dinámica para la conexión; autocommit para controlar cada lote
+            conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+        cursor = conn.cursor()
+        cursor.execute(_DISCREPANCIAS_SQL)
+        ids = [fila[0] for fila in cursor.fetchall()]
+
+        corregidos = 0
+        for inicio in range(0, len(ids), lote):
+            ids_lote = ids[inicio:inicio + lote]
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(_REPARAR_SQL.format(marcadores=",".join("?" * len(ids_lote))), ids_lote)
+            corregidos += cursor.rowcount
+            cursor.execute("COMMIT")
+        return corregidos
+    except Exception as e:
+        print(f"Error al reparar la disponibilidad de los libros: {e}")
+        if conn and conn.in_transaction:
+            conn.rollback()
+        if not propia:
+            raise
+        return None
+    finally:
+        if propia and conn:
+            conn.close()
+
+def asegurar_indice_unico(cursor):
+    """
+    Crea el índice parcial de préstamos abiertos como UNIQUE (como máximo un préstamo abierto
+    por libro), o convierte el de bases anteriores, que no lo era. Si ya hay libros con varios
+    préstamos abiertos no se puede: se avisa y se deja el índice normal hasta que se resuelvan.
+    Se llama desde inicializar_db().
+    """
+    cursor.execute("PRAGMA index_list(prestamos)")
+    unico = {fila[1]: fila[2] for fila in cursor.fetchall()}.get("idx_prestamos_libro_abiertos")
+    if unico:
+        return True
+    if unico is None:
+        # Primero el índice normal: la búsqueda de duplicados lo usa y, si los hay, se queda este
+        cursor.execute(
+            "CREATE INDEX idx_prestamos_libro_abiertos "
+            "ON prestamos(libro_id) WHERE dia_devolucion IS NULL"
+        )
+
+    cursor.execute(_DUPLICADOS_SQL)
+    duplicados = cursor.fetchall()
+    if duplicados:
+        print(f"Aviso: {len(duplicados)} libro(s) con varios préstamos abiertos; "
+              f"no se puede crear el índice único (préstamos: {'; '.join(d[2] for d in duplicados[:10])}).")
+        return False
+
+    cursor.execute("DROP INDEX idx_prestamos_libro_abiertos")
+    cursor.execute(
+        "CREATE UNIQUE INDEX idx_prestamos_libro_abiertos "
+        "ON prestamos(libro_id) WHERE dia_devolucion IS NULL"
+    )
+    return True
@@ -0,0 +1,124 @@
+"""
+    Copias de seguridad en caliente de la base de datos.
+    Usa la API de backup de SQLite (Connection.backup) copiando unas pocas páginas por paso
+    con pausas entre pasos, de modo que la aplicación puede seguir leyendo y escribiendo.
+    Cada copia se verifica (PRAGMA integrity_check), se comprime con gzip y se rota.
+"""
+import os
+import glob
+import gzip
+import time
+import shutil
+import sqlite3
+import datetime
+
+from utils.path_utils import DATABASE_PATH
+from utils.tareas import TrabajoUnico
+from config import BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE_MS, BACKUP_KEEP, BACKUP_MAX_RESTARTS
+
+# Carpeta de las copias, junto a la base de datos
+COPIAS_DIR = os.path.join(os.path.dirname(DATABASE_PATH), "copias")
+
+
+def crear_copia(paginas=BACKUP_PAGES_PER_STEP, pausa_ms=BACKUP_STEP_PAUSE_MS):
+    """
+    Copia biblioteca.db en COPIAS_DIR como 'biblioteca_AAAAMMDD-HHMMSS.db.gz'.
+    Retorna la ruta de la copia comprimida. Lanza una excepción si la copia falla
+    o no supera la comprobación de integridad (en ese caso no se conserva nada).
+    """
+    os.makedirs(COPIAS_DIR, exist_ok=True)
+    nombre = f"biblioteca_{datetime.datetime.now():%Y%m%d-%H%M%S}.db"
+    temporal = os.path.join(COPIAS_DIR, nombre + ".tmp")
+    destino = os.path.join(COPIAS_DIR, nombre + ".gz")
+
+    try:
+        # 1. Copia por pasos: entre paso y paso se libera el bloqueo de lectura
+        try:
+            _copiar(temporal, paginas, pausa_ms)
+        except _DemasiadosReinicios:
+            # Con escrituras continuas la copia por pasos no termina nunca: se hace en un solo paso.
+            # En modo WAL esa lectura es una instantánea y no bloquea a quien escribe.
+            os.remove(temporal)
+            _copiar(temporal, -1, 0)
+
+        # 2. Verificación de la copia antes de darla por buena
+        copia = sqlite3.connect(temporal)
+        try:
+            resultado = copia.execute("PRAGMA integrity_check").fetchone()[0]
+            # Deja la copia en un único fichero (sin -wal/-shm) antes de comprimirla
+            copia.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            copia.close()
+        if resultado != "ok":
+            raise sqlite3.DatabaseError(f"La copia no supera integrity_check: {resultado}")
+
+        # 3. Compresión
+        with open(temporal, "rb") as entrada, gzip.open(destino, "wb") as salida:
+            shutil.copyfileobj(entrada, salida)
+    except Exception:
+        if os.path.exists(destino):
+            os.remove(destino)
+        raise
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    rotar_copias()
+    return destino
+
+class _DemasiadosReinicios(Exception):
+    """La copia por pasos se ha reiniciado demasiadas veces por escrituras concurrentes."""
+
+def _copiar(destino, paginas, pausa_ms):
+    """
+    Copia la base de datos con Connection.backup, 'paginas' por paso y 'pausa_ms' entre pasos.
+    SQLite reinicia la copia si otra conexión escribe entre dos pasos; se detectan los reinicios
+    (las páginas restantes vuelven a subir) y se aborta tras BACKUP_MAX_RESTARTS.
+    """
+    estado = {"restantes": None, "reinicios": 0}
+
+    def progreso(status, restantes, total):
+        if estado["restantes"] is not None and restantes > estado["restantes"]:
+            estado["reinicios"] += 1
+            if estado["reinicios"] > BACKUP_MAX_RESTARTS:
+                raise _DemasiadosReinicios()
+        estado["restantes"] = restantes
+        time.sleep(pausa_ms / 1000)
+
+    origen = sqlite3.connect(DATABASE_PATH)
+    copia = sqlite3.connect(destino)
+    try:
+        origen.backup(copia, pages=paginas, progress=progreso)
+    finally:
+        copia.close()
+        origen.close()
+
+def listar_copias():
+    """Copias existentes, de la más reciente a la más antigua."""
+    return sorted(glob.glob(os.path.join(COPIAS_DIR, "biblioteca_*.db.gz")), reverse=True)
+
+def rotar_copias(conservar=BACKUP_KEEP):
+    """Elimina las copias más antiguas dejando solo las 'conservar' más recientes."""
+    for ruta in listar_copias()[conservar:]:
+        try:
+            os.remove(ruta)
+        except OSError as e:
+            print(f"Error al eliminar la copia {ruta}: {e}")
+
+def fecha_ultima_copia():
+    """Fecha y hora de la última copia, o None si no hay ninguna."""
+    copias = listar_copias()
+    if not copias:
+        return None
+    return datetime.datetime.fromtimestamp(os.path.getmtime(copias[0]))
+
+
+class ServicioCopias(TrabajoUnico):
+    """Lanza copias en un hilo en segundo plano, sin solapar dos copias a la vez."""
+    def __init__(self):
+        super().__init__(crear_copia, "copia de seguridad")
+
+    def copia_pendiente(self, intervalo_horas):
+        """True si no hay copias o la última tiene más de 'intervalo_horas'."""
+        ultima = fecha_ultima_copia()
+        return ultima is None or datetime.datetime.now() - ultima >= datetime.timedelta(hours=intervalo_horas)
@@ -7,6 +7,17 @@ import hashlib
 import datetime
 # Importamos la ruta dinámica que resuelve PyInstaller o entorno de desarrollo
 from utils.path_utils import DATABASE_PATH 
+from config import LOAN_PERIOD_DAYS, LOAN_PERIODS_BY_CATEGORY
+from db.multas import cerrar_multa
+from db.estadisticas import crear_estadisticas
+from db.archivo import adjuntar_archivos, migrar_archivos
+from db.consistencia import asegurar_indice_unico
+from db.diccionarios import autores, categorias, migrar_libros_a_diccionarios
+from utils.normalizacion import normalizar
+from db import eventos
+from db.eventos import publicar
+from db.fechas import a_dia, a_fecha, convertir_filas, migrar_prestamos_a_dias, sql_a_dia
+from db.instantanea import crear_registro_cambios, version_catalogo, cambios_desde, escribir_instantanea, fusionar
 
 # La variable DB_FILE ya no es necesaria, usamos DATABASE_PATH
 
@@ -24,6 +35,8 @@ def inicializar_db():
         cursor = conn.cursor()
 
         cursor.execute("PRAGMA foreign_keys = ON;")
+        # WAL: las lecturas en segundo plano (estadísticas) no bloquean las escrituras de la interfaz
+        cursor.execute("PRAGMA journal_mode = WAL;")
 
         schema_sql = """
         -- 1. Tabla de BIBLIOTECARIOS (Quienes gestionan)
@@ -38,30 +51,82 @@ def inicializar_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             nombre TEXT NOT NULL,
             dni TEXT UNIQUE NOT NULL,
-            telefono TEXT
+            telefono TEXT,
+            nombre_norm TEXT, -- Clave de búsqueda (utils/normalizacion.py)
+            marcado_baja INTEGER DEFAULT 0 -- 1: ya no está en el padrón pero tiene préstamos abiertos o multas
         );
-        -- 3. Tabla de LIBROS
+        -- 3. Diccionarios de CATEGORÍAS y AUTORES (cada nombre se guarda una sola vez)
+        CREATE TABLE IF NOT EXISTS categorias (
+            id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            nombre_norm TEXT
+        );
+        CREATE TABLE IF NOT EXISTS autores (
+            id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            nombre_norm TEXT
+        );
+        -- Tabla de LIBROS
         CREATE TABLE IF NOT EXISTS libros (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             titulo TEXT NOT NULL,
-            autor TEXT NOT NULL,
+            titulo_norm TEXT, -- Clave de búsqueda (utils/normalizacion.py)
+            autor_id INTEGER NOT NULL REFERENCES autores(id),
             isbn TEXT UNIQUE,
-            categoria TEXT, 
-            disponible INTEGER DEFAULT 1 -- 1: Disponible, 0: Prestado
+            categoria_id INTEGER REFERENCES categorias(id),
+            disponible INTEGER DEFAULT 1, -- 1: Disponible, 0: Prestado
+            dia_alta INTEGER -- Número de día de alta en el catálogo (NULL en libros anteriores)
         );
         -- 4. Tabla de PRESTAMOS (Relaciona usuarios y libros)
         CREATE TABLE IF NOT EXISTS prestamos (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             usuario_id INTEGER,
             libro_id INTEGER,
-            fecha_prestamo DATE DEFAULT CURRENT_DATE,
-            fecha_devolucion DATE NULL, -- Es NULL si está activo
+            -- Fechas como número de día (días desde 1970-01-01, ver db/fechas.py)
+            dia_prestamo INTEGER NOT NULL,
+            dia_devolucion INTEGER NULL, -- Es NULL si está activo
+            dia_vencimiento INTEGER NULL,
+            -- Las mismas fechas como texto 'YYYY-MM-DD', solo para mostrar (no se indexan)
+            fecha_prestamo TEXT GENERATED ALWAYS AS (date(2440587.5 + dia_prestamo)) VIRTUAL,
+            fecha_devolucion TEXT GENERATED ALWAYS AS (date(2440587.5 + dia_devolucion)) VIRTUAL,
+            fecha_vencimiento TEXT GENERATED ALWAYS AS (date(2440587.5 + dia_vencimiento)) VIRTUAL,
             FOREIGN KEY (usuario_id) REFERENCES usuarios(id),
             FOREIGN KEY (libro_id) REFERENCES libros(id)
         );
+        -- Los índices de 'prestamos' se crean en _migrar_esquema, después de pasar
+        -- las fechas de las bases anteriores a número de día.
+        -- 5. Calendario de días cerrados (no cuentan como días de retraso)
+        CREATE TABLE IF NOT EXISTS dias_festivos (
+            dia INTEGER PRIMARY KEY, -- Número de día
+            descripcion TEXT
+        );
+        -- 6. Libro de MULTAS (una por préstamo vencido, importes en céntimos)
+        CREATE TABLE IF NOT EXISTS multas (
+            prestamo_id INTEGER PRIMARY KEY,
+            usuario_id INTEGER NOT NULL,
+            dias_retraso INTEGER NOT NULL,
+            importe INTEGER NOT NULL,
+            dia_calculo INTEGER NOT NULL, -- Número de día del último cálculo
+            cerrada INTEGER DEFAULT 0, -- 1: préstamo devuelto, importe definitivo
+            FOREIGN KEY (prestamo_id) REFERENCES prestamos(id),
+            FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_multas_usuario ON multas(usuario_id);
+        -- 7. Registro del mantenimiento en inactividad (ANALYZE, VACUUM, checkpoint...)
+        CREATE TABLE IF NOT EXISTS registro_mantenimiento (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            tarea TEXT NOT NULL,
+            duracion_ms INTEGER NOT NULL,
+            bytes_recuperados INTEGER DEFAULT 0,
+            resultado TEXT NOT NULL -- 'ok', 'interrumpida', 'omitida' o 'error: ...'
+        );
         """
         cursor.executescript(schema_sql)
+        _migrar_esquema(cursor)
         conn.commit()
+        # Los ficheros de archivo de préstamos siguen al esquema de biblioteca.db
+        migrar_archivos()
     except sqlite3.Error as e:
         print(f"Ocurrió un error al crear las tablas: {e}")
         if conn:
@@ -70,6 +135,104 @@ def inicializar_db():
         if conn:
             conn.close()
 
+def _columnas(cursor, tabla):
+    """Retorna el conjunto de nombres de columna de una tabla."""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return {fila[1] for fila in cursor.fetchall()}
+
+def _migrar_esquema(cursor):
+    """Aplica sobre una base de datos existente los cambios de esquema posteriores a la v1.0."""
+    columnas = _columnas(cursor, "prestamos")
+    # 1. Fecha de vencimiento de los préstamos (bases con fechas aún en texto)
+    if "dia_prestamo" not in columnas and "fecha_vencimiento" not in columnas:
+        cursor.execute("ALTER TABLE prestamos ADD COLUMN fecha_vencimiento DATE NULL")
+        # Los préstamos abiertos existentes vencen según el plazo de su categoría
+        cursor.execute(
+            "SELECT p.id, p.fecha_prestamo, l.categoria FROM prestamos p "
+            "JOIN libros l ON p.libro_id = l.id WHERE p.fecha_devolucion IS NULL"
+        )
+        cursor.executemany(
+            "UPDATE prestamos SET fecha_vencimiento = ? WHERE id = ?",
+            [
+                (calcular_fecha_vencimiento(categoria, datetime.date.fromisoformat(fecha)).isoformat(), prestamo_id)
+                for prestamo_id, fecha, categoria in cursor.fetchall()
+            ]
+        )
+
+    # 2. Fechas en texto -> número de día
+    _migrar_fechas_a_dias(cursor)
+
+    # 3. Autor y categoría en texto -> ids de los diccionarios
+    # (el trigger de estadísticas leía libros.categoria: se vuelve a crear después)
+    if "autor" in _columnas(cursor, "libros"):
+        cursor.execute("DROP TRIGGER IF EXISTS trg_estad_prestamo")
+        migrar_libros_a_diccionarios(cursor)
+    # Fecha de alta de los libros (los ya existentes quedan sin fecha)
+    if "dia_alta" not in _columnas(cursor, "libros"):
+        cursor.execute("ALTER TABLE libros ADD COLUMN dia_alta INTEGER")
+    # Lectores pendientes de baja tras sincronizar el padrón (db/padron.py)
+    if "marcado_baja" not in _columnas(cursor, "usuarios"):
+        cursor.execute("ALTER TABLE usuarios ADD COLUMN marcado_baja INTEGER DEFAULT 0")
+    # Claves de búsqueda normalizadas (sin tildes ni mayúsculas ni puntuación)
+    for tabla, columna in (("libros", "titulo"), ("usuarios", "nombre"), ("autores", "nombre"), ("categorias", "nombre")):
+        if f"{columna}_norm" not in _columnas(cursor, tabla):
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna}_norm TEXT")
+            cursor.execute(f"SELECT id, {columna} FROM {tabla}")
+            cursor.executemany(
+                f"UPDATE {tabla} SET {columna}_norm = ? WHERE id = ?",
+                [(normalizar(texto), fila_id) for fila_id, texto in cursor.fetchall()]
+            )
+
+    cursor.executescript("""
+        -- Filtros del catálogo por categoría o por autor
+        CREATE INDEX IF NOT EXISTS idx_libros_categoria ON libros(categoria_id);
+        CREATE INDEX IF NOT EXISTS idx_libros_autor ON libros(autor_id);
+        -- Historial de un usuario o de un libro, del más reciente al más antiguo
+        CREATE INDEX IF NOT EXISTS idx_prestamos_usuario_fecha ON prestamos(usuario_id, dia_prestamo);
+        CREATE INDEX IF NOT EXISTS idx_prestamos_libro_fecha ON prestamos(libro_id, dia_prestamo);
+        -- Índice parcial de préstamos abiertos por vencimiento (cubre también el conteo por usuario)
+        CREATE INDEX IF NOT EXISTS idx_prestamos_vencimiento
+            ON prestamos(dia_vencimiento, usuario_id) WHERE dia_devolucion IS NULL;
+    """)
+
+    # 4. Tablas de estadísticas materializadas (se rellenan la primera vez)
+    crear_estadisticas(cursor)
+
+    # 5. Un solo préstamo abierto por libro (también localiza el préstamo abierto de un libro)
+    asegurar_indice_unico(cursor)
+
+    # 6. Registro de cambios del catálogo (versión de la instantánea de arranque)
+    crear_registro_cambios(cursor)
+
+def _migrar_fechas_a_dias(cursor):
+    """
+    Convierte las fechas 'YYYY-MM-DD' de las bases anteriores en números de día (db/fechas.py):
+    préstamos, festivos, multas y tablas de estadísticas.
+    """
+    # Los triggers de estadísticas usan las columnas antiguas: se vuelven a crear después
+    if "dia_prestamo" not in _columnas(cursor, "prestamos"):
+        cursor.execute("DROP TRIGGER IF EXISTS trg_estad_prestamo")
+        cursor.execute("DROP TRIGGER IF EXISTS trg_estad_devolucion")
+    if not migrar_prestamos_a_dias(cursor):
+        return
+
+    for tabla, antigua, nueva in (
+        ("dias_festivos", "fecha", "dia"),
+        ("multas", "fecha_calculo", "dia_calculo"),
+        ("estad_dia", "fecha", "dia"),
+    ):
+        if antigua in _columnas(cursor, tabla):
+            cursor.execute(f"ALTER TABLE {tabla} RENAME COLUMN {antigua} TO {nueva}")
+            cursor.execute(f"UPDATE {tabla} SET {nueva} = {sql_a_dia(nueva)}")
+    for tabla in ("estad_libro", "estad_usuario"):
+        if "ultimo_prestamo" in _columnas(cursor, tabla):
+            cursor.execute(f"UPDATE {tabla} SET ultimo_prestamo = {sql_a_dia('ultimo_prestamo')}")
+
+def calcular_fecha_vencimiento(categoria, fecha_prestamo):
+    """Retorna la fecha de vencimiento (datetime.date) según el plazo configurado para la categoría."""
+    dias = LOAN_PERIODS_BY_CATEGORY.get((categoria or "").strip().lower(), LOAN_PERIOD_DAYS)
+    return fecha_prestamo + datetime.timedelta(days=dias)
+
 def verificar_existencia_bibliotecarios():
     """Verifica si existe al menos un registro en la tabla 'bibliotecarios'."""
     conn = None
@@ -145,15 +308,27 @@ def autenticar_bibliotecario(email, contrasena):
 # Funciones de Gestión de Libros
 # -------------------------------------------------------------
 
-def obtener_todos_los_libros():
-    """Obtiene todos los libros con el estado de disponibilidad."""
+def obtener_todos_los_libros(categoria_id=None, autor_id=None):
+    """
+    Obtiene todos los libros con el estado de disponibilidad, opcionalmente solo los de
+    una categoría y/o un autor (búsqueda por id en su índice).
+    Retorna: (isbn, titulo, autor, categoria, disponible, id, autor_id, categoria_id, fecha_alta,
+    titulo_norm, autor_norm), con los nombres ya resueltos, fecha_alta como datetime.date
+    (None si no se conoce) y las claves de búsqueda normalizadas.
+    """
     conn = None
     try:
         # Usa la ruta dinámica para la conexión
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
-        cursor.execute("SELECT isbn, titulo, autor, categoria, disponible, id FROM libros")
-        return cursor.fetchall()
+        condiciones, parametros = [], []
+        if categoria_id is not None:
+            condiciones.append("l.categoria_id = ?")
+            parametros.append(categoria_id)
+        if autor_id is not None:
+            condiciones.append("l.autor_id = ?")
+            parametros.append(autor_id)
+        return _filas_libros(cursor, " AND ".join(condiciones), parametros)
     except Exception as e:
         print(f"Error al obtener libros: {e}")
         return []
@@ -161,6 +336,98 @@ def obtener_todos_los_libros():
         if conn:
             conn.close()
 
+def _filas_libros(cursor, condicion="", parametros=()):
+    """Filas de libros con el formato de obtener_todos_los_libros()."""
+    where = f" WHERE {condicion}" if condicion else ""
+    cursor.execute(
+        "SELECT l.isbn, l.titulo, l.autor_id, l.categoria_id, l.disponible, l.id, l.dia_alta, "
+        f"l.titulo_norm, a.nombre_norm FROM libros l LEFT JOIN autores a ON a.id = l.autor_id{where}",
+        parametros
+    )
+    return [
+        (isbn, titulo, autores.nombre(autor_id), categorias.nombre(categoria_id), disponible, libro_id,
+         autor_id, categoria_id, a_fecha(dia_alta), titulo_norm or "", autor_norm or "")
+        for isbn, titulo, autor_id, categoria_id, disponible, libro_id, dia_alta, titulo_norm, autor_norm
+        in cursor.fetchall()
+    ]
+
+def obtener_libros_por_ids(libro_ids):
+    """
+    Filas de los libros indicados, con el formato de obtener_todos_los_libros() (para aplicar
+    un cambio a las vistas sin releer todo el catálogo). Los ids que ya no existen no aparecen.
+    """
+    libro_ids = list(libro_ids)
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        filas = []
+        for i in range(0, len(libro_ids), 500): # Límite de parámetros por consulta
+            lote = libro_ids[i:i + 500]
+            filas += _filas_libros(cursor, f"l.id IN ({', '.join('?' * len(lote))})", lote)
+        return filas
+    except Exception as e:
+        print(f"Error al obtener libros por id: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def guardar_instantanea_catalogo():
+    """
+    Guarda la instantánea de arranque del catálogo (ver db/instantanea.py).
+    La versión se lee antes que las filas: un cambio intermedio queda con una versión mayor
+    y se vuelve a aplicar al comprobar la instantánea (aplicarlo dos veces no cambia nada).
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        version = version_catalogo(cursor)
+        escribir_instantanea(version, _filas_libros(cursor))
+        return True
+    except Exception as e:
+        print(f"Error al guardar la instantánea del catálogo: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def actualizar_instantanea_catalogo(version, filas):
+    """
+    Compara las filas de una instantánea con la base de datos y relee solo los libros cambiados
+    desde su versión. Si hubo cambios, reescribe la instantánea y retorna las filas al día;
+    si no, retorna None.
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        actual = version_catalogo(cursor)
+        if actual == version:
+            return None
+        if actual < version:
+            # La base de datos es anterior a la instantánea (p. ej. restaurada de una copia): todo de nuevo
+            filas = _filas_libros(cursor)
+        else:
+            cambiados = cambios_desde(cursor, version)
+            nuevas = []
+            for i in range(0, len(cambiados), 500): # Límite de parámetros por consulta
+                lote = cambiados[i:i + 500]
+                nuevas += _filas_libros(cursor, f"l.id IN ({', '.join('?' * len(lote))})", lote)
+            filas = fusionar(filas, cambiados, nuevas)
+        escribir_instantanea(actual, filas)
+        return filas
+    except Exception as e:
+        print(f"Error al comprobar la instantánea del catálogo: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
 def obtener_libro_por_isbn(isbn):
     """Obtiene un libro por su ISBN."""
     conn = None
@@ -177,6 +444,22 @@ def obtener_libro_por_isbn(isbn):
         if conn:
             conn.close()
 
+def obtener_claves_libros():
+    """Obtiene solo (isbn, titulo) de todos los libros, para índices de autocompletado."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute("SELECT isbn, titulo FROM libros")
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al obtener claves de libros: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
 def obtener_libros_prestados_count():
     """Obtiene el número de libros actualmente prestados (disponible = 0)."""
     conn = None
@@ -201,10 +484,12 @@ def insertar_libro(titulo, autor, isbn, categoria):
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO libros (titulo, autor, isbn, categoria) VALUES (?, ?, ?, ?)",
-            (titulo, autor, isbn, categoria)
+            "INSERT INTO libros (titulo, titulo_norm, autor_id, isbn, categoria_id, dia_alta) VALUES (?, ?, ?, ?, ?, ?)",
+            (titulo, normalizar(titulo), autores.id_de(cursor, autor), isbn, categorias.id_de(cursor, categoria),
+             a_dia(datetime.date.today()))
         )
         conn.commit()
+        publicar(eventos.LIBRO, eventos.ALTA, cursor.lastrowid)
         return True
     except sqlite3.IntegrityError:
         return False
@@ -223,10 +508,11 @@ def actualizar_libro(libro_id, titulo, autor, isbn, categoria):
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         cursor.execute(
-            "UPDATE libros SET titulo = ?, autor = ?, isbn = ?, categoria = ? WHERE id = ?",
-            (titulo, autor, isbn, categoria, libro_id)
+            "UPDATE libros SET titulo = ?, titulo_norm = ?, autor_id = ?, isbn = ?, categoria_id = ? WHERE id = ?",
+            (titulo, normalizar(titulo), autores.id_de(cursor, autor), isbn, categorias.id_de(cursor, categoria), libro_id)
         )
         conn.commit()
+        publicar(eventos.LIBRO, eventos.CAMBIO, libro_id)
         return True
     except sqlite3.IntegrityError:
         return False
@@ -255,6 +541,7 @@ def eliminar_libro(libro_id):
 
         cursor.execute("DELETE FROM libros WHERE id = ?", (libro_id,))
         conn.commit()
+        publicar(eventos.LIBRO, eventos.BAJA, libro_id)
         return True
     except Exception as e:
         print(f"Error al eliminar libro ID {libro_id}: {e}")
@@ -263,6 +550,55 @@ def eliminar_libro(libro_id):
         if conn:
             conn.close()
             
+def importar_libros(filas):
+    """
+    Inserta en una sola transacción una lista de libros (titulo, autor, isbn, categoria),
+    p. ej. leída de un CSV. Los ISBN que ya existen y las filas sin título o sin autor se omiten.
+    Retorna (insertados, omitidos), o None si la transacción falló (no se inserta nada).
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        dia_alta = a_dia(datetime.date.today())
+        # Cada autor y categoría se resuelve una sola vez por importación
+        ids_autor, ids_categoria = {}, {}
+        validas, omitidos = [], 0
+        for titulo, autor, isbn, categoria in filas:
+            titulo, autor = (titulo or "").strip(), (autor or "").strip()
+            categoria = (categoria or "").strip()
+            if not titulo or not autor:
+                omitidos += 1
+                continue
+            if autor.casefold() not in ids_autor:
+                ids_autor[autor.casefold()] = autores.id_de(cursor, autor)
+            if categoria.casefold() not in ids_categoria:
+                ids_categoria[categoria.casefold()] = categorias.id_de(cursor, categoria)
+            validas.append((titulo, normalizar(titulo), ids_autor[autor.casefold()], (isbn or "").strip() or None,
+                            ids_categoria[categoria.casefold()], dia_alta))
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM libros")
+        ultimo_id = cursor.fetchone()[0]
+        cursor.executemany(
+            "INSERT INTO libros (titulo, titulo_norm, autor_id, isbn, categoria_id, dia_alta) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(isbn) DO NOTHING",
+            validas
+        )
+        cursor.execute("SELECT id FROM libros WHERE id > ?", (ultimo_id,))
+        nuevos = [fila[0] for fila in cursor.fetchall()]
+        conn.commit()
+        publicar(eventos.LIBRO, eventos.ALTA, *nuevos)
+        return len(nuevos), omitidos + len(validas) - len(nuevos)
+    except Exception as e:
+        print(f"Error al importar libros: {e}")
+        if conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn:
+            conn.close()
+
 # -------------------------------------------------------------
 # Funciones de Gestión de Usuarios (Lectores)
 # -------------------------------------------------------------
@@ -275,21 +611,8 @@ def obtener_todos_los_usuarios():
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         
-        query = """
-        SELECT 
-            u.id, 
-            u.nombre, 
-            u.dni, 
-            u.telefono,
-            COUNT(p.libro_id) AS libros_prestados_activos
-        FROM usuarios u
-        LEFT JOIN prestamos p ON u.id = p.usuario_id AND p.fecha_devolucion IS NULL
-        GROUP BY u.id, u.nombre, u.dni, u.telefono
-        ORDER BY u.nombre
-        """
-        cursor.execute(query)
-        # Retorna: (id, nombre, dni, telefono, libros_prestados_activos)
-        return cursor.fetchall()
+        # Retorna: (id, nombre, dni, telefono, libros_prestados_activos, nombre_norm, marcado_baja)
+        return _filas_usuarios(cursor)
     except Exception as e:
         print(f"Error al obtener usuarios: {e}")
         return []
@@ -297,14 +620,55 @@ def obtener_todos_los_usuarios():
         if conn:
             conn.close()
 
+def obtener_usuarios_por_ids(user_ids):
+    """Filas de los usuarios indicados, con el formato de obtener_todos_los_usuarios()."""
+    user_ids = list(user_ids)
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        filas = []
+        for i in range(0, len(user_ids), 500): # Límite de parámetros por consulta
+            lote = user_ids[i:i + 500]
+            filas += _filas_usuarios(cursor, f"u.id IN ({', '.join('?' * len(lote))})", lote)
+        return filas
+    except Exception as e:
+        print(f"Error al obtener usuarios por id: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def _filas_usuarios(cursor, condicion="", parametros=()):
+    """Filas de usuarios con el formato de obtener_todos_los_usuarios()."""
+    where = f"WHERE {condicion}" if condicion else ""
+    query = f"""
+    SELECT 
+        u.id, 
+        u.nombre, 
+        u.dni, 
+        u.telefono,
+        COUNT(p.libro_id) AS libros_prestados_activos,
+        COALESCE(u.nombre_norm, ''),
+        COALESCE(u.marcado_baja, 0)
+    FROM usuarios u
+    LEFT JOIN prestamos p ON u.id = p.usuario_id AND p.dia_devolucion IS NULL
+    {where}
+    GROUP BY u.id, u.nombre, u.dni, u.telefono
+    ORDER BY u.nombre
+    """
+    cursor.execute(query, parametros)
+    return cursor.fetchall()
+
 def obtener_usuario_por_dni(dni):
-    """Obtiene un usuario por su DNI. Retorna (id, nombre, dni, telefono) o None."""
+    """Obtiene un usuario por su DNI. Retorna (id, nombre, dni, telefono, marcado_baja) o None."""
     conn = None
     try:
         # Usa la ruta dinámica para la conexión
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
-        cursor.execute("SELECT id, nombre, dni, telefono FROM usuarios WHERE dni = ?", (dni,))
+        cursor.execute("SELECT id, nombre, dni, telefono, COALESCE(marcado_baja, 0) FROM usuarios WHERE dni = ?", (dni,))
         return cursor.fetchone()
     except Exception as e:
         print(f"Error al obtener usuario por DNI: {e}")
@@ -313,6 +677,22 @@ def obtener_usuario_por_dni(dni):
         if conn:
             conn.close()
 
+def obtener_claves_usuarios():
+    """Obtiene solo (dni, nombre) de todos los usuarios, para índices de autocompletado."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute("SELECT dni, nombre FROM usuarios")
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al obtener claves de usuarios: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
 def obtener_usuario_por_id(user_id):
     """Obtiene un usuario por su ID. Retorna (id, nombre, dni, telefono) o None."""
     conn = None
@@ -337,10 +717,11 @@ def insertar_usuario(nombre, dni, telefono):
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO usuarios (nombre, dni, telefono) VALUES (?, ?, ?)",
-            (nombre, dni, telefono)
+            "INSERT INTO usuarios (nombre, dni, telefono, nombre_norm) VALUES (?, ?, ?, ?)",
+            (nombre, dni, telefono, normalizar(nombre))
         )
         conn.commit()
+        publicar(eventos.USUARIO, eventos.ALTA, cursor.lastrowid)
         return True
     except sqlite3.IntegrityError:
         return False # DNI duplicado
@@ -351,6 +732,46 @@ def insertar_usuario(nombre, dni, telefono):
         if conn:
             conn.close()
 
+def importar_usuarios(filas):
+    """
+    Inserta en una sola transacción una lista de lectores (nombre, dni, telefono).
+    Los DNI que ya existen y las filas sin nombre o sin DNI se omiten.
+    Retorna (insertados, omitidos), o None si la transacción falló (no se inserta nada).
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        validas, omitidos = [], 0
+        for nombre, dni, telefono in filas:
+            nombre, dni = (nombre or "").strip(), (dni or "").strip()
+            if not nombre or not dni:
+                omitidos += 1
+                continue
+            validas.append((nombre, dni, (telefono or "").strip(), normalizar(nombre)))
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM usuarios")
+        ultimo_id = cursor.fetchone()[0]
+        cursor.executemany(
+            "INSERT INTO usuarios (nombre, dni, telefono, nombre_norm) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(dni) DO NOTHING",
+            validas
+        )
+        cursor.execute("SELECT id FROM usuarios WHERE id > ?", (ultimo_id,))
+        nuevos = [fila[0] for fila in cursor.fetchall()]
+        conn.commit()
+        publicar(eventos.USUARIO, eventos.ALTA, *nuevos)
+        return len(nuevos), omitidos + len(validas) - len(nuevos)
+    except Exception as e:
+        print(f"Error al importar usuarios: {e}")
+        if conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn:
+            conn.close()
+
 def actualizar_usuario(user_id, nombre, telefono):
     """Actualiza la información de un usuario existente."""
     conn = None
@@ -359,10 +780,11 @@ def actualizar_usuario(user_id, nombre, telefono):
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         cursor.execute(
-            "UPDATE usuarios SET nombre = ?, telefono = ? WHERE id = ?",
-            (nombre, telefono, user_id)
+            "UPDATE usuarios SET nombre = ?, telefono = ?, nombre_norm = ? WHERE id = ?",
+            (nombre, telefono, normalizar(nombre), user_id)
         )
         conn.commit()
+        publicar(eventos.USUARIO, eventos.CAMBIO, user_id)
         return True
     except Exception as e:
         print(f"Error al actualizar usuario ID {user_id}: {e}")
@@ -372,23 +794,33 @@ def actualizar_usuario(user_id, nombre, telefono):
             conn.close()
 
 def eliminar_usuario(user_id):
-    """Elimina un usuario. Solo si no tiene libros prestados activamente."""
+    """
+    Elimina un usuario. Solo si no tiene libros prestados activamente ni multas registradas
+    (borrarlo dejaría huérfanas sus filas de 'multas'; ver también db/padron.py).
+    """
     conn = None
     try:
         # Usa la ruta dinámica para la conexión
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
-        
-        # 1. Contar préstamos activos
-        cursor.execute("SELECT COUNT(*) FROM prestamos WHERE usuario_id = ? AND fecha_devolucion IS NULL", (user_id,))
-        active_loans = cursor.fetchone()[0]
-
-        if active_loans > 0:
-            return False # No se puede eliminar si tiene préstamos activos
 
-        # 2. Eliminar usuario
-        cursor.execute("DELETE FROM usuarios WHERE id = ?", (user_id,))
+        # Comprobación y borrado en la misma sentencia: no puede colarse un préstamo entre ambos
+        cursor.execute(
+            """
+            DELETE FROM usuarios
+            WHERE id = ? AND NOT EXISTS (
+                SELECT 1 FROM prestamos WHERE usuario_id = ? AND dia_devolucion IS NULL
+            ) AND NOT EXISTS (
+                SELECT 1 FROM multas WHERE usuario_id = ?
+            )
+            """,
+            (user_id, user_id, user_id)
+        )
+        if cursor.rowcount == 0:
+            print(f"No se eliminó el usuario ID {user_id}: no existe, o tiene préstamos activos o multas.")
+            return False # No se puede eliminar si tiene préstamos activos o multas
         conn.commit()
+        publicar(eventos.USUARIO, eventos.BAJA, user_id)
         return True
     except Exception as e:
         print(f"Error al eliminar usuario ID {user_id}: {e}")
@@ -409,12 +841,16 @@ def registrar_prestamo(usuario_id, libro_id):
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         
-        # 1. Registrar el préstamo
-        fecha_prestamo = datetime.date.today().strftime("%Y-%m-%d")
+        # 1. Registrar el préstamo con su vencimiento según la categoría del libro
+        hoy = datetime.date.today()
+        cursor.execute("SELECT categoria_id FROM libros WHERE id = ?", (libro_id,))
+        libro = cursor.fetchone()
+        fecha_vencimiento = calcular_fecha_vencimiento(categorias.nombre(libro[0]) if libro else None, hoy)
         cursor.execute(
-            "INSERT INTO prestamos (usuario_id, libro_id, fecha_prestamo) VALUES (?, ?, ?)",
-            (usuario_id, libro_id, fecha_prestamo)
+            "INSERT INTO prestamos (usuario_id, libro_id, dia_prestamo, dia_vencimiento) VALUES (?, ?, ?, ?)",
+            (usuario_id, libro_id, a_dia(hoy), a_dia(fecha_vencimiento))
         )
+        prestamo_id = cursor.lastrowid
         
         # 2. Actualizar el estado del libro a NO DISPONIBLE (0)
         cursor.execute(
@@ -422,6 +858,8 @@ def registrar_prestamo(usuario_id, libro_id):
             (libro_id,)
         )
         conn.commit()
+        publicar(eventos.PRESTAMO, eventos.ALTA, prestamo_id)
+        publicar(eventos.LIBRO, eventos.CAMBIO, libro_id)
         return True
     except Exception as e:
         print(f"Error al registrar préstamo: {e}")
@@ -441,10 +879,10 @@ def registrar_devolucion(prestamo_id, libro_id):
         cursor = conn.cursor()
 
         # 1. Registrar la fecha de devolución en la tabla de préstamos
-        fecha_devolucion = datetime.date.today().strftime("%Y-%m-%d")
+        fecha_devolucion = datetime.date.today()
         cursor.execute(
-            "UPDATE prestamos SET fecha_devolucion = ? WHERE id = ?",
-            (fecha_devolucion, prestamo_id)
+            "UPDATE prestamos SET dia_devolucion = ? WHERE id = ?",
+            (a_dia(fecha_devolucion), prestamo_id)
         )
 
         # 2. Actualizar el estado del libro a DISPONIBLE (1)
@@ -452,7 +890,12 @@ def registrar_devolucion(prestamo_id, libro_id):
             "UPDATE libros SET disponible = 1 WHERE id = ?",
             (libro_id,)
         )
+
+        # 3. Fijar la multa definitiva si se devolvió con retraso
+        cerrar_multa(cursor, prestamo_id, fecha_devolucion)
         conn.commit()
+        publicar(eventos.PRESTAMO, eventos.CAMBIO, prestamo_id)
+        publicar(eventos.LIBRO, eventos.CAMBIO, libro_id)
         return True
     except Exception as e:
         print(f"Error al registrar devolución: {e}")
@@ -463,6 +906,136 @@ def registrar_devolucion(prestamo_id, libro_id):
         if conn:
             conn.close()
 
+def checkout(isbn, dni, usuario=None):
+    """
+    Registra un préstamo en una sola transacción: resuelve el usuario por DNI y el libro
+    por ISBN, valida la disponibilidad, inserta el préstamo y marca el libro como prestado.
+    Si se pasa usuario=(id, nombre) ya precargado (p. ej. al escanear el DNI), se omite
+    su búsqueda por DNI. Los lectores marcados como baja por el padrón no pueden llevarse libros.
+    Retorna (fila, None) con la fila del préstamo activo en el mismo formato que
+    obtener_prestamos_activos(), o (None, mensaje_de_error) si no se pudo registrar.
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+        cursor = conn.cursor()
+
+        # BEGIN IMMEDIATE toma el bloqueo de escritura antes de leer, evitando que
+        # dos puestos presten el mismo libro a la vez
+        cursor.execute("BEGIN IMMEDIATE")
+
+        # 1. Resolver usuario y libro. La marca de baja se lee siempre dentro de la transacción:
+        # el usuario precargado pudo quedar marcado (o eliminado) por el padrón después de escanearlo
+        if usuario is None:
+            cursor.execute("SELECT id, nombre, marcado_baja FROM usuarios WHERE dni = ?", (dni,))
+        else:
+            cursor.execute("SELECT id, nombre, marcado_baja FROM usuarios WHERE id = ?", (usuario[0],))
+        fila = cursor.fetchone()
+        if not fila:
+            conn.rollback()
+            return None, f"Usuario con DNI '{dni}' no encontrado."
+        if fila[2]:
+            conn.rollback()
+            return None, f"El lector '{fila[1]}' está marcado como baja (ya no figura en el padrón)."
+        usuario = fila[:2]
+
+        cursor.execute("SELECT id, titulo, disponible, categoria_id FROM libros WHERE isbn = ?", (isbn,))
+        libro = cursor.fetchone()
+        if not libro:
+            conn.rollback()
+            return None, f"Libro con ISBN '{isbn}' no encontrado."
+
+        usuario_id, nombre_usuario = usuario
+        libro_id, titulo, disponible, categoria_id = libro
+
+        # 2. Marcar el libro como prestado solo si sigue disponible
+        cursor.execute(
+            "UPDATE libros SET disponible = 0 WHERE id = ? AND disponible = 1",
+            (libro_id,)
+        )
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return None, f"El libro '{titulo}' no está disponible (ya prestado)."
+
+        # 3. Registrar el préstamo con su vencimiento según la categoría
+        hoy = datetime.date.today()
+        cursor.execute(
+            "INSERT INTO prestamos (usuario_id, libro_id, dia_prestamo, dia_vencimiento) VALUES (?, ?, ?, ?)",
+            (usuario_id, libro_id, a_dia(hoy), a_dia(calcular_fecha_vencimiento(categorias.nombre(categoria_id), hoy)))
+        )
+        prestamo_id = cursor.lastrowid
+        conn.commit()
+        publicar(eventos.PRESTAMO, eventos.ALTA, prestamo_id)
+        publicar(eventos.LIBRO, eventos.CAMBIO, libro_id)
+
+        # Retorna: (prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_prestamo, libro_id)
+        return (prestamo_id, titulo, nombre_usuario, dni, hoy, libro_id), None
+    except Exception as e:
+        print(f"Error al registrar préstamo: {e}")
+        if conn and conn.in_transaction:
+            conn.rollback()
+        return None, "Error al registrar el préstamo."
+    finally:
+        if conn:
+            conn.close()
+
+def registrar_devoluciones_por_isbn(isbns):
+    """
+    Cierra en una sola transacción los préstamos abiertos de una lista de ISBN escaneados.
+    Cada ISBN se resuelve a su préstamo abierto mediante el índice parcial
+    idx_prestamos_libro_abiertos.
+    Retorna (devueltos, no_encontrados), donde devueltos es una lista de
+    (isbn, prestamo_id, titulo), o None si la transacción falló.
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        fecha_devolucion = datetime.date.today()
+
+        devueltos = []
+        no_encontrados = []
+        libros_devueltos = []
+        for isbn in isbns:
+            cursor.execute(
+                """
+                SELECT p.id, l.id, l.titulo
+                FROM libros l
+                JOIN prestamos p ON p.libro_id = l.id AND p.dia_devolucion IS NULL
+                WHERE l.isbn = ?
+                """,
+                (isbn,)
+            )
+            prestamo = cursor.fetchone()
+            if not prestamo:
+                no_encontrados.append(isbn)
+                continue
+
+            prestamo_id, libro_id, titulo = prestamo
+            cursor.execute(
+                "UPDATE prestamos SET dia_devolucion = ? WHERE id = ?",
+                (a_dia(fecha_devolucion), prestamo_id)
+            )
+            cursor.execute("UPDATE libros SET disponible = 1 WHERE id = ?", (libro_id,))
+            cerrar_multa(cursor, prestamo_id, fecha_devolucion)
+            devueltos.append((isbn, prestamo_id, titulo))
+            libros_devueltos.append(libro_id)
+
+        conn.commit()
+        publicar(eventos.PRESTAMO, eventos.CAMBIO, *(d[1] for d in devueltos))
+        publicar(eventos.LIBRO, eventos.CAMBIO, *libros_devueltos)
+        return devueltos, no_encontrados
+    except Exception as e:
+        print(f"Error al registrar devoluciones por ISBN: {e}")
+        if conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn:
+            conn.close()
+
 def obtener_prestamos_activos():
     """Obtiene una lista de todos los préstamos que aún no tienen fecha_devolucion."""
     conn = None
@@ -477,17 +1050,17 @@ def obtener_prestamos_activos():
             l.titulo, 
             u.nombre, 
             u.dni, 
-            p.fecha_prestamo,
+            p.dia_prestamo,
             l.id as libro_id
         FROM prestamos p
         JOIN libros l ON p.libro_id = l.id
         JOIN usuarios u ON p.usuario_id = u.id
-        WHERE p.fecha_devolucion IS NULL
-        ORDER BY p.fecha_prestamo DESC
+        WHERE p.dia_devolucion IS NULL
+        ORDER BY p.dia_prestamo DESC
         """
         cursor.execute(query)
         # Retorna: (prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_prestamo, libro_id)
-        return cursor.fetchall()
+        return convertir_filas(cursor.fetchall(), 4)
     except Exception as e:
         print(f"Error al obtener préstamos activos: {e}")
         return []
@@ -495,10 +1068,73 @@ def obtener_prestamos_activos():
         if conn:
             conn.close()
     
-# Llamamos a la función
-# if __name__ == "__main__":
-#     inicializar_db()
+def obtener_historial_usuario(usuario_id, despues_de=None, limite=50, incluir_archivo=False):
+    """
+    Obtiene una página del historial de préstamos de un usuario, del más reciente al más antiguo.
+    Paginación por clave (keyset): despues_de es (fecha_prestamo: date, prestamo_id) de la última fila
+    de la página anterior. Usa el índice idx_prestamos_usuario_fecha.
+    Con incluir_archivo=True también se consultan los préstamos archivados.
+    Retorna: (prestamo_id, titulo, isbn, fecha_prestamo, fecha_vencimiento, fecha_devolucion)
+    """
+    return _obtener_pagina_historial(
+        """
+        SELECT p.id, l.titulo, l.isbn, p.dia_prestamo, p.dia_vencimiento, p.dia_devolucion
+        FROM {prestamos} p
+        LEFT JOIN libros l ON l.id = p.libro_id
+        ORDER BY p.dia_prestamo DESC, p.id DESC
+        """,
+        "usuario_id", usuario_id, despues_de, limite, incluir_archivo
+    )
+
+def obtener_historial_libro(libro_id, despues_de=None, limite=50, incluir_archivo=False):
+    """
+    Obtiene una página del historial de préstamos de un libro, del más reciente al más antiguo.
+    Paginación por clave (keyset) sobre el índice idx_prestamos_libro_fecha.
+    Con incluir_archivo=True también se consultan los préstamos archivados.
+    Retorna: (prestamo_id, nombre_usuario, dni_usuario, fecha_prestamo, fecha_vencimiento, fecha_devolucion)
+    """
+    return _obtener_pagina_historial(
+        """
+        SELECT p.id, u.nombre, u.dni, p.dia_prestamo, p.dia_vencimiento, p.dia_devolucion
+        FROM {prestamos} p
+        LEFT JOIN usuarios u ON u.id = p.usuario_id
+        ORDER BY p.dia_prestamo DESC, p.id DESC
+        """,
+        "libro_id", libro_id, despues_de, limite, incluir_archivo
+    )
 
-# Es crucial llamar a inicializar_db() para que la base de datos se cree/abra correctamente
-# antes de que la aplicación intente usar cualquiera de las funciones.
-inicializar_db()
\ No newline at end of file
+def _obtener_pagina_historial(consulta, columna, clave, despues_de, limite, incluir_archivo):
+    """
+    Ejecuta una consulta de historial paginada por (dia_prestamo, id).
+    '{prestamos}' se sustituye por la página de préstamos de la clave: de biblioteca.db y, si se
+    pide, unida (UNION) con la de cada fichero de archivo. Cada rama usa su propio índice.
+    """
+    parametros = {"clave": clave, "limite": limite}
+    filtro = ""
+    if despues_de:
+        # Continúa justo después de la última fila vista, sin OFFSET
+        filtro = "AND (dia_prestamo, id) < (:dia, :id)"
+        parametros["dia"], parametros["id"] = a_dia(despues_de[0]), despues_de[1]
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        esquemas = ["main"]
+        if incluir_archivo:
+            esquemas += adjuntar_archivos(conn)
+        ramas = " UNION ".join(
+            f"SELECT id, usuario_id, libro_id, dia_prestamo, dia_vencimiento, dia_devolucion "
+            f"FROM {esquema}.prestamos WHERE {columna} = :clave {filtro}"
+            for esquema in esquemas
+        )
+        # UNION (no UNION ALL): un lote archivado a medias no aparece dos veces
+        prestamos = f"({ramas} ORDER BY dia_prestamo DESC, id DESC LIMIT :limite)"
+        cursor = conn.cursor()
+        cursor.execute(consulta.format(prestamos=prestamos), parametros)
+        return convertir_filas(cursor.fetchall(), 3, 4, 5)
+    except Exception as e:
+        print(f"Error al obtener historial de préstamos: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,114 @@
+"""
+    Diccionarios de categorías y autores.
+    'libros' guarda solo el id de su categoría y de su autor; los nombres viven una sola vez en las
+    tablas 'categorias' y 'autores'. Los nombres se resuelven con un mapa id -> nombre en memoria,
+    que se carga la primera vez y se recarga solo cuando aparece un id desconocido
+    (los nombres no cambian una vez creados).
+"""
+import sqlite3
+from threading import Lock
+from utils.path_utils import DATABASE_PATH
+from utils.normalizacion import normalizar
+
+
+class Diccionario:
+    """Mapa id -> nombre de una tabla de diccionario (id INTEGER PRIMARY KEY, nombre UNIQUE)."""
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self._nombres = None # id -> nombre; None hasta la primera carga
+        self._lock = Lock()
+
+    def recargar(self):
+        """Vuelve a leer la tabla completa."""
+        conn = None
+        try:
+            # Usa la ruta dinámica para la conexión
+            conn = sqlite3.connect(DATABASE_PATH)
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT id, nombre FROM {self.tabla}")
+            nombres = dict(cursor.fetchall())
+        except Exception as e:
+            print(f"Error al cargar {self.tabla}: {e}")
+            nombres = {}
+        finally:
+            if conn:
+                conn.close()
+        with self._lock:
+            self._nombres = nombres
+
+    def nombres(self):
+        """Copia del mapa id -> nombre."""
+        with self._lock:
+            cargado = self._nombres is not None
+        if not cargado:
+            self.recargar()
+        with self._lock:
+            return dict(self._nombres)
+
+    def nombre(self, id_):
+        """Nombre de un id ('' si es None o no existe)."""
+        if id_ is None:
+            return ""
+        with self._lock:
+            nombre = self._nombres.get(id_) if self._nombres is not None else None
+        if nombre is None:
+            # Id creado después de la última carga (o primera consulta)
+            self.recargar()
+            with self._lock:
+                nombre = self._nombres.get(id_, "")
+        return nombre
+
+    def id_de(self, cursor, nombre):
+        """
+        Id del nombre indicado, creándolo si no existe (sin distinguir mayúsculas).
+        Se ejecuta con el cursor de la transacción que lo usa (no hace commit).
+        Retorna None si el nombre está vacío.
+        """
+        nombre = (nombre or "").strip()
+        if not nombre:
+            return None
+        cursor.execute(
+            f"INSERT INTO {self.tabla} (nombre, nombre_norm) VALUES (?, ?) ON CONFLICT(nombre) DO NOTHING",
+            (nombre, normalizar(nombre))
+        )
+        cursor.execute(f"SELECT id FROM {self.tabla} WHERE nombre = ?", (nombre,))
+        return cursor.fetchone()[0]
+
+    def ordenados(self):
+        """Lista [(id, nombre)] ordenada por nombre, para filtros y desplegables."""
+        return sorted(self.nombres().items(), key=lambda item: item[1].casefold())
+
+
+# Instancias compartidas por la capa de datos y las vistas
+categorias = Diccionario("categorias")
+autores = Diccionario("autores")
+
+def migrar_libros_a_diccionarios(cursor):
+    """
+    Pasa libros.autor y libros.categoria (texto) a autor_id y categoria_id.
+    Se llama desde inicializar_db(); no hace nada si la tabla ya está convertida.
+    Los triggers que leían libros.categoria deben haberse eliminado antes.
+    """
+    cursor.execute("PRAGMA table_info(libros)")
+    columnas = {fila[1] for fila in cursor.fetchall()}
+    if "autor" not in columnas:
+        return False
+
+    cursor.execute("ALTER TABLE libros ADD COLUMN autor_id INTEGER REFERENCES autores(id)")
+    cursor.execute("ALTER TABLE libros ADD COLUMN categoria_id INTEGER REFERENCES categorias(id)")
+    for tabla, columna in (("autores", "autor"), ("categorias", "categoria")):
+        # El primer libro con cada nombre fija cómo se escribe (las variantes de mayúsculas se unen)
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {tabla} (nombre) "
+            f"SELECT trim({columna}) FROM libros WHERE trim({columna}) != '' ORDER BY id"
+        )
+        cursor.execute(f"SELECT id, nombre FROM {tabla} WHERE nombre_norm IS NULL")
+        cursor.executemany(
+            f"UPDATE {tabla} SET nombre_norm = ? WHERE id = ?",
+            [(normalizar(nombre), fila_id) for fila_id, nombre in cursor.fetchall()]
+        )
+        cursor.execute(
+            f"UPDATE libros SET {columna}_id = (SELECT id FROM {tabla} WHERE nombre = trim(libros.{columna}))"
+        )
+        cursor.execute(f"ALTER TABLE libros DROP COLUMN {columna}")
+    return True
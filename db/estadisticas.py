@@ -0,0 +1,348 @@
+"""
+    Estadísticas de circulación materializadas.
+    Las tablas de resumen (por día, por categoría y mes, por libro y por usuario) se mantienen
+    con triggers sobre 'prestamos': cada préstamo o devolución suma solo su incremento.
+    Los informes leen estas tablas en lugar de recorrer todo el historial de préstamos.
+"""
+import sqlite3
+import datetime
+from utils.path_utils import DATABASE_PATH
+from db.archivo import adjuntar_archivos, COLUMNAS_PRESTAMO
+from db.fechas import a_dia, DIA_JULIANO_EPOCA
+
+ESQUEMA_ESTADISTICAS = """
+-- Préstamos y devoluciones por día (número de día, ver db/fechas.py)
+CREATE TABLE IF NOT EXISTS estad_dia (
+    dia INTEGER PRIMARY KEY,
+    prestamos INTEGER NOT NULL DEFAULT 0,
+    devoluciones INTEGER NOT NULL DEFAULT 0
+);
+-- Préstamos por categoría y mes ('YYYY-MM')
+CREATE TABLE IF NOT EXISTS estad_categoria_mes (
+    categoria TEXT NOT NULL,
+    mes TEXT NOT NULL,
+    prestamos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (categoria, mes)
+);
+-- Préstamos acumulados por libro y por usuario
+CREATE TABLE IF NOT EXISTS estad_libro (
+    libro_id INTEGER PRIMARY KEY,
+    prestamos INTEGER NOT NULL DEFAULT 0,
+    ultimo_prestamo INTEGER -- Número de día
+);
+CREATE INDEX IF NOT EXISTS idx_estad_libro_prestamos ON estad_libro(prestamos);
+CREATE TABLE IF NOT EXISTS estad_usuario (
+    usuario_id INTEGER PRIMARY KEY,
+    prestamos INTEGER NOT NULL DEFAULT 0,
+    ultimo_prestamo INTEGER -- Número de día
+);
+CREATE INDEX IF NOT EXISTS idx_estad_usuario_prestamos ON estad_usuario(prestamos);
+
+-- Cada préstamo nuevo suma 1 en todas las tablas de resumen
+CREATE TRIGGER IF NOT EXISTS trg_estad_prestamo AFTER INSERT ON prestamos
+BEGIN
+    INSERT INTO estad_dia (dia, prestamos) VALUES (NEW.dia_prestamo, 1)
+        ON CONFLICT(dia) DO UPDATE SET prestamos = prestamos + 1;
+    INSERT INTO estad_categoria_mes (categoria, mes, prestamos)
+        VALUES (COALESCE((SELECT c.nombre FROM libros l JOIN categorias c ON c.id = l.categoria_id
+                          WHERE l.id = NEW.libro_id), ''),
+                strftime('%Y-%m', 2440587.5 + NEW.dia_prestamo), 1)
+        ON CONFLICT(categoria, mes) DO UPDATE SET prestamos = prestamos + 1;
+    INSERT INTO estad_libro (libro_id, prestamos, ultimo_prestamo) VALUES (NEW.libro_id, 1, NEW.dia_prestamo)
+        ON CONFLICT(libro_id) DO UPDATE SET prestamos = prestamos + 1, ultimo_prestamo = excluded.ultimo_prestamo;
+    INSERT INTO estad_usuario (usuario_id, prestamos, ultimo_prestamo) VALUES (NEW.usuario_id, 1, NEW.dia_prestamo)
+        ON CONFLICT(usuario_id) DO UPDATE SET prestamos = prestamos + 1, ultimo_prestamo = excluded.ultimo_prestamo;
+END;
+
+-- Préstamos por hora del día (0-23), para detectar las horas de más actividad.
+-- No se puede reconstruir desde el historial: 'prestamos' solo guarda la fecha.
+CREATE TABLE IF NOT EXISTS estad_hora (
+    hora INTEGER PRIMARY KEY,
+    prestamos INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS trg_estad_hora AFTER INSERT ON prestamos
+BEGIN
+    INSERT INTO estad_hora (hora, prestamos)
+        VALUES (CAST(strftime('%H', 'now', 'localtime') AS INTEGER), 1)
+        ON CONFLICT(hora) DO UPDATE SET prestamos = prestamos + 1;
+END;
+
+-- Cada devolución suma 1 en el día de la devolución
+CREATE TRIGGER IF NOT EXISTS trg_estad_devolucion AFTER UPDATE OF dia_devolucion ON prestamos
+WHEN OLD.dia_devolucion IS NULL AND NEW.dia_devolucion IS NOT NULL
+BEGIN
+    INSERT INTO estad_dia (dia, devoluciones) VALUES (NEW.dia_devolucion, 1)
+        ON CONFLICT(dia) DO UPDATE SET devoluciones = devoluciones + 1;
+END;
+"""
+
+# {prestamos}: la tabla 'prestamos' o, al reconstruir, la vista con los préstamos archivados incluidos
+_RECONSTRUIR_SQL = """
+DELETE FROM estad_dia;
+DELETE FROM estad_categoria_mes;
+DELETE FROM estad_libro;
+DELETE FROM estad_usuario;
+
+INSERT INTO estad_dia (dia, prestamos)
+    SELECT dia_prestamo, COUNT(*) FROM {prestamos} GROUP BY dia_prestamo;
+INSERT INTO estad_dia (dia, devoluciones)
+    SELECT dia_devolucion, COUNT(*) FROM {prestamos} WHERE dia_devolucion IS NOT NULL GROUP BY dia_devolucion
+    ON CONFLICT(dia) DO UPDATE SET devoluciones = excluded.devoluciones;
+INSERT INTO estad_categoria_mes (categoria, mes, prestamos)
+    SELECT COALESCE(c.nombre, ''), strftime('%Y-%m', 2440587.5 + p.dia_prestamo), COUNT(*)
+    FROM {prestamos} p
+    LEFT JOIN libros l ON l.id = p.libro_id
+    LEFT JOIN categorias c ON c.id = l.categoria_id
+    GROUP BY 1, 2;
+INSERT INTO estad_libro (libro_id, prestamos, ultimo_prestamo)
+    SELECT libro_id, COUNT(*), MAX(dia_prestamo) FROM {prestamos} GROUP BY libro_id;
+INSERT INTO estad_usuario (usuario_id, prestamos, ultimo_prestamo)
+    SELECT usuario_id, COUNT(*), MAX(dia_prestamo) FROM {prestamos} GROUP BY usuario_id;
+"""
+
+def _conectar(solo_lectura=False):
+    """
+    Abre una conexión a la base de datos. Las conexiones de solo lectura se usan desde
+    los hilos en segundo plano del panel de estadísticas.
+    """
+    if solo_lectura:
+        # Importación diferida: urllib.request (y http, email, ssl...) tarda decenas de ms en cargar
+        from urllib.request import pathname2url
+        return sqlite3.connect(f"file:{pathname2url(DATABASE_PATH)}?mode=ro", uri=True)
+    return sqlite3.connect(DATABASE_PATH)
+
+def crear_estadisticas(cursor):
+    """
+    Crea las tablas de resumen y sus triggers. Si no existían, las rellena a partir del
+    historial actual de préstamos (una sola vez). Se llama desde inicializar_db().
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'estad_libro'")
+    existian = cursor.fetchone() is not None
+    cursor.executescript(ESQUEMA_ESTADISTICAS)
+    if not existian:
+        cursor.executescript(_RECONSTRUIR_SQL.format(prestamos="prestamos"))
+
+def reconstruir_estadisticas():
+    """Recalcula todas las tablas de resumen desde el historial (reparación manual)."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        # Los préstamos archivados también cuentan en el historial. Un lote archivado pudo quedar
+        # copiado sin borrarse de main (caída a mitad: ver db/archivo.py): esos se cuentan solo una vez
+        ramas = [f"SELECT {COLUMNAS_PRESTAMO} FROM main.prestamos"]
+        ramas += [
+            f"SELECT {COLUMNAS_PRESTAMO} FROM {esquema}.prestamos a "
+            f"WHERE NOT EXISTS (SELECT 1 FROM main.prestamos m WHERE m.id = a.id)"
+            for esquema in adjuntar_archivos(conn)
+        ]
+        ramas = " UNION ALL ".join(ramas)
+        conn.execute(f"CREATE TEMP VIEW todos_prestamos AS {ramas}")
+        conn.executescript("BEGIN;" + _RECONSTRUIR_SQL.format(prestamos="todos_prestamos") + "COMMIT;")
+        return True
+    except Exception as e:
+        print(f"Error al reconstruir estadísticas: {e}")
+        if conn and conn.in_transaction:
+            conn.rollback()
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+# -------------------------------------------------------------
+# Informes
+# -------------------------------------------------------------
+
+def obtener_top_libros(limite=10, solo_lectura=False):
+    """Retorna los libros más prestados: (libro_id, titulo, autor, prestamos)."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = _conectar(solo_lectura)
+        cursor = conn.cursor()
+        # Recorre el índice por número de préstamos de mayor a menor y se detiene en 'limite'
+        cursor.execute(
+            """
+            SELECT e.libro_id, l.titulo, COALESCE(a.nombre, ''), e.prestamos
+            FROM estad_libro e
+            JOIN libros l ON l.id = e.libro_id
+            LEFT JOIN autores a ON a.id = l.autor_id
+            ORDER BY e.prestamos DESC
+            LIMIT ?
+            """,
+            (limite,)
+        )
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al obtener top de libros: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_top_usuarios(limite=10, solo_lectura=False):
+    """Retorna los lectores con más préstamos: (usuario_id, nombre, dni, prestamos)."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = _conectar(solo_lectura)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT e.usuario_id, u.nombre, u.dni, e.prestamos
+            FROM estad_usuario e
+            JOIN usuarios u ON u.id = e.usuario_id
+            ORDER BY e.prestamos DESC
+            LIMIT ?
+            """,
+            (limite,)
+        )
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al obtener top de usuarios: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_circulacion_por_mes(meses=12, solo_lectura=False):
+    """Retorna los últimos 'meses' meses con actividad: (mes 'YYYY-MM', prestamos, devoluciones)."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = _conectar(solo_lectura)
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT * FROM (
+                SELECT strftime('%Y-%m', {DIA_JULIANO_EPOCA} + dia) AS mes, SUM(prestamos), SUM(devoluciones)
+                FROM estad_dia
+                GROUP BY mes
+                ORDER BY mes DESC
+                LIMIT ?
+            ) ORDER BY mes
+            """,
+            (meses,)
+        )
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al obtener circulación por mes: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_rotacion_por_categoria(desde_mes=None, solo_lectura=False):
+    """
+    Retorna la rotación de cada categoría desde 'desde_mes' ('YYYY-MM', opcional):
+    (categoria, prestamos, libros_en_catalogo, prestamos_por_libro).
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = _conectar(solo_lectura)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT e.categoria, e.prestamos, COALESCE(c.libros, 0),
+                   ROUND(CAST(e.prestamos AS REAL) / MAX(COALESCE(c.libros, 0), 1), 2)
+            FROM (
+                SELECT categoria, SUM(prestamos) AS prestamos
+                FROM estad_categoria_mes
+                WHERE mes >= ?
+                GROUP BY categoria
+            ) e
+            LEFT JOIN (
+                SELECT COALESCE(c.nombre, '') AS categoria, COUNT(*) AS libros
+                FROM libros l LEFT JOIN categorias c ON c.id = l.categoria_id
+                GROUP BY l.categoria_id
+            ) c ON c.categoria = e.categoria
+            ORDER BY 4 DESC
+            """,
+            (desde_mes or "",)
+        )
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al obtener rotación por categoría: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_prestamos_por_hora(solo_lectura=False):
+    """Retorna los préstamos acumulados por hora del día: [(hora, prestamos)] de 0 a 23."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = _conectar(solo_lectura)
+        cursor = conn.cursor()
+        cursor.execute("SELECT hora, prestamos FROM estad_hora")
+        por_hora = dict(cursor.fetchall())
+        return [(hora, por_hora.get(hora, 0)) for hora in range(24)]
+    except Exception as e:
+        print(f"Error al obtener préstamos por hora: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_indicadores(hoy=None, solo_lectura=False):
+    """
+    Retorna los indicadores principales en un diccionario:
+    prestamos_activos, vencidos, prestamos_hoy, devoluciones_hoy, libros, usuarios.
+    Cada conteo usa un índice parcial o una tabla de resumen.
+    """
+    hoy = a_dia(hoy or datetime.date.today())
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = _conectar(solo_lectura)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM prestamos INDEXED BY idx_prestamos_libro_abiertos
+                 WHERE dia_devolucion IS NULL),
+                (SELECT COUNT(*) FROM prestamos INDEXED BY idx_prestamos_vencimiento
+                 WHERE dia_devolucion IS NULL AND dia_vencimiento < :hoy),
+                (SELECT COALESCE(SUM(prestamos), 0) FROM estad_dia WHERE dia = :hoy),
+                (SELECT COALESCE(SUM(devoluciones), 0) FROM estad_dia WHERE dia = :hoy),
+                (SELECT COUNT(*) FROM libros),
+                (SELECT COUNT(*) FROM usuarios)
+            """,
+            {"hoy": hoy}
+        )
+        fila = cursor.fetchone()
+        claves = ("prestamos_activos", "vencidos", "prestamos_hoy", "devoluciones_hoy", "libros", "usuarios")
+        return dict(zip(claves, fila))
+    except Exception as e:
+        print(f"Error al obtener indicadores: {e}")
+        return {}
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_total_prestamos_usuario(usuario_id):
+    """Número total de préstamos de un usuario, leído del contador (sin COUNT(*))."""
+    return _leer_contador("SELECT prestamos FROM estad_usuario WHERE usuario_id = ?", usuario_id)
+
+def obtener_total_prestamos_libro(libro_id):
+    """Número total de préstamos de un libro, leído del contador (sin COUNT(*))."""
+    return _leer_contador("SELECT prestamos FROM estad_libro WHERE libro_id = ?", libro_id)
+
+def _leer_contador(consulta, clave):
+    """Lee un contador de las tablas de resumen; 0 si no existe."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = _conectar()
+        cursor = conn.cursor()
+        cursor.execute(consulta, (clave,))
+        fila = cursor.fetchone()
+        return fila[0] if fila else 0
+    except Exception as e:
+        print(f"Error al leer contador de préstamos: {e}")
+        return 0
+    finally:
+        if conn:
+            conn.close()
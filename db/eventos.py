@@ -0,0 +1,46 @@
+"""
+    Eventos de cambios en los datos (publicar/suscribir).
+    Las funciones de db/ publican un evento después de confirmar cada alta, cambio o baja de
+    libros, lectores y préstamos, para que los índices en memoria (p. ej. la búsqueda global)
+    se actualicen sin recargar todo.
+    Los suscriptores se llaman en el hilo que publicó el evento, que puede no ser el de Tk:
+    deben ser rápidos y seguros entre hilos (lo normal es encolar el evento y salir).
+"""
+from threading import Lock
+
+# Temas
+LIBRO = "libro"
+USUARIO = "usuario"
+PRESTAMO = "prestamo"
+
+# Acciones
+ALTA = "alta"
+CAMBIO = "cambio" # Incluye los cambios de disponibilidad y las devoluciones
+BAJA = "baja"
+
+_suscriptores = {} # tema -> [funcion(tema, accion, id_)]
+_lock = Lock()
+
+
+def suscribir(tema, funcion):
+    """Registra funcion(tema, accion, id_) para los eventos de un tema."""
+    with _lock:
+        _suscriptores.setdefault(tema, []).append(funcion)
+
+def cancelar_suscripcion(tema, funcion):
+    """Deja de enviar a 'funcion' los eventos del tema."""
+    with _lock:
+        if funcion in _suscriptores.get(tema, []):
+            _suscriptores[tema].remove(funcion)
+
+def publicar(tema, accion, *ids):
+    """Notifica a los suscriptores del tema el cambio de uno o varios registros."""
+    with _lock:
+        funciones = list(_suscriptores.get(tema, []))
+    for id_ in ids:
+        for funcion in funciones:
+            try:
+                funcion(tema, accion, id_)
+            except Exception as e:
+                # Un suscriptor con errores no debe deshacer ni bloquear la operación que publicó
+                print(f"Error al notificar el evento {tema}/{accion}: {e}")
@@ -0,0 +1,71 @@
+"""
+    Codificación de fechas como número de día.
+    Las fechas de préstamos, multas, festivos y estadísticas se guardan como INTEGER: días desde
+    el 1970-01-01. Comparar, ordenar y restar fechas es aritmética entera y los índices ocupan
+    menos que con texto 'YYYY-MM-DD'. Las funciones de acceso a datos reciben y devuelven
+    datetime.date; la conversión se hace solo aquí.
+"""
+import datetime
+
+EPOCA = datetime.date(1970, 1, 1)
+
+# Día juliano del 1970-01-01: en SQL, date(DIA_JULIANO_EPOCA + dia) da el texto 'YYYY-MM-DD'
+DIA_JULIANO_EPOCA = 2440587.5
+
+def sql_a_texto(columna):
+    """Expresión SQL que convierte un número de día en texto 'YYYY-MM-DD' (NULL si es NULL)."""
+    return f"date({DIA_JULIANO_EPOCA} + {columna})"
+
+def sql_a_dia(columna):
+    """Expresión SQL que convierte un texto 'YYYY-MM-DD' en número de día (NULL si es NULL)."""
+    return f"CAST(julianday({columna}) - {DIA_JULIANO_EPOCA} AS INTEGER)"
+
+def a_dia(fecha):
+    """datetime.date -> número de día. None se mantiene."""
+    if fecha is None:
+        return None
+    if isinstance(fecha, datetime.datetime):
+        fecha = fecha.date()
+    return (fecha - EPOCA).days
+
+def a_fecha(dia):
+    """Número de día -> datetime.date. None se mantiene."""
+    if dia is None:
+        return None
+    return EPOCA + datetime.timedelta(days=dia)
+
+def hoy():
+    """Número de día de hoy."""
+    return a_dia(datetime.date.today())
+
+def migrar_prestamos_a_dias(cursor):
+    """
+    Convierte en el sitio las columnas fecha_prestamo/devolucion/vencimiento (texto) de la
+    tabla 'prestamos' de la conexión en dia_* (número de día) y añade las columnas de texto
+    generadas. RENAME COLUMN reescribe también los índices que las usaban.
+    No hace nada si la tabla ya está convertida. Retorna True si se convirtió.
+    """
+    cursor.execute("PRAGMA table_info(prestamos)")
+    columnas = {fila[1] for fila in cursor.fetchall()} # table_info no muestra las generadas
+    if "dia_prestamo" in columnas or "fecha_prestamo" not in columnas:
+        return False
+
+    nombres = ("prestamo", "devolucion", "vencimiento")
+    for nombre in nombres:
+        cursor.execute(f"ALTER TABLE prestamos RENAME COLUMN fecha_{nombre} TO dia_{nombre}")
+    cursor.execute(
+        "UPDATE prestamos SET " + ", ".join(f"dia_{nombre} = {sql_a_dia(f'dia_{nombre}')}" for nombre in nombres)
+    )
+    for nombre in nombres:
+        cursor.execute(
+            f"ALTER TABLE prestamos ADD COLUMN fecha_{nombre} TEXT "
+            f"GENERATED ALWAYS AS ({sql_a_texto(f'dia_{nombre}')}) VIRTUAL"
+        )
+    return True
+
+def convertir_filas(filas, *posiciones):
+    """Convierte a datetime.date las columnas 'posiciones' (números de día) de cada fila."""
+    return [
+        tuple(a_fecha(valor) if i in posiciones else valor for i, valor in enumerate(fila))
+        for fila in filas
+    ]
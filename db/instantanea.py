@@ -0,0 +1,158 @@
+"""
+    Instantánea binaria del catálogo para un arranque inmediato.
+    Al cerrar la aplicación se guardan las filas de obtener_todos_los_libros() en un archivo por
+    columnas (enteros de 64 bits y textos UTF-8 separados por NUL), junto con la versión
+    del catálogo en ese momento. Al abrir la vista de Biblioteca se lee con mmap y se pinta
+    sin consultar la base de datos; después, en segundo plano, se piden solo los libros cambiados
+    desde esa versión y se aplican.
+    La versión la mantienen triggers sobre 'libros': cada alta, cambio o baja anota el id del
+    libro con una versión nueva en 'catalogo_cambios'. Un libro anotado que ya no existe es una
+    baja (marca de borrado).
+"""
+import mmap
+import os
+import struct
+from array import array
+from utils.path_utils import DATABASE_PATH
+from db.fechas import a_dia, a_fecha
+
+RUTA_INSTANTANEA = os.path.join(os.path.dirname(DATABASE_PATH), "catalogo.snap")
+
+_MAGIA = b"BGCT"
+_FORMATO = 1 # Se incrementa al cambiar las columnas o su codificación
+_CABECERA = struct.Struct("<4sHqI") # magia, formato, versión del catálogo, número de filas
+_NULO = -(2 ** 63) # Valor de un entero None
+_SEPARADOR = "\x00" # Separador de los valores de una columna de texto
+
+# Columnas de las filas de obtener_todos_los_libros(), en orden: "t" texto, "i" entero, "d" fecha
+_TIPOS = "tttt" + "iiiid" + "tt"
+
+
+def crear_registro_cambios(cursor):
+    """Crea la tabla de cambios del catálogo y sus triggers (si no existen)."""
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS catalogo_cambios (
+            libro_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_catalogo_cambios_version ON catalogo_cambios(version);
+
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_alta AFTER INSERT ON libros BEGIN
+            INSERT INTO catalogo_cambios (libro_id, version)
+            VALUES (NEW.id, (SELECT coalesce(max(version), 0) + 1 FROM catalogo_cambios))
+            ON CONFLICT(libro_id) DO UPDATE SET version = excluded.version;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_cambio AFTER UPDATE ON libros BEGIN
+            INSERT INTO catalogo_cambios (libro_id, version)
+            VALUES (NEW.id, (SELECT coalesce(max(version), 0) + 1 FROM catalogo_cambios))
+            ON CONFLICT(libro_id) DO UPDATE SET version = excluded.version;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_baja AFTER DELETE ON libros BEGIN
+            INSERT INTO catalogo_cambios (libro_id, version)
+            VALUES (OLD.id, (SELECT coalesce(max(version), 0) + 1 FROM catalogo_cambios))
+            ON CONFLICT(libro_id) DO UPDATE SET version = excluded.version;
+        END;
+    """)
+
+def version_catalogo(cursor):
+    """Versión actual del catálogo (0 si no ha habido cambios)."""
+    cursor.execute("SELECT coalesce(max(version), 0) FROM catalogo_cambios")
+    return cursor.fetchone()[0]
+
+def cambios_desde(cursor, version):
+    """Ids de los libros dados de alta, cambiados o borrados después de 'version'."""
+    cursor.execute("SELECT libro_id FROM catalogo_cambios WHERE version > ?", (version,))
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def escribir_instantanea(version, filas, ruta=RUTA_INSTANTANEA):
+    """Guarda las filas del catálogo (escritura atómica: archivo temporal y reemplazo)."""
+    columnas = list(zip(*filas)) if filas else [()] * len(_TIPOS)
+    partes = [_CABECERA.pack(_MAGIA, _FORMATO, version, len(filas))]
+    for tipo, valores in zip(_TIPOS, columnas):
+        if tipo == "t":
+            # Columna de texto: un solo bloque que se separa con split() al leer (mucho más rápido
+            # que cortar cada valor); un texto con NUL no se puede guardar así
+            texto = _SEPARADOR.join(valor or "" for valor in valores)
+            if texto.count(_SEPARADOR) != max(len(filas) - 1, 0):
+                raise ValueError("texto con carácter NUL")
+            datos = texto.encode("utf-8")
+            partes += [struct.pack("<q", len(datos)), datos]
+        else:
+            if tipo == "d":
+                valores = (a_dia(fecha) for fecha in valores)
+            partes.append(array("q", (_NULO if valor is None else valor for valor in valores)).tobytes())
+
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as archivo:
+        for parte in partes:
+            archivo.write(parte)
+    os.replace(temporal, ruta)
+
+def leer_instantanea(ruta=RUTA_INSTANTANEA):
+    """
+    Lee la instantánea con mmap. Retorna (version, filas) o None si no existe o no es válida
+    (otro formato, archivo truncado...).
+    """
+    try:
+        with open(ruta, "rb") as archivo, mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            return _decodificar(datos)
+    except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Error al leer la instantánea del catálogo: {e}")
+        return None
+
+def _decodificar(datos):
+    """(version, filas) a partir del contenido del archivo; None si es de otro formato."""
+    magia, formato, version, n = _CABECERA.unpack_from(datos, 0)
+    if magia != _MAGIA or formato != _FORMATO:
+        return None
+    posicion = _CABECERA.size
+    columnas = []
+    for tipo in _TIPOS:
+        if tipo == "t":
+            (longitud,) = struct.unpack_from("<q", datos, posicion)
+            posicion += 8
+            valores = datos[posicion:posicion + longitud].decode("utf-8").split(_SEPARADOR)
+            posicion += longitud
+            if len(valores) != max(n, 1):
+                raise ValueError("columna de texto incompleta")
+        else:
+            valores = _enteros(datos, posicion, n)
+            posicion += n * 8
+            if tipo == "d":
+                # Pocas fechas distintas: se convierte cada una una sola vez
+                fechas = {v: None if v == _NULO else a_fecha(v) for v in set(valores)}
+                valores = [fechas[v] for v in valores]
+            elif _NULO in valores:
+                valores = [None if v == _NULO else v for v in valores]
+        columnas.append(valores)
+    if posicion != len(datos):
+        raise ValueError("tamaño inesperado")
+    return version, list(zip(*columnas)) if n else []
+
+def _enteros(datos, posicion, n):
+    """Lista de n enteros de 64 bits a partir de 'posicion'."""
+    if posicion + n * 8 > len(datos):
+        raise ValueError("archivo truncado")
+    valores = array("q")
+    valores.frombytes(datos[posicion:posicion + n * 8])
+    return valores.tolist()
+
+
+def fusionar(filas, cambiados, nuevas):
+    """
+    Aplica a las filas de la instantánea las filas releídas de los libros cambiados.
+    Los cambiados que no están en 'nuevas' se han borrado; los que no estaban se añaden al final.
+    """
+    cambiados = set(cambiados)
+    por_id = {fila[5]: fila for fila in nuevas}
+    resultado = []
+    for fila in filas:
+        if fila[5] in cambiados:
+            fila = por_id.pop(fila[5], None)
+            if fila is None:
+                continue # Baja
+        resultado.append(fila)
+    resultado.extend(por_id.values())
+    return resultado
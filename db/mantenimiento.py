@@ -0,0 +1,249 @@
+"""
+    Mantenimiento de la base de datos en tiempo de inactividad.
+    Ejecuta las tareas pendientes (estadísticas del planificador, checkpoint del WAL, vacuum
+    incremental y comprobación rápida de integridad), cada una con un presupuesto de tiempo, y anota
+    en 'registro_mantenimiento' cuánto tardó y cuánto espacio recuperó. Una tarea interrumpida por
+    su presupuesto (o porque se volvió a usar la aplicación) no cuenta como ejecutada: se reintenta
+    en la siguiente ronda.
+    El VACUUM completo bloquea las escrituras mientras dura, así que solo lo hace la orden
+    'maintenance' de la línea de órdenes (completo=True), nunca las rondas en inactividad.
+    La comprobación completa (PRAGMA integrity_check) se hace sobre cada copia de seguridad (db/copias.py).
+    Nunca se ejecuta con una transacción de escritura abierta por otra conexión.
+"""
+import os
+import time
+import sqlite3
+import datetime
+from utils.path_utils import DATABASE_PATH
+from db.consistencia import reparar_disponibilidad
+from config import (MAINTENANCE_TASK_BUDGET_S, MAINTENANCE_RUN_BUDGET_S, MAINTENANCE_LONG_TASK_BUDGET_S,
+                    VACUUM_MIN_FREE_RATIO)
+
+# Filas que examina ANALYZE por índice (análisis aproximado y acotado)
+ANALYSIS_LIMIT = 1000
+# Páginas liberadas por cada paso de vacuum incremental
+VACUUM_PASO_PAGINAS = 256
+# Días que se conservan en el registro de mantenimiento
+DIAS_REGISTRO = 180
+
+
+def _analizar(conn):
+    """Recalcula las estadísticas del planificador de consultas (ANALYZE acotado)."""
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    return 0
+
+def _optimizar(conn):
+    """PRAGMA optimize: ANALYZE solo de las tablas cuyas estadísticas han quedado desfasadas."""
+    conn.execute("PRAGMA optimize")
+    return 0
+
+def _checkpoint(conn):
+    """Vuelca el WAL a la base de datos y lo trunca. Retorna los bytes liberados del -wal."""
+    ruta_wal = DATABASE_PATH + "-wal"
+    antes = os.path.getsize(ruta_wal) if os.path.exists(ruta_wal) else 0
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    despues = os.path.getsize(ruta_wal) if os.path.exists(ruta_wal) else 0
+    return max(antes - despues, 0)
+
+def _vacuum(conn):
+    """
+    Devuelve al sistema las páginas libres por pasos cortos (auto_vacuum=INCREMENTAL; sin él
+    no hace nada hasta que _vacuum_completo convierta la base). Retorna los bytes recuperados.
+    """
+    tamano_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+    paginas_antes = conn.execute("PRAGMA page_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2: # INCREMENTAL
+        return 0
+    while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+        # executescript ejecuta el pragma hasta el final (execute solo libera una página)
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PASO_PAGINAS})")
+    paginas_despues = conn.execute("PRAGMA page_count").fetchone()[0]
+    return (paginas_antes - paginas_despues) * tamano_pagina
+
+def _vacuum_completo(conn):
+    """
+    Si la base aún no tiene auto_vacuum=INCREMENTAL y hay mucho espacio libre, la convierte con
+    un VACUUM completo (conversión única: después basta con _vacuum). Retorna los bytes recuperados.
+    """
+    tamano_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+    paginas_antes = conn.execute("PRAGMA page_count").fetchone()[0]
+    libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2 or libres < paginas_antes * VACUUM_MIN_FREE_RATIO:
+        return 0
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    paginas_despues = conn.execute("PRAGMA page_count").fetchone()[0]
+    return (paginas_antes - paginas_despues) * tamano_pagina
+
+def _integridad(conn):
+    """
+    Comprobación rápida de integridad (quick_check: no verifica que los índices coincidan con
+    las tablas, lo que la hace mucho más rápida). Lanza un error si encuentra problemas.
+    """
+    resultado = [fila[0] for fila in conn.execute("PRAGMA quick_check").fetchall()]
+    if resultado != ["ok"]:
+        raise sqlite3.DatabaseError("; ".join(resultado[:5]))
+    return 0
+
+def _conciliar(conn):
+    """Corrige libros.disponible donde no coincide con los préstamos abiertos."""
+    corregidos = reparar_disponibilidad(conn=conn)
+    if corregidos:
+        print(f"Mantenimiento: corregida la disponibilidad de {corregidos} libro(s).")
+    return 0
+
+# (nombre, intervalo en horas, función, presupuesto en segundos, solo con completo=True).
+# Se ejecutan en este orden. quick_check recorre toda la base: con el presupuesto normal no
+# terminaría nunca en las bases grandes, así que tiene el suyo (no limitado por el de la ronda);
+# solo lee, no bloquea las escrituras (WAL) y se detiene en cuanto vuelve la actividad.
+# El VACUUM completo sí bloquea las escrituras todo el tiempo que dura: solo desde la línea de órdenes.
+TAREAS = (
+    ("disponibilidad", 24, _conciliar, MAINTENANCE_TASK_BUDGET_S, False),
+    ("optimize", 24, _optimizar, MAINTENANCE_TASK_BUDGET_S, False),
+    ("analyze", 24 * 7, _analizar, MAINTENANCE_TASK_BUDGET_S, False),
+    ("checkpoint", 1, _checkpoint, MAINTENANCE_TASK_BUDGET_S, False),
+    ("vacuum", 24, _vacuum, MAINTENANCE_TASK_BUDGET_S, False),
+    ("vacuum_completo", 24, _vacuum_completo, MAINTENANCE_LONG_TASK_BUDGET_S, True),
+    ("quick_check", 24 * 7, _integridad, MAINTENANCE_LONG_TASK_BUDGET_S, False),
+)
+
+
+def ejecutar_mantenimiento(presupuesto_s=MAINTENANCE_RUN_BUDGET_S, completo=False, interrumpir=None):
+    """
+    Ejecuta las tareas cuyo intervalo ha vencido, hasta agotar 'presupuesto_s' en total.
+    completo=True (orden 'maintenance' de la línea de órdenes) incluye el VACUUM completo.
+    interrumpir: función sin argumentos que retorna True para detener la tarea en curso y la
+    ronda (p. ej. cuando se vuelve a usar la aplicación).
+    Retorna la lista de (tarea, resultado) ejecutadas.
+    """
+    ejecutadas = []
+    conn = None
+    try:
+        # Autocommit y sin espera: si otra conexión está escribiendo, se deja para más tarde
+        conn = sqlite3.connect(DATABASE_PATH, isolation_level=None, timeout=0)
+        fin_ronda = time.monotonic() + presupuesto_s
+        ultimas = _ultimas_ejecuciones(conn)
+
+        for nombre, intervalo_horas, funcion, presupuesto_tarea, solo_completo in TAREAS:
+            if solo_completo and not completo:
+                continue
+            ultima = ultimas.get(nombre)
+            if ultima and datetime.datetime.now() - ultima < datetime.timedelta(hours=intervalo_horas):
+                continue
+            restante = fin_ronda - time.monotonic()
+            if restante <= 0 or (interrumpir and interrumpir()):
+                break
+            if _hay_transaccion_activa(conn):
+                break
+
+            if presupuesto_tarea <= MAINTENANCE_TASK_BUDGET_S:
+                presupuesto_tarea = min(presupuesto_tarea, restante)
+            resultado, duracion_ms, recuperados = _ejecutar_tarea(conn, nombre, funcion, presupuesto_tarea,
+                                                                  interrumpir)
+            _registrar(conn, nombre, duracion_ms, recuperados, resultado)
+            ejecutadas.append((nombre, resultado))
+        return ejecutadas
+    except Exception as e:
+        print(f"Error en el mantenimiento de la base de datos: {e}")
+        return ejecutadas
+    finally:
+        if conn:
+            conn.close()
+
+def _hay_transaccion_activa(conn):
+    """True si otra conexión tiene una transacción de escritura abierta (BEGIN IMMEDIATE falla al instante)."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ROLLBACK")
+        return False
+    except sqlite3.OperationalError:
+        return True
+
+def _ejecutar_tarea(conn, nombre, funcion, presupuesto_s, interrumpir=None):
+    """
+    Ejecuta una tarea interrumpiéndola si supera su presupuesto o si interrumpir() retorna True
+    (el manejador de progreso de SQLite aborta la sentencia en curso y deshace sus cambios).
+    Retorna (resultado, duracion_ms, bytes_recuperados).
+    """
+    inicio = time.monotonic()
+    limite = inicio + presupuesto_s
+    motivo = [] # Por qué se detuvo: "presupuesto" o "actividad"
+
+    def detener():
+        if time.monotonic() > limite:
+            motivo.append("presupuesto")
+        elif interrumpir and interrumpir():
+            motivo.append("actividad")
+        return bool(motivo)
+
+    conn.set_progress_handler(detener, 1000)
+    recuperados = 0
+    try:
+        recuperados = funcion(conn)
+        resultado = "ok"
+    except sqlite3.OperationalError as e:
+        if motivo:
+            resultado = "interrumpida"
+        elif "locked" in str(e) or "busy" in str(e):
+            resultado = "omitida"
+        else:
+            resultado = f"error: {e}"
+    except sqlite3.DatabaseError as e:
+        resultado = f"error: {e}"
+    finally:
+        conn.set_progress_handler(None, 0)
+        if conn.in_transaction:
+            conn.rollback()
+    duracion_ms = int((time.monotonic() - inicio) * 1000)
+    if resultado.startswith("error"):
+        print(f"Mantenimiento: {resultado}")
+    elif resultado == "interrumpida" and motivo[0] == "actividad":
+        print(f"Mantenimiento: {nombre} se detuvo porque se volvió a usar la aplicación; se reintentará.")
+    elif resultado == "interrumpida":
+        print(f"Mantenimiento: {nombre} no terminó en {presupuesto_s:.0f} s; se reintentará en la siguiente ronda.")
+    return resultado, duracion_ms, recuperados
+
+def _ultimas_ejecuciones(conn):
+    """{tarea: datetime de su última ejecución}. Las omitidas y las interrumpidas no cuentan."""
+    cursor = conn.execute(
+        "SELECT tarea, MAX(fecha) FROM registro_mantenimiento "
+        "WHERE resultado NOT IN ('omitida', 'interrumpida') GROUP BY tarea"
+    )
+    return {tarea: datetime.datetime.fromisoformat(fecha) for tarea, fecha in cursor.fetchall()}
+
+def _registrar(conn, tarea, duracion_ms, bytes_recuperados, resultado):
+    """Anota la ejecución de una tarea y purga las anotaciones antiguas."""
+    try:
+        conn.execute(
+            "INSERT INTO registro_mantenimiento (fecha, tarea, duracion_ms, bytes_recuperados, resultado) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (datetime.datetime.now().isoformat(timespec="seconds"), tarea, duracion_ms, bytes_recuperados, resultado)
+        )
+        conn.execute(
+            "DELETE FROM registro_mantenimiento WHERE fecha < ?",
+            ((datetime.datetime.now() - datetime.timedelta(days=DIAS_REGISTRO)).isoformat(timespec="seconds"),)
+        )
+    except sqlite3.OperationalError as e:
+        # Si alguien empezó a escribir justo ahora, la anotación se pierde pero la tarea ya se hizo
+        print(f"Error al registrar el mantenimiento: {e}")
+
+def obtener_registro_mantenimiento(limite=50):
+    """Retorna las últimas ejecuciones: (fecha, tarea, duracion_ms, bytes_recuperados, resultado)."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT fecha, tarea, duracion_ms, bytes_recuperados, resultado "
+            "FROM registro_mantenimiento ORDER BY id DESC LIMIT ?",
+            (limite,)
+        )
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al obtener el registro de mantenimiento: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
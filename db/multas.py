@@ -0,0 +1,181 @@
+"""
+    Motor de multas por retraso.
+    Las multas de todos los préstamos abiertos vencidos se calculan en una sola sentencia SQL
+    (días de retraso descontando los días festivos, días de gracia, tarifa diaria y tope)
+    y se guardan en la tabla 'multas'. Al devolver un libro su multa queda fijada (cerrada = 1).
+    Los importes se guardan en céntimos.
+"""
+import sqlite3
+import datetime
+from utils.path_utils import DATABASE_PATH
+from db.fechas import a_dia
+from config import FINE_PER_DAY_CENTS, FINE_GRACE_DAYS, FINE_CAP_CENTS
+
+# Días de retraso: días naturales desde el vencimiento menos los festivos de ese intervalo
+# (las fechas son números de día: la diferencia es una resta entera)
+_DIAS_RETRASO_SQL = """
+    :hoy - p.dia_vencimiento
+    - (SELECT COUNT(*) FROM dias_festivos f
+       WHERE f.dia > p.dia_vencimiento AND f.dia <= :hoy)
+"""
+
+_CALCULAR_MULTAS_SQL = f"""
+INSERT INTO multas (prestamo_id, usuario_id, dias_retraso, importe, dia_calculo, cerrada)
+SELECT id, usuario_id, dias, MIN(MAX(dias - :gracia, 0) * :tarifa, :tope), :hoy, :cerrada
+FROM (
+    SELECT p.id, p.usuario_id, {_DIAS_RETRASO_SQL} AS dias
+    FROM prestamos p
+    WHERE {{filtro}}
+)
+WHERE dias > 0
+ON CONFLICT(prestamo_id) DO UPDATE SET
+    dias_retraso = excluded.dias_retraso,
+    importe = excluded.importe,
+    dia_calculo = excluded.dia_calculo,
+    cerrada = excluded.cerrada
+WHERE multas.cerrada = 0
+"""
+
+def _parametros(hoy, cerrada=0):
+    """Parámetros comunes de las sentencias de cálculo ('hoy' es un datetime.date)."""
+    return {
+        "hoy": a_dia(hoy),
+        "gracia": FINE_GRACE_DAYS,
+        "tarifa": FINE_PER_DAY_CENTS,
+        "tope": FINE_CAP_CENTS,
+        "cerrada": cerrada,
+    }
+
+def calcular_multas(hoy=None):
+    """
+    Recalcula en lote las multas de todos los préstamos abiertos vencidos.
+    Las multas cerradas (préstamos ya devueltos) no se modifican.
+    Retorna el número de multas insertadas o actualizadas, o None si hubo un error.
+    """
+    hoy = hoy or datetime.date.today()
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        # Recorre solo el rango de préstamos abiertos vencidos del índice por vencimiento
+        sql = _CALCULAR_MULTAS_SQL.format(
+            filtro="p.dia_devolucion IS NULL AND p.dia_vencimiento < :hoy"
+        )
+        cursor.execute(sql, _parametros(hoy))
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"Error al calcular multas: {e}")
+        if conn:
+            conn.rollback()
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def cerrar_multa(cursor, prestamo_id, fecha_devolucion):
+    """
+    Fija la multa definitiva de un préstamo al devolverlo.
+    Se ejecuta con el cursor de la transacción de devolución (no hace commit).
+    """
+    sql = _CALCULAR_MULTAS_SQL.format(
+        filtro="p.id = :prestamo_id AND p.dia_vencimiento < :hoy"
+    )
+    parametros = _parametros(fecha_devolucion, cerrada=1)
+    parametros["prestamo_id"] = prestamo_id
+    cursor.execute(sql, parametros)
+
+    # Si se devolvió dentro del plazo (o de los festivos) pero tenía una multa abierta, se anula
+    cursor.execute(
+        "UPDATE multas SET importe = 0, dias_retraso = 0, dia_calculo = ?, cerrada = 1 "
+        "WHERE prestamo_id = ? AND cerrada = 0",
+        (a_dia(fecha_devolucion), prestamo_id)
+    )
+
+def obtener_multas_abiertas():
+    """
+    Retorna {prestamo_id: (dias_retraso, importe_en_centimos)} de los préstamos abiertos con multa.
+    Los días de retraso son los del último cálculo (sin festivos).
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute("SELECT prestamo_id, dias_retraso, importe FROM multas WHERE cerrada = 0")
+        return {fila[0]: (fila[1], fila[2]) for fila in cursor.fetchall()}
+    except Exception as e:
+        print(f"Error al obtener multas abiertas: {e}")
+        return {}
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_multas_por_usuario():
+    """
+    Suma las multas de cada usuario.
+    Retorna {usuario_id: (importe_abierto, importe_total)} en céntimos.
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT usuario_id,
+                   SUM(CASE WHEN cerrada = 0 THEN importe ELSE 0 END),
+                   SUM(importe)
+            FROM multas
+            GROUP BY usuario_id
+            """
+        )
+        return {fila[0]: (fila[1], fila[2]) for fila in cursor.fetchall()}
+    except Exception as e:
+        print(f"Error al obtener multas por usuario: {e}")
+        return {}
+    finally:
+        if conn:
+            conn.close()
+
+def agregar_dia_festivo(fecha, descripcion=""):
+    """Añade un día cerrado al calendario (no cuenta como día de retraso)."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO dias_festivos (dia, descripcion) VALUES (?, ?)",
+            (a_dia(fecha), descripcion)
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error al agregar día festivo: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def eliminar_dia_festivo(fecha):
+    """Quita un día del calendario de días cerrados."""
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM dias_festivos WHERE dia = ?", (a_dia(fecha),))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error al eliminar día festivo: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+def formatear_importe(centimos):
+    """Convierte un importe en céntimos a texto ('1.50')."""
+    return f"{(centimos or 0) / 100:.2f}"
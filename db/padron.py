@@ -0,0 +1,258 @@
+"""
+    Sincronización de los lectores con el padrón anual de alumnos (CSV con nombre, dni y,
+    opcionalmente, telefono).
+    El padrón se lee fila a fila y se compara por DNI con la tabla 'usuarios':
+      - nuevos: DNI que no estaban -> se insertan;
+      - cambiados: nombre o teléfono distintos (o marcados que vuelven) -> se actualizan;
+      - ausentes: lectores que ya no figuran -> se eliminan, salvo que tengan préstamos abiertos
+        o multas (borrarlos dejaría huérfanas sus filas de 'multas'): esos se marcan
+        (usuarios.marcado_baja = 1). Un lector marcado no puede llevarse libros (checkout()).
+    Solo se escriben las diferencias, con upserts por lotes (executemany ... ON CONFLICT(dni)),
+    cada lote en su propia transacción. Si se interrumpe, basta con volver a sincronizar:
+    lo ya aplicado deja de ser una diferencia.
+"""
+import csv
+import sqlite3
+from utils.path_utils import DATABASE_PATH
+from utils.normalizacion import normalizar
+from db import eventos
+from db.eventos import publicar
+from config import ROSTER_BATCH_SIZE, ROSTER_REPORT_LIMIT
+
+_UPSERT_SQL = """
+INSERT INTO usuarios (nombre, dni, telefono, nombre_norm, marcado_baja) VALUES (?, ?, ?, ?, 0)
+ON CONFLICT(dni) DO UPDATE SET
+    nombre = excluded.nombre,
+    telefono = COALESCE(excluded.telefono, usuarios.telefono),
+    nombre_norm = excluded.nombre_norm,
+    marcado_baja = 0
+"""
+
+# Solo se borra si sigue sin préstamos abiertos ni multas (pudo prestarse algo, o calcularse
+# una multa, después de calcular las diferencias)
+_BORRAR_SQL = """
+DELETE FROM usuarios
+WHERE id = ? AND NOT EXISTS (
+    SELECT 1 FROM prestamos p WHERE p.usuario_id = usuarios.id AND p.dia_devolucion IS NULL
+) AND NOT EXISTS (
+    SELECT 1 FROM multas m WHERE m.usuario_id = usuarios.id
+)
+"""
+
+
+class DiferenciasPadron:
+    """Diferencias entre el padrón y la tabla 'usuarios' (lo que haría la sincronización)."""
+    def __init__(self):
+        self.nuevos = [] # (nombre, dni, telefono)
+        self.cambiados = [] # (usuario_id, nombre, dni, telefono, nombre_anterior, telefono_anterior)
+        self.ausentes = [] # (usuario_id, nombre, dni): se eliminan
+        self.marcados = [] # (usuario_id, nombre, dni, prestamos_abiertos, multas): se marcan como baja
+        self.ya_marcados = 0 # Ausentes con préstamos o multas que ya estaban marcados
+        self.sin_cambios = 0
+        self.invalidas = [] # (número de fila, motivo)
+
+    def hay_cambios(self):
+        return bool(self.nuevos or self.cambiados or self.ausentes or self.marcados)
+
+    def informe(self, limite=ROSTER_REPORT_LIMIT, borrar_ausentes=True):
+        """Texto con el resumen y los primeros 'limite' lectores de cada apartado."""
+        lineas = [
+            f"Nuevos: {len(self.nuevos)}",
+            f"Cambiados: {len(self.cambiados)}",
+            f"Sin cambios: {self.sin_cambios}",
+            f"Ausentes sin préstamos ni multas ({'se eliminan' if borrar_ausentes else 'se conservan'}): {len(self.ausentes)}",
+            f"Ausentes con préstamos abiertos o multas (se marcan como baja): {len(self.marcados)}"
+            f" (y {self.ya_marcados} ya marcados)",
+            f"Filas no válidas: {len(self.invalidas)}",
+        ]
+        apartados = (
+            ("Nuevos", [f"{dni}  {nombre}" for nombre, dni, _ in self.nuevos]),
+            ("Cambiados", [_describir_cambio(*fila) for fila in self.cambiados]),
+            ("Ausentes", [f"{dni}  {nombre}" for _, nombre, dni in self.ausentes]),
+            ("Marcados como baja", [f"{dni}  {nombre} ({abiertos} préstamos abiertos, {multas} multas)"
+                                    for _, nombre, dni, abiertos, multas in self.marcados]),
+            ("Filas no válidas", [f"fila {numero}: {motivo}" for numero, motivo in self.invalidas]),
+        )
+        for titulo, filas in apartados:
+            if not filas:
+                continue
+            lineas += ["", f"{titulo}:"] + [f"  {fila}" for fila in filas[:limite]]
+            if len(filas) > limite:
+                lineas.append(f"  ... y {len(filas) - limite} más")
+        return "\n".join(lineas)
+
+
+def _describir_cambio(usuario_id, nombre, dni, telefono, nombre_anterior, telefono_anterior):
+    telefono = telefono_anterior if telefono is None else telefono
+    if nombre == nombre_anterior and (telefono or "") == (telefono_anterior or ""):
+        # Solo cambia la marca de baja
+        return f"{dni}  {nombre} (vuelve al padrón: se quita la marca de baja)"
+    return f"{dni}  {nombre_anterior} ({telefono_anterior or '-'}) -> {nombre} ({telefono or '-'})"
+
+def leer_padron(ruta):
+    """
+    Recorre el CSV del padrón sin cargarlo entero. Produce (número de fila, nombre, dni, telefono);
+    telefono es None si el padrón no tiene esa columna (el teléfono guardado no se toca).
+    Lanza ValueError si faltan las columnas nombre o dni.
+    """
+    # utf-8-sig: acepta los CSV guardados desde Excel (con BOM)
+    with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+        lector = csv.DictReader(archivo)
+        columnas = lector.fieldnames or ()
+        faltan = [c for c in ("nombre", "dni") if c not in columnas]
+        if faltan:
+            raise ValueError(f"faltan las columnas {', '.join(faltan)} en la cabecera del padrón")
+        con_telefono = "telefono" in columnas
+        for numero, fila in enumerate(lector, start=2): # La fila 1 es la cabecera
+            telefono = (fila.get("telefono") or "").strip() if con_telefono else None
+            yield numero, (fila.get("nombre") or "").strip(), (fila.get("dni") or "").strip(), telefono
+
+def calcular_diferencias(filas):
+    """
+    Compara el padrón (iterable de (número de fila, nombre, dni, telefono), ver leer_padron)
+    con la tabla 'usuarios'. Retorna un DiferenciasPadron, o None si hubo un error.
+    """
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute("SELECT dni, id, nombre, telefono, marcado_baja FROM usuarios")
+        actuales = {fila[0]: fila[1:] for fila in cursor.fetchall()}
+        # Préstamos abiertos por lector (índice parcial de préstamos abiertos)
+        cursor.execute(
+            "SELECT usuario_id, COUNT(*) FROM prestamos WHERE dia_devolucion IS NULL GROUP BY usuario_id"
+        )
+        abiertos = dict(cursor.fetchall())
+        # Multas por lector (abiertas o cerradas: son el registro de lo que debe o pagó)
+        cursor.execute("SELECT usuario_id, COUNT(*) FROM multas GROUP BY usuario_id")
+        multas = dict(cursor.fetchall())
+    except Exception as e:
+        print(f"Error al leer los lectores para sincronizar el padrón: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+    diferencias = DiferenciasPadron()
+    vistos = {} # dni -> número de fila donde apareció
+    for numero, nombre, dni, telefono in filas:
+        if not nombre or not dni:
+            diferencias.invalidas.append((numero, "falta el nombre o el DNI"))
+            continue
+        if dni in vistos:
+            diferencias.invalidas.append((numero, f"DNI {dni} repetido (ya en la fila {vistos[dni]})"))
+            continue
+        vistos[dni] = numero
+
+        actual = actuales.get(dni)
+        if actual is None:
+            diferencias.nuevos.append((nombre, dni, telefono))
+            continue
+        usuario_id, nombre_actual, telefono_actual, marcado = actual
+        if nombre != nombre_actual or (telefono is not None and telefono != (telefono_actual or "")) or marcado:
+            diferencias.cambiados.append((usuario_id, nombre, dni, telefono, nombre_actual, telefono_actual))
+        else:
+            diferencias.sin_cambios += 1
+
+    for dni, (usuario_id, nombre, _, marcado) in actuales.items():
+        if dni in vistos:
+            continue
+        if abiertos.get(usuario_id) or multas.get(usuario_id):
+            if marcado:
+                diferencias.ya_marcados += 1
+            else:
+                diferencias.marcados.append(
+                    (usuario_id, nombre, dni, abiertos.get(usuario_id, 0), multas.get(usuario_id, 0))
+                )
+        else:
+            diferencias.ausentes.append((usuario_id, nombre, dni))
+    return diferencias
+
+def aplicar_diferencias(diferencias, borrar_ausentes=True, lote=ROSTER_BATCH_SIZE):
+    """
+    Escribe las diferencias por lotes de 'lote' lectores, cada uno en su transacción.
+    Con borrar_ausentes=False los ausentes sin préstamos se conservan.
+    Retorna {'insertados', 'actualizados', 'marcados', 'eliminados'}, o None si hubo un error
+    (los lotes ya confirmados se quedan).
+    """
+    resultado = {"insertados": 0, "actualizados": 0, "marcados": 0, "eliminados": 0}
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión; autocommit para controlar cada lote
+        conn = sqlite3.connect(DATABASE_PATH, isolation_level=None, timeout=10)
+        cursor = conn.cursor()
+
+        # 1. Altas y cambios: el mismo upsert (los cambiados ya existen y entran por ON CONFLICT)
+        escrituras = [(nombre, dni, telefono, False) for nombre, dni, telefono in diferencias.nuevos]
+        escrituras += [(nombre, dni, telefono, True) for _, nombre, dni, telefono, _, _ in diferencias.cambiados]
+        ids_cambiados = {dni: usuario_id for usuario_id, _, dni, *_ in diferencias.cambiados}
+        for inicio in range(0, len(escrituras), lote):
+            tanda = escrituras[inicio:inicio + lote]
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(
+                _UPSERT_SQL,
+                [(nombre, dni, telefono, normalizar(nombre)) for nombre, dni, telefono, _ in tanda]
+            )
+            dnis_nuevos = [dni for _, dni, _, existia in tanda if not existia]
+            nuevos = []
+            if dnis_nuevos:
+                cursor.execute(
+                    f"SELECT id FROM usuarios WHERE dni IN ({','.join('?' * len(dnis_nuevos))})", dnis_nuevos
+                )
+                nuevos = [fila[0] for fila in cursor.fetchall()]
+            cursor.execute("COMMIT")
+            cambiados = [ids_cambiados[dni] for _, dni, _, existia in tanda if existia]
+            resultado["insertados"] += len(nuevos)
+            resultado["actualizados"] += len(cambiados)
+            publicar(eventos.USUARIO, eventos.ALTA, *nuevos)
+            publicar(eventos.USUARIO, eventos.CAMBIO, *cambiados)
+
+        # 2. Ausentes sin préstamos ni multas: se eliminan; si entretanto se llevaron un libro
+        # (o se les calculó una multa), se marcan
+        por_marcar = [fila[0] for fila in diferencias.marcados]
+        ausentes = [fila[0] for fila in diferencias.ausentes] if borrar_ausentes else []
+        for inicio in range(0, len(ausentes), lote):
+            tanda = ausentes[inicio:inicio + lote]
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(_BORRAR_SQL, [(usuario_id,) for usuario_id in tanda])
+            cursor.execute(f"SELECT id FROM usuarios WHERE id IN ({','.join('?' * len(tanda))})", tanda)
+            quedan = {fila[0] for fila in cursor.fetchall()}
+            cursor.execute("COMMIT")
+            eliminados = [usuario_id for usuario_id in tanda if usuario_id not in quedan]
+            resultado["eliminados"] += len(eliminados)
+            publicar(eventos.USUARIO, eventos.BAJA, *eliminados)
+            por_marcar += quedan
+
+        # 3. Ausentes con préstamos abiertos o multas: se marcan
+        for inicio in range(0, len(por_marcar), lote):
+            tanda = por_marcar[inicio:inicio + lote]
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(
+                "UPDATE usuarios SET marcado_baja = 1 WHERE id = ?",
+                [(usuario_id,) for usuario_id in tanda]
+            )
+            resultado["marcados"] += cursor.rowcount
+            cursor.execute("COMMIT")
+            publicar(eventos.USUARIO, eventos.CAMBIO, *tanda)
+        return resultado
+    except Exception as e:
+        print(f"Error al sincronizar el padrón: {e}")
+        if conn and conn.in_transaction:
+            conn.rollback()
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def sincronizar_padron(ruta, simular=False, borrar_ausentes=True):
+    """
+    Lee el padrón, calcula las diferencias y, salvo con simular=True, las aplica.
+    Retorna (diferencias, resultado): resultado es el de aplicar_diferencias(), o None si
+    se simuló, no había cambios o hubo un error. diferencias es None si no se pudieron calcular.
+    Lanza OSError o ValueError si el archivo no se puede leer o no tiene las columnas necesarias.
+    """
+    diferencias = calcular_diferencias(leer_padron(ruta))
+    if diferencias is None or simular or not diferencias.hay_cambios():
+        return diferencias, None
+    return diferencias, aplicar_diferencias(diferencias, borrar_ausentes)
@@ -0,0 +1,159 @@
+"""
+    Motor de préstamos vencidos.
+    Las consultas recorren solo el rango correspondiente del índice parcial
+    idx_prestamos_vencimiento (préstamos abiertos ordenados por fecha de vencimiento),
+    en lugar de calcular fechas en Python sobre todas las filas.
+"""
+import sqlite3
+import datetime
+from utils.path_utils import DATABASE_PATH
+from db.fechas import a_dia, convertir_filas
+
+
+def obtener_prestamos_vencidos(hoy=None, desde=None):
+    """
+    Obtiene los préstamos abiertos cuyo vencimiento es anterior a 'hoy'.
+    Si se indica 'desde', solo los que vencieron en [desde, hoy) (consulta incremental).
+    Retorna: (prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_prestamo, fecha_vencimiento, libro_id)
+    con las fechas como datetime.date.
+    """
+    hoy = a_dia(hoy or datetime.date.today())
+    desde = a_dia(desde) if desde else 0
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT p.id, l.titulo, u.nombre, u.dni, p.dia_prestamo, p.dia_vencimiento, l.id
+            FROM prestamos p INDEXED BY idx_prestamos_vencimiento
+            JOIN libros l ON p.libro_id = l.id
+            JOIN usuarios u ON p.usuario_id = u.id
+            WHERE p.dia_devolucion IS NULL
+              AND p.dia_vencimiento >= ? AND p.dia_vencimiento < ?
+            ORDER BY p.dia_vencimiento
+            """,
+            (desde, hoy)
+        )
+        return convertir_filas(cursor.fetchall(), 4, 5)
+    except Exception as e:
+        print(f"Error al obtener préstamos vencidos: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_vencidos_por_usuario(hoy=None):
+    """
+    Cuenta los préstamos vencidos de cada usuario (solo usuarios con alguno).
+    Retorna: (usuario_id, nombre, dni, prestamos_vencidos), de más a menos vencidos.
+    """
+    hoy = a_dia(hoy or datetime.date.today())
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        # El conteo se resuelve solo con el índice (dia_vencimiento, usuario_id)
+        cursor.execute(
+            """
+            SELECT u.id, u.nombre, u.dni, v.vencidos
+            FROM (
+                SELECT usuario_id, COUNT(*) AS vencidos
+                FROM prestamos INDEXED BY idx_prestamos_vencimiento
+                WHERE dia_devolucion IS NULL AND dia_vencimiento < ?
+                GROUP BY usuario_id
+            ) v
+            JOIN usuarios u ON u.id = v.usuario_id
+            ORDER BY v.vencidos DESC, u.nombre
+            """,
+            (hoy,)
+        )
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error al contar vencidos por usuario: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def contar_prestamos_vencidos(hoy=None):
+    """Retorna el número de préstamos abiertos vencidos."""
+    hoy = a_dia(hoy or datetime.date.today())
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM prestamos INDEXED BY idx_prestamos_vencimiento "
+            "WHERE dia_devolucion IS NULL AND dia_vencimiento < ?",
+            (hoy,)
+        )
+        return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"Error al contar préstamos vencidos: {e}")
+        return 0
+    finally:
+        if conn:
+            conn.close()
+
+def obtener_prestamos_cerrados(prestamo_ids):
+    """De una lista de IDs de préstamo, retorna el conjunto de los que ya fueron devueltos."""
+    prestamo_ids = list(prestamo_ids)
+    conn = None
+    try:
+        # Usa la ruta dinámica para la conexión
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+        cerrados = set()
+        # Por bloques para no superar el límite de parámetros de SQLite
+        for i in range(0, len(prestamo_ids), 500):
+            bloque = prestamo_ids[i:i + 500]
+            marcadores = ", ".join("?" * len(bloque))
+            cursor.execute(
+                f"SELECT id FROM prestamos WHERE id IN ({marcadores}) AND dia_devolucion IS NOT NULL",
+                bloque
+            )
+            cerrados.update(fila[0] for fila in cursor.fetchall())
+        return cerrados
+    except Exception as e:
+        print(f"Error al comprobar préstamos cerrados: {e}")
+        return set()
+    finally:
+        if conn:
+            conn.close()
+
+
+class MotorVencidos:
+    """
+    Mantiene en memoria la lista de préstamos vencidos y la actualiza de forma incremental:
+    en cada actualización solo se consultan los préstamos que vencieron desde la anterior
+    y se descartan los que se devolvieron.
+    """
+    def __init__(self):
+        self.vencidos = {} # prestamo_id -> fila de obtener_prestamos_vencidos()
+        self.corte = None # Fecha ('hoy') de la última actualización
+
+    def actualizar(self, hoy=None):
+        """Aplica los cambios desde la última actualización. Retorna (nuevos, cerrados)."""
+        hoy = hoy or datetime.date.today()
+
+        nuevos = obtener_prestamos_vencidos(hoy=hoy, desde=self.corte)
+        cerrados = obtener_prestamos_cerrados(self.vencidos.keys()) if self.vencidos else set()
+
+        for prestamo_id in cerrados:
+            del self.vencidos[prestamo_id]
+        for fila in nuevos:
+            self.vencidos[fila[0]] = fila
+        self.corte = hoy
+        return nuevos, cerrados
+
+    def filas(self):
+        """Préstamos vencidos ordenados del vencimiento más antiguo al más reciente."""
+        return sorted(self.vencidos.values(), key=lambda fila: (fila[5], fila[0]))
+
+
+# Instancia compartida: sobrevive a la destrucción de las vistas al cambiar de pestaña
+motor_vencidos = MotorVencidos()
@@ -1,28 +1,46 @@
-# Importación de la lógica de la DB
-from db.database import inicializar_db, verificar_existencia_bibliotecarios 
+import argparse
 
-# Importación de la función de arranque de la UI
-from ui.views.formulario import iniciar_formulario
+from utils.arranque import MedidorArranque
 
-def iniciar_aplicacion():
-    # 1. Asegurar que la DB y las tablas existan
-    inicializar_db()
+# Las importaciones de la DB y de la UI se hacen dentro de iniciar_aplicacion(): así se pueden
+# medir con --profile-startup y las vistas de la App no se cargan hasta después del login
+# (ver ui/views/formulario.py)
+
+def iniciar_aplicacion(medidor=None):
+    medidor = medidor or MedidorArranque()
+
+    with medidor.fase("importar customtkinter"):
+        import customtkinter as ctk
+        ctk.set_appearance_mode("System")  # Modes: "System" (default), "Dark", "Light"
+        ctk.set_default_color_theme("blue") # Themes: "blue" (default), "green", "dark-blue"
+
+    with medidor.fase("importar db.database"):
+        from db.database import inicializar_db, verificar_existencia_bibliotecarios
+
+    # 1. Asegurar que la DB y las tablas existan (única llamada del arranque)
+    with medidor.fase("inicializar_db()"):
+        inicializar_db()
 
     # 2. Verificar el estado de la autenticación
-    hay_bibliotecario = verificar_existencia_bibliotecarios()
+    with medidor.fase("verificar_existencia_bibliotecarios()"):
+        hay_bibliotecario = verificar_existencia_bibliotecarios()
+
+    with medidor.fase("importar ui.views.formulario"):
+        from ui.views.formulario import iniciar_formulario
 
+    al_mostrar = (lambda: medidor.informar("ventana de login visible")) if medidor.activo else None
     if hay_bibliotecario:
         # A. Hay bibliotecario, iniciamos la ventana de LOGIN
-        iniciar_formulario(debe_registrar=False)
+        iniciar_formulario(debe_registrar=False, al_mostrar=al_mostrar)
     else:
         # B. No hay bibliotecario, iniciamos la ventana de REGISTRO inicial
-        iniciar_formulario(debe_registrar=True)
+        iniciar_formulario(debe_registrar=True, al_mostrar=al_mostrar)
 
 
 if __name__ == "__main__":
-    # Importar customtkinter para la configuración de apariencia (Opcional pero recomendado)
-    import customtkinter as ctk
-    ctk.set_appearance_mode("System")  # Modes: "System" (default), "Dark", "Light"
-    ctk.set_default_color_theme("blue") # Themes: "blue" (default), "green", "dark-blue"
-    
-    iniciar_aplicacion()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="BiblioGest - Sistema de Gestión Bibliotecaria")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Muestra el tiempo de cada fase del arranque y de las importaciones más lentas")
+    args = parser.parse_args()
+
+    iniciar_aplicacion(MedidorArranque(activo=args.profile_startup))
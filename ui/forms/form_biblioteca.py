@@ -1,6 +1,8 @@
 import customtkinter as ctk
 from db.database import insertar_libro, actualizar_libro, eliminar_libro
+from db.diccionarios import categorias
 from ui.widgets.error import CustomMessage
+from ui.forms.historial_prestamos import abrir_historial_libro
 
 class FormBiblioteca(ctk.CTkToplevel):
     """
@@ -74,7 +76,9 @@ class FormBiblioteca(ctk.CTkToplevel):
 
     def _on_success(self):
         """Callback que se ejecuta al dar click en Aceptar del mensaje de éxito."""
-        self.refresh_callback()
+        # Opcional: las vistas reciben los cambios por los eventos de datos (db/eventos.py)
+        if self.refresh_callback:
+            self.refresh_callback()
         self._clean_close()
 
     def _create_header(self):
@@ -91,7 +95,12 @@ class FormBiblioteca(ctk.CTkToplevel):
         
         for i, label_text in enumerate(labels):
             ctk.CTkLabel(self, text=label_text).grid(row=i+1, column=0, padx=(20, 10), pady=(10, 0), sticky="w")
-            entry = ctk.CTkEntry(self)
+            if label_text == "Categoría:":
+                # Categorías existentes (del diccionario en memoria); se puede escribir una nueva
+                entry = ctk.CTkComboBox(self, values=[nombre for _, nombre in categorias.ordenados()])
+                entry.set("")
+            else:
+                entry = ctk.CTkEntry(self)
             entry.grid(row=i+1, column=1, padx=(0, 20), pady=(0, 10), sticky="ew")
             self.fields[label_text.split(':')[0]] = entry
             
@@ -135,6 +144,15 @@ class FormBiblioteca(ctk.CTkToplevel):
             hover_color="darkgray"
         ).grid(row=0, column=2 if self.book_data else 1, padx=5, sticky="ew")
 
+        if self.book_data:
+            ctk.CTkButton(
+                button_frame,
+                text="📜 Historial de Préstamos",
+                command=lambda: abrir_historial_libro(self, self.book_id, self.book_data[1]),
+                fg_color="#3B82F6",
+                hover_color="#2563EB"
+            ).grid(row=1, column=0, columnspan=3, padx=5, pady=(10, 0), sticky="ew")
+
     def _load_data(self):
         if self.book_data:
             data = {
@@ -148,7 +166,7 @@ class FormBiblioteca(ctk.CTkToplevel):
             self.fields["ISBN"].configure(state="normal")
             self.fields["ISBN"].insert(0, data["ISBN"])
             self.fields["ISBN"].configure(state="disabled")
-            self.fields["Categoría"].insert(0, data["Categoría"])
+            self.fields["Categoría"].set(data["Categoría"])
 
     def _save_action(self):
         titulo = self.fields["Título"].get().strip()
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from db.database import insertar_usuario, actualizar_usuario, eliminar_usuario
 from ui.widgets.error import CustomMessage
+from ui.forms.historial_prestamos import abrir_historial_usuario
 
 class FormUsuario(ctk.CTkToplevel):
     """
@@ -75,7 +76,9 @@ class FormUsuario(ctk.CTkToplevel):
 
     def _on_success(self):
         """Callback que se ejecuta al dar click en Aceptar del mensaje de éxito."""
-        self.refresh_callback()
+        # Opcional: las vistas reciben los cambios por los eventos de datos (db/eventos.py)
+        if self.refresh_callback:
+            self.refresh_callback()
         self._clean_close()
         
     def _create_header(self):
@@ -137,6 +140,15 @@ class FormUsuario(ctk.CTkToplevel):
             hover_color="darkgray"
         ).grid(row=0, column=2 if self.user_data else 1, padx=5, sticky="ew")
 
+        if self.user_data:
+            ctk.CTkButton(
+                button_frame,
+                text="📜 Historial de Préstamos",
+                command=lambda: abrir_historial_usuario(self, self.user_id, self.user_data[1]),
+                fg_color="#3B82F6",
+                hover_color="#2563EB"
+            ).grid(row=1, column=0, columnspan=3, padx=5, pady=(10, 0), sticky="ew")
+
     def _load_data(self):
         if self.user_data:
             data = {
@@ -190,4 +202,6 @@ class FormUsuario(ctk.CTkToplevel):
             # FIX: Igual aquí, cierre controlado vía callback
             CustomMessage(self.master, "Éxito", "Usuario eliminado.", is_error=False, callback=self._on_success)
         else:
-            CustomMessage(self.master, "Error", "No se pudo eliminar el usuario.", is_error=True)
\ No newline at end of file
+            CustomMessage(self.master, "Error",
+                          "No se pudo eliminar el usuario (tiene préstamos activos o multas registradas).",
+                          is_error=True)
\ No newline at end of file
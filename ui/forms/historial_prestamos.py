@@ -0,0 +1,128 @@
+import customtkinter as ctk
+from tkinter import ttk
+from db.database import obtener_historial_usuario, obtener_historial_libro
+from db.estadisticas import obtener_total_prestamos_usuario, obtener_total_prestamos_libro
+
+PAGE_SIZE = 50
+
+class HistorialPrestamos(ctk.CTkToplevel):
+    """
+    Ventana Toplevel con el historial completo de préstamos de un usuario o de un libro,
+    del más reciente al más antiguo, cargado por páginas.
+    """
+    def __init__(self, master, title, columns, fetch_page, total):
+        super().__init__(master)
+        self.title(title)
+        self.geometry("750x500")
+
+        # Configuración modal
+        self.transient(master)
+        self.grab_set()
+        self.protocol("WM_DELETE_WINDOW", self._close)
+
+        self.fetch_page = fetch_page # fetch_page(despues_de) -> filas
+        self.total = total
+        self.shown = 0
+        self.last_key = None # (fecha_prestamo, prestamo_id) de la última fila mostrada
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        ctk.CTkLabel(
+            self,
+            text=title,
+            font=ctk.CTkFont(size=18, weight="bold")
+        ).grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
+
+        self._create_table(columns)
+        self._create_footer()
+        self.load_next_page()
+
+    def _create_table(self, columns):
+        """Crea la tabla Treeview del historial."""
+        table_frame = ctk.CTkFrame(self, fg_color="transparent")
+        table_frame.grid(row=1, column=0, padx=20, sticky="nsew")
+        table_frame.grid_columnconfigure(0, weight=1)
+        table_frame.grid_rowconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(table_frame, columns=[c[0] for c in columns], show="headings")
+        for name, width, anchor in columns:
+            self.tree.heading(name, text=name, anchor=anchor)
+            self.tree.column(name, width=width, anchor=anchor)
+
+        scrollbar = ctk.CTkScrollbar(table_frame, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.tree.tag_configure("activo", foreground="#F59E0B")
+
+    def _create_footer(self):
+        """Crea el contador y el botón para cargar la siguiente página."""
+        footer = ctk.CTkFrame(self, fg_color="transparent")
+        footer.grid(row=2, column=0, padx=20, pady=(10, 20), sticky="ew")
+        footer.grid_columnconfigure(0, weight=1)
+
+        self.count_label = ctk.CTkLabel(footer, text="")
+        self.count_label.grid(row=0, column=0, sticky="w")
+
+        self.more_button = ctk.CTkButton(footer, text="Cargar más", command=self.load_next_page)
+        self.more_button.grid(row=0, column=1, padx=(0, 10), sticky="e")
+
+        ctk.CTkButton(
+            footer,
+            text="Cerrar",
+            command=self._close,
+            fg_color="gray",
+            hover_color="darkgray"
+        ).grid(row=0, column=2, sticky="e")
+
+    def _close(self):
+        """Cierra la ventana y devuelve el foco modal al formulario que la abrió."""
+        master = self.master
+        self.grab_release()
+        self.destroy()
+        try:
+            if isinstance(master, ctk.CTkToplevel) and master.winfo_exists():
+                master.grab_set()
+        except Exception:
+            pass
+
+    def load_next_page(self):
+        """Añade la siguiente página al final de la tabla."""
+        # Filas: (prestamo_id, dato1, dato2, fecha_prestamo, fecha_vencimiento, fecha_devolucion)
+        rows = self.fetch_page(self.last_key)
+        for row in rows:
+            returned = row[5] or "En préstamo"
+            self.tree.insert('', 'end', values=(row[1] or "-", row[2] or "-", row[3], row[4] or "-", returned),
+                             tags=("activo",) if row[5] is None else ())
+        if rows:
+            self.last_key = (rows[-1][3], rows[-1][0])
+        self.shown += len(rows)
+
+        self.count_label.configure(text=f"Mostrando {self.shown} de {self.total} préstamos")
+        if len(rows) < PAGE_SIZE or self.shown >= self.total:
+            self.more_button.configure(state="disabled")
+
+
+def abrir_historial_usuario(master, user_id, nombre):
+    """Abre el historial de préstamos de un usuario."""
+    HistorialPrestamos(
+        master,
+        f"Historial de {nombre}",
+        (("Título", 250, "w"), ("ISBN", 120, "center"), ("Préstamo", 100, "center"),
+         ("Vencimiento", 100, "center"), ("Devolución", 110, "center")),
+        lambda after: obtener_historial_usuario(user_id, after, PAGE_SIZE, incluir_archivo=True),
+        obtener_total_prestamos_usuario(user_id),
+    )
+
+def abrir_historial_libro(master, libro_id, titulo):
+    """Abre el historial de préstamos de un libro."""
+    HistorialPrestamos(
+        master,
+        f"Historial de '{titulo}'",
+        (("Usuario", 220, "w"), ("DNI", 120, "center"), ("Préstamo", 100, "center"),
+         ("Vencimiento", 100, "center"), ("Devolución", 110, "center")),
+        lambda after: obtener_historial_libro(libro_id, after, PAGE_SIZE, incluir_archivo=True),
+        obtener_total_prestamos_libro(libro_id),
+    )
@@ -1,4 +1,5 @@
 import customtkinter as ctk
+import gc
 import sys
 import datetime
 
@@ -6,6 +7,19 @@ import datetime
 from ui.views.biblioteca import BibliotecaView
 from ui.views.usuarios import UsuariosView
 from ui.views.historial import HistorialView
+from ui.views.vencidos import VencidosView
+from ui.views.estadisticas import EstadisticasView
+from ui.widgets.error import CustomMessage
+from ui.widgets.paleta import PaletaComandos
+from utils.perfilador import PerfiladorEnVivo
+from utils.tareas import ejecutar_en_segundo_plano, TrabajoUnico
+from utils.inactividad import MonitorInactividad
+from db.archivo import archivar_prestamos_antiguos
+from db.copias import ServicioCopias, crear_copia
+from db.mantenimiento import ejecutar_mantenimiento
+from db.busqueda_global import IndiceGlobal
+from db.database import guardar_instantanea_catalogo
+from config import BACKUP_INTERVAL_HOURS, BACKUP_ON_EXIT, IDLE_THRESHOLD_S, IDLE_CHECK_INTERVAL_MS
 
 class TopFrame(ctk.CTkFrame):
     """Frame superior que contiene el nombre de usuario, el menú y la hora/fecha."""
@@ -40,7 +54,7 @@ class TopFrame(ctk.CTkFrame):
         menu_frame = ctk.CTkFrame(self, fg_color="transparent")
         menu_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
         
-        views = ["Biblioteca", "Usuarios", "Historial"]
+        views = ["Biblioteca", "Usuarios", "Historial", "Vencidos", "Estadísticas"]
         
         for i, view_name in enumerate(views):
             menu_frame.grid_columnconfigure(i, weight=1)
@@ -100,6 +114,8 @@ class App(ctk.CTk):
         "Biblioteca": BibliotecaView,
         "Usuarios": UsuariosView,
         "Historial": HistorialView,
+        "Vencidos": VencidosView,
+        "Estadísticas": EstadisticasView,
     }
 
     def __init__(self, username):
@@ -128,6 +144,32 @@ class App(ctk.CTk):
         # Iniciar con la vista por defecto (Biblioteca)
         self.change_view("Biblioteca")
 
+        # Perfilado en vivo (F12 inicia/detiene la captura de CPU y memoria)
+        self.perfilador = PerfiladorEnVivo()
+        self.bind("<F12>", self.toggle_profiling)
+
+        # Búsqueda global (Ctrl+K): índice cargado en segundo plano y actualizado por eventos de datos
+        self.indice_global = IndiceGlobal()
+        self.indice_global.iniciar()
+        self.palette = None
+        self.bind_all("<Control-k>", self.open_palette)
+        # En los campos de texto la clase Entry (que va antes que 'all') borraría hasta el final
+        # de la línea: se sustituye ese enlace de clase y open_palette corta la propagación
+        self.bind_class("Entry", "<Control-k>", self.open_palette)
+        self.after(1000, self._freeze_startup_objects)
+
+        # Archivo de préstamos cerrados antiguos, en segundo plano tras el arranque
+        self.after(5000, lambda: ejecutar_en_segundo_plano(self, archivar_prestamos_antiguos))
+
+        # Copias de seguridad y mantenimiento de la base de datos cuando la aplicación está inactiva
+        self.monitor_inactividad = MonitorInactividad(self)
+        self.copias = ServicioCopias()
+        # Sin VACUUM completo (bloquearía las escrituras) y detenido en cuanto vuelve la actividad
+        self.mantenimiento = TrabajoUnico(
+            lambda: ejecutar_mantenimiento(interrumpir=self._hay_actividad), "mantenimiento de la base de datos"
+        )
+        self.after(IDLE_CHECK_INTERVAL_MS, self.check_idle)
+
         # Configuración de protocolo de cierre
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
@@ -147,8 +189,101 @@ class App(ctk.CTk):
         new_view.grid(row=0, column=0, sticky="nsew")
         self.current_view = new_view
 
+    def _freeze_startup_objects(self):
+        """
+        Cuando termina de cargarse la búsqueda global, saca del recolector de basura los objetos
+        creados hasta ahora (índice global, cachés de las vistas, la propia interfaz). Viven toda la
+        sesión y las recolecciones completas los recorrerían enteros cada vez: con cientos de miles
+        de entradas son pausas visibles al escribir. Se hace una sola vez y para todo el proceso,
+        por eso está aquí y no en el módulo del índice; antes se recoge la basura para no congelarla.
+        """
+        if not self.indice_global.completo:
+            self.after(1000, self._freeze_startup_objects)
+            return
+        gc.collect()
+        gc.freeze()
+
+    def open_palette(self, event=None):
+        """Abre la paleta de búsqueda global (o la trae al frente si ya está abierta)."""
+        if self.palette and self.palette.winfo_exists():
+            self.palette.focus_force()
+            return "break"
+        self.palette = PaletaComandos(self, self.indice_global, self.go_to_result)
+        return "break"
+
+    def go_to_result(self, tipo, id_):
+        """Lleva a la vista del resultado elegido en la paleta y abre el registro o la acción."""
+        if tipo == "accion":
+            accion, valor = id_.split(":", 1)
+            if accion == "vista":
+                self.change_view(valor)
+            elif valor == "libro":
+                self.change_view("Biblioteca")
+                self.current_view.open_book_form()
+            elif valor == "usuario":
+                self.change_view("Usuarios")
+                self.current_view.open_user_form()
+        elif tipo == "libro":
+            self.change_view("Biblioteca")
+            self.current_view.show_book(id_)
+        elif tipo == "usuario":
+            self.change_view("Usuarios")
+            self.current_view.show_user(id_)
+        elif tipo == "prestamo":
+            self.change_view("Historial")
+            self.current_view.show_loan(id_)
+
+    def toggle_profiling(self, event=None):
+        """Inicia o detiene la captura de cProfile/tracemalloc sobre el proceso en vivo."""
+        if not self.perfilador.activo:
+            self.perfilador.iniciar()
+            self.title(f"Sistema Bibliotecario - Sesión de {self.username} [PERFILANDO - F12 para detener]")
+            return
+
+        self.title(f"Sistema Bibliotecario - Sesión de {self.username}")
+        try:
+            carpeta = self.perfilador.detener()
+        except Exception as e:
+            CustomMessage(self, "Error", f"No se pudo guardar el perfil: {e}", is_error=True)
+            return
+        CustomMessage(self, "Perfil Guardado", f"Resultados guardados en:\n{carpeta}", is_error=False)
+
+    def _hay_actividad(self):
+        """True si se ha vuelto a usar la aplicación (se llama desde el hilo del mantenimiento)."""
+        return self.monitor_inactividad.segundos_inactivo() < IDLE_THRESHOLD_S
+
+    def check_idle(self):
+        """
+        Si nadie usa la aplicación, lanza en segundo plano la copia de seguridad (si la última es
+        antigua) o, si no toca copia, el mantenimiento pendiente. Nunca ambos a la vez.
+        """
+        if self.monitor_inactividad.segundos_inactivo() >= IDLE_THRESHOLD_S:
+            if self.copias.copia_pendiente(BACKUP_INTERVAL_HOURS):
+                if not self.mantenimiento.en_curso:
+                    self.copias.iniciar()
+            elif not self.copias.en_curso:
+                self.mantenimiento.iniciar()
+        self.after(IDLE_CHECK_INTERVAL_MS, self.check_idle)
+
     def on_closing(self):
         """Maneja el cierre de la ventana principal y termina la aplicación."""
         import sys
+        # Si había una captura en curso, se guarda antes de salir
+        if self.perfilador.activo:
+            try:
+                self.perfilador.detener()
+            except Exception as e:
+                print(f"Error al guardar el perfil: {e}")
+        self.indice_global.detener()
         self.destroy()
+        # Termina la copia y el mantenimiento en curso y hace la copia de cierre con la ventana ya cerrada
+        self.mantenimiento.esperar()
+        self.copias.esperar()
+        # Instantánea del catálogo para que el próximo arranque pinte la Biblioteca al instante
+        guardar_instantanea_catalogo()
+        if BACKUP_ON_EXIT:
+            try:
+                crear_copia()
+            except Exception as e:
+                print(f"Error al crear la copia de seguridad: {e}")
         sys.exit() # Esto asegura que el proceso termine completamente
\ No newline at end of file
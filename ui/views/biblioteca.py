@@ -1,24 +1,74 @@
 import customtkinter as ctk
 from tkinter import ttk # Usamos ttk para la tabla (Treeview)
-from db.database import obtener_todos_los_libros, obtener_libros_prestados_count
+from db import eventos
+from db.database import obtener_todos_los_libros, obtener_libros_por_ids, actualizar_instantanea_catalogo
+from db.instantanea import leer_instantanea
 from ui.forms.form_biblioteca import FormBiblioteca
 from ui.widgets.error import CustomMessage # Para los mensajes de éxito/error
+from ui.widgets.encabezados import SortableHeadings
+from ui.widgets.cambios import DataChangeListener
+from ui.widgets.tabla_progresiva import ProgressiveRenderer
+from utils.facetas import IndiceFacetas, mascara, posiciones
+from utils.normalizacion import normalizar
+from utils.busqueda_difusa import IndiceDifuso
+from utils.ordenacion import OrdenColumnas, clave_texto, clave_valor
+from utils.tareas import ejecutar_en_segundo_plano
+from config import FACET_MAX_AUTHORS, FUZZY_MAX_DISTANCE, FUZZY_MIN_QUERY_LENGTH, FUZZY_BUDGET_MS, FUZZY_LIMIT
+
+# Facetas del catálogo: valor de cada fila de obtener_todos_los_libros()
+# row: (isbn, titulo, autor, categoria, disponible, id, autor_id, categoria_id, fecha_alta, titulo_norm, autor_norm)
+FACETAS = {
+    "Disponibilidad": lambda row: row[4] == 1,
+    "Categoría": lambda row: row[7],
+    "Año de alta": lambda row: row[8].year if row[8] else None,
+    "Autor": lambda row: row[6],
+}
+
+# Clave de ordenación de cada columna de la tabla
+SORT_KEYS = {
+    "ISBN": lambda row: clave_texto(row[0]),
+    "Título": lambda row: clave_texto(row[1]),
+    "Autor": lambda row: clave_texto(row[2]),
+    "Categoría": lambda row: clave_texto(row[3]),
+    "Disponible": lambda row: clave_valor(row[4]),
+}
+
+def fuzzy_text(row):
+    """Texto de la fila que indexa la búsqueda con erratas: título y autor normalizados."""
+    return f"{row[9]} {row[10]}"
+
+def build_fuzzy_index(rows):
+    """Índice de erratas sobre título y autor normalizados; el valor es la posición de la fila."""
+    return IndiceDifuso(((fuzzy_text(row), i) for i, row in enumerate(rows) if row is not None), FUZZY_MAX_DISTANCE)
 
 class BibliotecaView(ctk.CTkFrame):
     """Vista principal para la gestión y listado de libros."""
     def __init__(self, master):
         super().__init__(master, fg_color="transparent")
         self.grid_columnconfigure(0, weight=1)
+        self.grid_columnconfigure(1, weight=0) # Panel de filtros
         self.grid_rowconfigure(2, weight=1) # La fila de la tabla necesita expandirse
 
-        self.libros_data = [] # Cache de datos de libros
+        self.libros_data = [] # Cache de datos de libros (None en la posición de los eliminados)
+        self._positions = {} # id del libro -> posición en libros_data
+        self._data_version = 0 # Aumenta con cada recarga o cambio aplicado
+        self._fuzzy_build = None # Construcción del índice de erratas en curso
+        self.facetas = IndiceFacetas(FACETAS) # Mapas de bits por valor de faceta sobre libros_data
+        self.selected_facets = {faceta: set() for faceta in FACETAS}
+        self.facet_checks = {} # faceta -> {valor: (checkbox, etiqueta)}
+        self.fuzzy_index = None # Búsqueda con erratas (se construye en segundo plano)
+        self.orden = OrdenColumnas(SORT_KEYS) # Permutaciones por columna sobre las posiciones de libros_data
         self._create_styles()
         self._create_header_frame()
         self._create_search_frame()
         self._create_table_frame()
+        self._create_facets_frame()
         
-        # Cargar datos iniciales
-        self.load_books_data()
+        # Cargar datos iniciales (desde la instantánea de arranque si la hay)
+        self.load_from_snapshot()
+
+        # Altas, ediciones, bajas y préstamos se aplican solo a las filas cambiadas
+        self.changes = DataChangeListener(self, eventos.LIBRO, self._on_books_changed)
         
     def _create_styles(self):
         """Estilos personalizados para la tabla Treeview de Tkinter."""
@@ -47,7 +97,7 @@ class BibliotecaView(ctk.CTkFrame):
     def _create_header_frame(self):
         """Crea el encabezado con el contador y el botón Agregar."""
         header_frame = ctk.CTkFrame(self, fg_color="transparent")
-        header_frame.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="ew")
+        header_frame.grid(row=0, column=0, columnspan=2, padx=20, pady=(20, 10), sticky="ew")
         header_frame.grid_columnconfigure(0, weight=1) # Contador
         header_frame.grid_columnconfigure(1, weight=0) # Botón
 
@@ -60,6 +110,10 @@ class BibliotecaView(ctk.CTkFrame):
         )
         self.borrowed_count_label.grid(row=0, column=0, sticky="w")
 
+        # Avance del relleno de la tabla
+        self.progress_label = ctk.CTkLabel(header_frame, text="", font=ctk.CTkFont(size=11), text_color="gray")
+        self.progress_label.grid(row=1, column=0, sticky="w")
+
         # Botón Agregar Libros
         ctk.CTkButton(
             header_frame,
@@ -72,7 +126,7 @@ class BibliotecaView(ctk.CTkFrame):
     def _create_search_frame(self):
         """Crea el campo de búsqueda en tiempo real."""
         search_frame = ctk.CTkFrame(self, fg_color="transparent")
-        search_frame.grid(row=1, column=0, padx=20, pady=10, sticky="ew")
+        search_frame.grid(row=1, column=0, columnspan=2, padx=20, pady=10, sticky="ew")
         search_frame.grid_columnconfigure(0, weight=1)
         
         self.search_entry = ctk.CTkEntry(
@@ -120,60 +174,242 @@ class BibliotecaView(ctk.CTkFrame):
         self.tree.grid(row=0, column=0, sticky="nsew")
         scrollbar.grid(row=0, column=1, sticky="ns")
 
-        # 5. Click Actions (Doble clic)
+        # 5. Click Actions (Doble clic) y ordenación al pulsar los encabezados
         self.tree.bind("<Double-1>", self.on_double_click)
+        self.headings = SortableHeadings(self.tree, self.filter_books)
+        self.renderer = ProgressiveRenderer(self.tree, self._insert_row, self.progress_label)
+
+    def _create_facets_frame(self):
+        """Crea el panel lateral de filtros por faceta (se rellena al cargar los libros)."""
+        self.facets_frame = ctk.CTkScrollableFrame(self, width=220, label_text="Filtros")
+        self.facets_frame.grid(row=2, column=1, padx=(0, 20), pady=(0, 20), sticky="ns")
+
+    def _build_facet_checks(self):
+        """Crea una casilla por valor de faceta; los autores, solo los FACET_MAX_AUTHORS más frecuentes."""
+        for widget in self.facets_frame.winfo_children():
+            widget.destroy()
+        self.facet_checks = {}
+
+        etiquetas = {faceta: {} for faceta in FACETAS}
+        for row in self.libros_data:
+            if row is None:
+                continue
+            etiquetas["Disponibilidad"][row[4] == 1] = "Disponible" if row[4] == 1 else "Prestado"
+            etiquetas["Categoría"][row[7]] = row[3] or "(Sin categoría)"
+            etiquetas["Año de alta"][row[8].year if row[8] else None] = str(row[8].year) if row[8] else "(Sin fecha)"
+            etiquetas["Autor"][row[6]] = row[2]
 
+        totales = self.facetas.conteos({})
+        fila = 0
+        ctk.CTkButton(self.facets_frame, text="Limpiar filtros", height=24, fg_color="gray",
+                      hover_color="darkgray", command=self.clear_facets).grid(row=fila, column=0, pady=(0, 5), sticky="ew")
+        for faceta in FACETAS:
+            fila += 1
+            ctk.CTkLabel(self.facets_frame, text=faceta, font=ctk.CTkFont(size=13, weight="bold")).grid(
+                row=fila, column=0, pady=(8, 2), sticky="w")
+            if faceta == "Autor":
+                valores = sorted(totales[faceta], key=lambda v: -totales[faceta][v])[:FACET_MAX_AUTHORS]
+                valores = sorted(valores, key=lambda v: etiquetas[faceta][v].casefold())
+            else:
+                valores = sorted(etiquetas[faceta], key=lambda v: (v is None, str(etiquetas[faceta][v]).casefold()))
+            self.facet_checks[faceta] = {}
+            for valor in valores:
+                fila += 1
+                checkbox = ctk.CTkCheckBox(
+                    self.facets_frame, text=etiquetas[faceta][valor], checkbox_width=18, checkbox_height=18,
+                    command=lambda f=faceta, v=valor: self.toggle_facet(f, v)
+                )
+                checkbox.grid(row=fila, column=0, pady=1, sticky="w")
+                if valor in self.selected_facets[faceta]:
+                    checkbox.select()
+                self.facet_checks[faceta][valor] = (checkbox, etiquetas[faceta][valor])
+
+    def toggle_facet(self, faceta, valor):
+        """Marca o desmarca un valor de faceta y vuelve a filtrar."""
+        seleccionados = self.selected_facets[faceta]
+        if valor in seleccionados:
+            seleccionados.discard(valor)
+        else:
+            seleccionados.add(valor)
+        self.filter_books()
+
+    def clear_facets(self):
+        """Quita todos los filtros de faceta."""
+        for faceta in self.selected_facets:
+            self.selected_facets[faceta].clear()
+        for checks in self.facet_checks.values():
+            for checkbox, _ in checks.values():
+                checkbox.deselect()
+        self.filter_books()
+
+    def _update_facet_counts(self, base):
+        """Actualiza el número de libros de cada valor según la búsqueda y las demás facetas."""
+        conteos = self.facetas.conteos(self.selected_facets, base)
+        for faceta, checks in self.facet_checks.items():
+            for valor, (checkbox, etiqueta) in checks.items():
+                cantidad = conteos[faceta].get(valor, 0)
+                checkbox.configure(
+                    text=f"{etiqueta} ({cantidad})",
+                    state="normal" if cantidad or valor in self.selected_facets[faceta] else "disabled"
+                )
+
+    def _insert_row(self, row):
+        """Inserta una fila en la tabla (la llama el relleno progresivo)."""
+        # row: (isbn, titulo, autor, categoria, disponible, id, ...)
+        status = "Sí" if row[4] == 1 else "No"
+        # Insertar los datos visibles (ISBN, Título, Autor, Categoría, Disponible)
+        self.tree.insert('', 'end',
+                         values=(row[0], row[1], row[2], row[3], status),
+                         tags=("disponible" if row[4] == 1 else "prestado",))
+
+
+    def load_from_snapshot(self):
+        """
+        Pinta el catálogo guardado en la instantánea de arranque sin consultar la base de datos
+        y la compara con ella en segundo plano. Sin instantánea, carga desde la base de datos.
+        """
+        snapshot = leer_instantanea()
+        if snapshot is None:
+            self.load_books_data()
+            return
+        version, rows = snapshot
+        self.show_books(rows)
+        shown = self._data_version
+        ejecutar_en_segundo_plano(self, actualizar_instantanea_catalogo,
+                                  lambda updated: self._on_snapshot_checked(shown, updated), version, rows)
+
+    def _on_snapshot_checked(self, shown, updated):
+        """Aplica los cambios posteriores a la instantánea, si los hubo."""
+        if updated is None:
+            return
+        if shown == self._data_version:
+            self.show_books(updated)
+        else:
+            # Entretanto se aplicaron cambios que la comparación pudo no ver: se recarga todo
+            self.load_books_data()
 
     def load_books_data(self):
         """Carga los datos de la base de datos y actualiza la tabla."""
-        # Limpiar la tabla
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-            
-        # Cargar los datos desde la DB
-        self.libros_data = obtener_todos_los_libros()
-        
-        for row in self.libros_data:
-            # row: (isbn, titulo, autor, categoria, disponible, id)
-            status = "Sí" if row[4] == 1 else "No"
-            # Insertar los datos visibles (ISBN, Título, Autor, Categoría, Disponible)
-            self.tree.insert('', 'end', 
-                             values=(row[0], row[1], row[2], row[3], status),
-                             tags=("disponible" if row[4] == 1 else "prestado",))
-
-        # Actualizar contador de prestados
-        count = obtener_libros_prestados_count()
-        self.borrowed_count_label.configure(text=f"Libros Prestados: {count}")
+        self.show_books(obtener_todos_los_libros())
+
+    def show_books(self, rows):
+        """Sustituye los libros mostrados y reconstruye los índices en memoria."""
+        # Reconstruir el índice de facetas y las permutaciones de ordenación.
+        # libros_data es la lista de filas del índice de facetas: las altas se añaden a las dos a la vez
+        self.facetas.construir(rows)
+        self.libros_data = self.facetas.filas
+        self._positions = {row[5]: i for i, row in enumerate(self.libros_data)}
+        self._data_version += 1
+        self.orden.construir(enumerate(self.libros_data))
+        self._build_facet_checks()
+        self.filter_books()
+        self._start_fuzzy_index()
+        self._update_borrowed_count()
         
         # Aplicar tags de color
         self.tree.tag_configure("prestado", foreground="#EF4444")
         self.tree.tag_configure("disponible", foreground="#10B981")
 
+    def _update_borrowed_count(self):
+        """Actualiza el contador de prestados (libros con disponible = 0) con el índice de facetas."""
+        count = (self.facetas.bits["Disponibilidad"].get(False, 0) & self.facetas.vivas).bit_count()
+        self.borrowed_count_label.configure(text=f"Libros Prestados: {count}")
 
-    def filter_books(self, event=None):
-        """Filtra la tabla de libros basándose en el Entry de búsqueda."""
-        query = self.search_entry.get().strip().lower()
-        
-        # Limpiar la tabla
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def _start_fuzzy_index(self):
+        """Construye el índice de erratas fuera del hilo de Tk sobre una copia de las filas actuales."""
+        self.fuzzy_index = None
+        build = self._fuzzy_build = object()
+        version = self._data_version
+        ejecutar_en_segundo_plano(self, build_fuzzy_index,
+                                  lambda index: self._on_fuzzy_index_ready(index, build, version),
+                                  list(self.libros_data))
 
-        if not query:
-            # Si la búsqueda está vacía, mostrar todos los datos
-            data_to_show = self.libros_data
+    def _on_fuzzy_index_ready(self, index, build, version):
+        """Guarda el índice de erratas si corresponde a los datos mostrados."""
+        if build is not self._fuzzy_build:
+            return # Lo sustituyó una recarga posterior
+        if version == self._data_version:
+            self.fuzzy_index = index
         else:
-            # Filtrar por Título o Autor (índices 1 y 2 en self.libros_data)
-            data_to_show = [
-                row for row in self.libros_data
-                if query in row[1].lower() or query in row[2].lower()
+            # Hubo cambios mientras se construía: se vuelve a construir con las filas actuales
+            self._start_fuzzy_index()
+
+    def _on_books_changed(self, cambios):
+        """
+        Aplica a la caché y a los índices en memoria los libros dados de alta, editados,
+        prestados, devueltos o eliminados, releyendo solo esas filas.
+        cambios: {accion: {ids}} (ver ui.widgets.cambios).
+        """
+        changed = cambios.get(eventos.ALTA, set()) | cambios.get(eventos.CAMBIO, set())
+        rows = obtener_libros_por_ids(changed) if changed else []
+        if rows is None:
+            self.load_books_data()
+            return
+        # Los que ya no se encuentran se borraron después de publicar el evento
+        removed = cambios.get(eventos.BAJA, set()) | (changed - {row[5] for row in rows})
+        new_values = False
+        for libro_id in removed:
+            pos = self._positions.pop(libro_id, None)
+            if pos is None:
+                continue
+            self.facetas.eliminar(pos)
+            self.orden.eliminar(pos)
+            self.libros_data[pos] = None
+            if self.fuzzy_index:
+                self.fuzzy_index.quitar(pos)
+        for row in rows:
+            pos = self._positions.get(row[5])
+            new_values = new_values or any(
+                faceta != "Autor" and extractor(row) not in self.facet_checks.get(faceta, {})
+                for faceta, extractor in FACETAS.items()
+            )
+            if pos is None:
+                pos = self._positions[row[5]] = self.facetas.agregar(row)
+                self.orden.agregar(pos, row)
+            else:
+                self.facetas.actualizar(pos, row)
+                self.orden.actualizar(pos, row)
+            if self.fuzzy_index:
+                self.fuzzy_index.quitar(pos)
+                self.fuzzy_index.agregar(fuzzy_text(row), pos)
+        # Si el índice de erratas aún se está construyendo, se rehará al terminar
+        self._data_version += 1
+        if new_values:
+            self._build_facet_checks()
+        self.filter_books()
+        self._update_borrowed_count()
+
+    def filter_books(self, event=None):
+        """Filtra la tabla de libros por el Entry de búsqueda y las facetas marcadas."""
+        query = normalizar(self.search_entry.get())
+
+        base = None # Sin búsqueda: todas las filas
+        ranking = None # Orden de los resultados aproximados
+        if query:
+            # Filtrar por Título o Autor normalizados (sin tildes ni mayúsculas)
+            found = [
+                i for i, row in enumerate(self.libros_data)
+                if row is not None and (query in row[9] or query in row[10])
             ]
+            if not found and len(query) >= FUZZY_MIN_QUERY_LENGTH and self.fuzzy_index:
+                # Sin coincidencias exactas: resultados con erratas, de menos a más erratas
+                matches = self.fuzzy_index.buscar(query, FUZZY_LIMIT, FUZZY_BUDGET_MS)
+                ranking = {i: orden for orden, (i, _) in enumerate(matches)}
+                found = list(ranking)
+            base = mascara(found, len(self.libros_data))
 
-        for row in data_to_show:
-            # row: (isbn, titulo, autor, categoria, disponible, id)
-            status = "Sí" if row[4] == 1 else "No"
-            self.tree.insert('', 'end', 
-                             values=(row[0], row[1], row[2], row[3], status),
-                             tags=("disponible" if row[4] == 1 else "prestado",))
+        # Intersección de la búsqueda con las facetas (operaciones sobre enteros)
+        bits = self.facetas.filtrar(self.selected_facets, base)
+        visible = posiciones(bits)
+        if self.headings.column:
+            # Orden elegido en los encabezados: la permutación de la columna, limitada a las visibles
+            filtered = len(visible) < len(self.libros_data)
+            visible = self.orden.ordenar(self.headings.column, self.headings.descending, visible if filtered else None)
+        elif ranking:
+            visible.sort(key=ranking.get)
+        # Relleno por tandas: la tabla responde mientras se insertan las filas
+        self.renderer.start([self.facetas.filas[i] for i in visible])
+        self._update_facet_counts(base)
 
 
     def on_double_click(self, event):
@@ -186,15 +422,33 @@ class BibliotecaView(ctk.CTkFrame):
         selected_isbn = self.tree.item(item_id, 'values')[0]
         
         # Buscar los datos completos del libro usando el ISBN
-        book_data = next((row for row in self.libros_data if row[0] == selected_isbn), None)
+        book_data = next((row for row in self.libros_data if row is not None and row[0] == selected_isbn), None)
 
         if book_data:
-            self.open_book_form(book_data)
+            # FormBiblioteca espera (id, titulo, autor, isbn, categoria, disponible)
+            isbn, titulo, autor, categoria, disponible, libro_id = book_data[:6]
+            self.open_book_form((libro_id, titulo, autor, isbn, categoria, disponible))
         else:
             CustomMessage(self.master, "Error de Datos", "No se encontraron los datos completos del libro.", is_error=True)
 
 
+    def show_book(self, libro_id):
+        """Abre la ficha de un libro por su id (desde la búsqueda global)."""
+        pos = self._positions.get(libro_id)
+        book_data = self.libros_data[pos] if pos is not None else None
+        if not book_data:
+            CustomMessage(self.master, "Error de Datos", "El libro ya no existe.", is_error=True)
+            return
+        isbn, titulo, autor, categoria, disponible, libro_id = book_data[:6]
+        self.open_book_form((libro_id, titulo, autor, isbn, categoria, disponible))
+
     def open_book_form(self, book_data=None):
         """Abre la ventana Toplevel FormBiblioteca en modo Agregar o Editar."""
-        # Se pasa la función load_books_data como callback para refrescar la tabla
-        FormBiblioteca(self.master, self.load_books_data, book_data)
\ No newline at end of file
+        # Los cambios guardados llegan a la tabla por los eventos de datos (_on_books_changed)
+        FormBiblioteca(self.master, None, book_data)
+
+    def destroy(self):
+        """Detiene el relleno de la tabla y la escucha de cambios antes de cerrar la vista."""
+        self.changes.cancel()
+        self.renderer.cancel()
+        super().destroy()
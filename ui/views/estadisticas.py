@@ -0,0 +1,186 @@
+import customtkinter as ctk
+from tkinter import ttk
+from db.estadisticas import (obtener_indicadores, obtener_prestamos_por_hora, obtener_circulacion_por_mes,
+                             obtener_top_libros, obtener_rotacion_por_categoria)
+from ui.widgets.graficos import BarChart
+from utils.tareas import ejecutar_en_segundo_plano
+from utils.cache import CacheTTL
+from config import DASHBOARD_CACHE_TTL_S
+
+# Agregados del panel. Cada uno se calcula en un hilo con su propia conexión de solo lectura.
+SECTIONS = {
+    "indicadores": lambda: obtener_indicadores(solo_lectura=True),
+    "horas": lambda: obtener_prestamos_por_hora(solo_lectura=True),
+    "meses": lambda: obtener_circulacion_por_mes(12, solo_lectura=True),
+    "top_libros": lambda: obtener_top_libros(10, solo_lectura=True),
+    "categorias": lambda: obtener_rotacion_por_categoria(solo_lectura=True),
+}
+
+# Caché compartida entre instancias de la vista (la vista se destruye al cambiar de pestaña)
+_cache = CacheTTL(DASHBOARD_CACHE_TTL_S)
+
+KPI_CARDS = (
+    ("prestamos_activos", "Préstamos Activos", "#3B82F6"),
+    ("vencidos", "Vencidos", "#EF4444"),
+    ("prestamos_hoy", "Préstamos Hoy", "#10B981"),
+    ("devoluciones_hoy", "Devoluciones Hoy", "#F59E0B"),
+)
+
+class EstadisticasView(ctk.CTkFrame):
+    """Panel de indicadores y gráficos de circulación, calculados en segundo plano."""
+    def __init__(self, master):
+        super().__init__(master, fg_color="transparent")
+        self.grid_columnconfigure((0, 1), weight=1)
+        self.grid_rowconfigure(2, weight=1)
+        self.grid_rowconfigure(3, weight=1)
+
+        self._create_styles()
+        self._create_kpi_frame()
+        self._create_charts()
+        self._create_tables()
+
+        # La vista se pinta vacía y cada sección se rellena al llegar su resultado
+        self.after_idle(self.load_sections)
+
+    def _create_styles(self):
+        """Estilos personalizados para las tablas Treeview."""
+        style = ttk.Style()
+        style.theme_use("default")
+
+        # Estilo para los encabezados de Estadísticas (Violeta)
+        style.configure("Estadisticas.Heading",
+                        font=('Arial', 12, 'bold'),
+                        background="#8B5CF6",
+                        foreground="white",
+                        padding=5)
+
+        style.configure("Estadisticas.Treeview",
+                        font=('Arial', 10),
+                        rowheight=25)
+
+        style.map("Estadisticas.Treeview",
+                  background=[('selected', '#8B5CF6')],
+                  foreground=[('selected', 'white')])
+
+    def _create_kpi_frame(self):
+        """Crea las tarjetas de indicadores y el botón de actualizar."""
+        kpi_frame = ctk.CTkFrame(self, fg_color="transparent")
+        kpi_frame.grid(row=0, column=0, columnspan=2, padx=20, pady=(20, 10), sticky="ew")
+
+        self.kpi_labels = {}
+        for i, (key, title, color) in enumerate(KPI_CARDS):
+            kpi_frame.grid_columnconfigure(i, weight=1)
+            card = ctk.CTkFrame(kpi_frame, corner_radius=10)
+            card.grid(row=0, column=i, padx=5, sticky="ew")
+            ctk.CTkLabel(card, text=title, font=ctk.CTkFont(size=12)).pack(pady=(10, 0))
+            value_label = ctk.CTkLabel(card, text="...", font=ctk.CTkFont(size=26, weight="bold"), text_color=color)
+            value_label.pack(pady=(0, 10))
+            self.kpi_labels[key] = value_label
+
+        footer = ctk.CTkFrame(self, fg_color="transparent")
+        footer.grid(row=1, column=0, columnspan=2, padx=20, sticky="ew")
+        footer.grid_columnconfigure(0, weight=1)
+
+        self.catalog_label = ctk.CTkLabel(footer, text="", text_color="gray")
+        self.catalog_label.grid(row=0, column=0, sticky="w")
+
+        ctk.CTkButton(
+            footer,
+            text="⟳ Actualizar",
+            width=110,
+            command=self.reload,
+            fg_color="#8B5CF6",
+            hover_color="#7C3AED"
+        ).grid(row=0, column=1, sticky="e")
+
+    def _create_charts(self):
+        """Crea los gráficos de horas de más actividad y de circulación mensual."""
+        self.hours_chart = BarChart(self, "Préstamos por Hora del Día", bar_color="#3B82F6")
+        self.hours_chart.grid(row=2, column=0, padx=(20, 10), pady=10, sticky="nsew")
+
+        self.months_chart = BarChart(self, "Préstamos por Mes (últimos 12)", bar_color="#10B981")
+        self.months_chart.grid(row=2, column=1, padx=(10, 20), pady=10, sticky="nsew")
+
+    def _create_tables(self):
+        """Crea las tablas de títulos más prestados y de rotación por categoría."""
+        self.top_tree = self._create_table(
+            row=3, column=0, padx=(20, 10),
+            columns=(("Título", 260, "w"), ("Autor", 160, "w"), ("Préstamos", 90, "center"))
+        )
+        self.category_tree = self._create_table(
+            row=3, column=1, padx=(10, 20),
+            columns=(("Categoría", 160, "w"), ("Préstamos", 90, "center"),
+                     ("Libros", 80, "center"), ("Préstamos/Libro", 120, "center"))
+        )
+
+    def _create_table(self, row, column, padx, columns):
+        """Crea una tabla Treeview con su barra de desplazamiento."""
+        table_frame = ctk.CTkFrame(self, fg_color="transparent")
+        table_frame.grid(row=row, column=column, padx=padx, pady=(10, 20), sticky="nsew")
+        table_frame.grid_columnconfigure(0, weight=1)
+        table_frame.grid_rowconfigure(0, weight=1)
+
+        tree = ttk.Treeview(table_frame, columns=[c[0] for c in columns], show="headings",
+                            style="Estadisticas.Treeview", height=8)
+        for name, width, anchor in columns:
+            tree.heading(name, text=name, anchor=anchor)
+            tree.column(name, width=width, anchor=anchor)
+
+        scrollbar = ctk.CTkScrollbar(table_frame, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        return tree
+
+    def load_sections(self):
+        """Pinta lo que haya en caché y calcula en segundo plano las secciones caducadas."""
+        for key, compute in SECTIONS.items():
+            cached = _cache.obtener(key)
+            if cached is not None:
+                self._render(key, cached)
+            else:
+                ejecutar_en_segundo_plano(self, compute, lambda result, key=key: self._on_loaded(key, result))
+
+    def reload(self):
+        """Descarta la caché y vuelve a calcular todas las secciones."""
+        _cache.invalidar()
+        for label in self.kpi_labels.values():
+            label.configure(text="...")
+        self.hours_chart.set_loading()
+        self.months_chart.set_loading()
+        self.load_sections()
+
+    def _on_loaded(self, key, result):
+        """Guarda en caché y pinta una sección recién calculada."""
+        if result is None:
+            return
+        _cache.guardar(key, result)
+        self._render(key, result)
+
+    def _render(self, key, data):
+        """Pinta una sección del panel con sus datos."""
+        if key == "indicadores":
+            for kpi_key, label in self.kpi_labels.items():
+                label.configure(text=str(data.get(kpi_key, "-")))
+            self.catalog_label.configure(
+                text=f"Libros en catálogo: {data.get('libros', '-')} | Usuarios registrados: {data.get('usuarios', '-')}"
+            )
+        elif key == "horas":
+            # Solo el horario con actividad (o de 8 a 20 si aún no hay datos)
+            active = [hour for hour, count in data if count] or [8, 20]
+            start, end = min(active), max(active)
+            self.hours_chart.set_data([(f"{hour}h", count) for hour, count in data if start <= hour <= end])
+        elif key == "meses":
+            # mes: 'YYYY-MM' -> 'MM/YY'
+            self.months_chart.set_data([(f"{month[5:7]}/{month[2:4]}", loans) for month, loans, _ in data])
+        elif key == "top_libros":
+            self._fill_tree(self.top_tree, [(row[1], row[2], row[3]) for row in data])
+        elif key == "categorias":
+            self._fill_tree(self.category_tree, [(row[0] or "(Sin categoría)", row[1], row[2], row[3]) for row in data])
+
+    def _fill_tree(self, tree, rows):
+        """Sustituye el contenido de una tabla."""
+        for i in tree.get_children():
+            tree.delete(i)
+        for values in rows:
+            tree.insert('', 'end', values=values)
@@ -11,9 +11,8 @@ from ui.widgets.error import CustomMessage
 # Importamos la validación de utilidades
 from utils.validation import is_valid_email # <-- NUEVA IMPORTACIÓN
 
-# Importamos la App principal (que aún vamos a crear en app.py)
-# Necesitamos la clase para poder hacer la transición
-from ui.views.app import App 
+# La App principal (ui/views/app.py) y, con ella, todas las vistas y formularios se importan
+# después del login: la ventana de login aparece sin esperar a cargarlos
 
 # ----------------------------------------------------------------------
 # CLASE BASE PARA EL FRAME DE CARGA
@@ -59,6 +58,8 @@ class CargaBienvenidaFrame(ctk.CTkFrame):
         """Inicia la actualización de la interfaz de forma segura en el hilo principal."""
         # Solo iniciamos la cadena de llamadas 'after' en el hilo principal
         self.master.after(200, lambda: self.update_progress(1))
+        # Mientras avanza la barra, este hilo importa la App (solo módulos: no crea widgets)
+        import ui.views.app
 
 
 # ----------------------------------------------------------------------
@@ -270,6 +271,7 @@ class FormularioMainWindow(ctk.CTk):
         self.withdraw()
         
         # 2. Abrimos la ventana de la aplicación principal
+        from ui.views.app import App # Ya precargada durante la bienvenida
         app = App(username=username) # Creamos la nueva ventana
         app.mainloop() # La App principal toma el control y se bloquea aquí
 
@@ -284,10 +286,13 @@ class FormularioMainWindow(ctk.CTk):
 # FUNCIONES DE ARRANQUE PARA MAIN.PY
 # ----------------------------------------------------------------------
 
-def iniciar_formulario(debe_registrar):
+def iniciar_formulario(debe_registrar, al_mostrar=None):
     """
     Función llamada desde main.py para iniciar la ventana.
     :param debe_registrar: True si se debe mostrar el Registro, False para Login.
+    :param al_mostrar: Función opcional que se llama cuando la ventana ya está pintada (medición del arranque).
     """
     app = FormularioMainWindow(debe_registrar)
+    if al_mostrar:
+        app.after_idle(al_mostrar)
     app.mainloop()
\ No newline at end of file
@@ -1,9 +1,41 @@
 import customtkinter as ctk
 from tkinter import ttk
-from db.database import obtener_prestamos_activos, obtener_libro_por_isbn, obtener_usuario_por_dni, registrar_prestamo, registrar_devolucion
+from db.database import obtener_prestamos_activos, obtener_usuario_por_dni, obtener_claves_libros, obtener_claves_usuarios, checkout, registrar_devolucion, registrar_devoluciones_por_isbn
 from ui.widgets.error import CustomMessage
+from ui.widgets.scanner import ScannerInput
+from ui.widgets.sugerencias import Autocomplete
+from ui.widgets.encabezados import SortableHeadings
+from ui.widgets.tabla_progresiva import ProgressiveRenderer
+from utils.autocompletar import IndicePrefijos, indice_por_palabras, combinar_resultados
+from utils.tareas import ejecutar_en_segundo_plano
+from utils.normalizacion import normalizar
+from utils.ordenacion import OrdenColumnas, clave_texto, clave_valor
+from utils.validation import is_valid_isbn
 from datetime import date
 import sys
+from config import RETURN_BATCH_SIZE, RETURN_BATCH_DELAY_MS, AUTOCOMPLETE_LIMIT
+
+# Clave de ordenación de cada columna de la tabla de préstamos activos
+# row: (prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_prestamo, libro_id)
+SORT_KEYS = {
+    "ID": lambda row: clave_valor(row[0]),
+    "Título del Libro": lambda row: clave_texto(row[1]),
+    "Usuario": lambda row: clave_texto(row[2]),
+    "DNI": lambda row: clave_texto(row[3]),
+    "Fecha Préstamo": lambda row: clave_valor(row[4]),
+    "Libro ID": lambda row: clave_valor(row[5]),
+}
+
+def build_search_indexes():
+    """Construye los índices de prefijos de libros y lectores para el autocompletado."""
+    books = obtener_claves_libros() # (isbn, titulo)
+    readers = obtener_claves_usuarios() # (dni, nombre)
+    return {
+        "isbn": IndicePrefijos((isbn, f"{isbn} - {titulo}", isbn) for isbn, titulo in books),
+        "titulo": indice_por_palabras((titulo, f"{titulo} ({isbn})", isbn) for isbn, titulo in books),
+        "dni": IndicePrefijos((dni, f"{dni} - {nombre}", dni) for dni, nombre in readers),
+        "nombre": indice_por_palabras((nombre, f"{nombre} ({dni})", dni) for dni, nombre in readers),
+    }
 
 class HistorialView(ctk.CTkFrame):
     """Vista para la gestión de préstamos activos y registro de nuevas transacciones."""
@@ -14,12 +46,23 @@ class HistorialView(ctk.CTkFrame):
         self.grid_rowconfigure(2, weight=0) # Fila de nueva transacción
         
         self.active_loans_data = [] # Cache de datos de préstamos
+        self.orden = OrdenColumnas(SORT_KEYS) # Permutaciones por columna sobre los id de préstamo
+        self.return_queue = [] # ISBN escaneados pendientes de confirmar
+        self._return_flush_job = None
+        self._returns_done = 0
+        self.current_reader = None # Lector precargado al escanear su DNI: (id, nombre, dni, telefono)
+        self._reader_pending = None # DNI cuya precarga está en curso
+        self._pending_isbns = [] # Libros escaneados mientras se precargaba el lector
+        self.search_indexes = None # Índices de autocompletado (se construyen en segundo plano)
         self._create_styles()
         self._create_active_loans_section()
         self._create_transaction_section()
         
         self.load_active_loans()
 
+        # Índices de sugerencias para ISBN/Título y DNI/Nombre, fuera del hilo de Tk
+        ejecutar_en_segundo_plano(self, build_search_indexes, self._on_search_indexes_ready)
+
     def _create_styles(self):
         """Estilos personalizados para la tabla Treeview."""
         style = ttk.Style()
@@ -52,6 +95,10 @@ class HistorialView(ctk.CTkFrame):
             text="PRÉSTAMOS ACTIVOS PENDIENTES DE DEVOLUCIÓN",
             font=ctk.CTkFont(size=18, weight="bold")
         ).grid(row=0, column=0, pady=(0, 10), sticky="w")
+
+        # Avance del relleno de la tabla
+        self.progress_label = ctk.CTkLabel(active_loans_frame, text="", font=ctk.CTkFont(size=11), text_color="gray")
+        self.progress_label.grid(row=0, column=0, pady=(0, 10), sticky="e")
         
         # Buscador
         search_frame = ctk.CTkFrame(active_loans_frame, fg_color="transparent")
@@ -86,8 +133,10 @@ class HistorialView(ctk.CTkFrame):
         self.tree.grid(row=2, column=0, sticky="nsew")
         scrollbar.grid(row=2, column=1, sticky="ns")
 
-        # Acciones
+        # Acciones y ordenación al pulsar los encabezados
         self.tree.bind("<Double-1>", self.on_double_click)
+        self.headings = SortableHeadings(self.tree, self.filter_active_loans)
+        self.renderer = ProgressiveRenderer(self.tree, self._insert_row, self.progress_label)
         
     def _create_transaction_section(self):
         """Crea la sección inferior para registrar nuevos préstamos."""
@@ -117,42 +166,74 @@ class HistorialView(ctk.CTkFrame):
             fg_color="#3B82F6",
             hover_color="#2563EB"
         ).grid(row=1, column=4, sticky="e")
-        
+
+        # Estado del lector de códigos de barras (lector precargado, último préstamo...)
+        self.scan_status_label = ctk.CTkLabel(transaction_frame, text="", anchor="w")
+        self.scan_status_label.grid(row=2, column=0, columnspan=5, pady=(5, 0), sticky="w")
+
+        # Devolución por escaneo: cada ISBN escaneado (o escrito + Enter) cierra su préstamo abierto
+        ctk.CTkLabel(
+            transaction_frame,
+            text="DEVOLUCIÓN RÁPIDA (ESCANEAR ISBN)",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).grid(row=3, column=0, columnspan=5, pady=(20, 15), sticky="w")
+
+        ctk.CTkLabel(transaction_frame, text="ISBN a devolver:").grid(row=4, column=0, padx=(0, 10), sticky="w")
+        self.return_entry = ctk.CTkEntry(transaction_frame, width=150)
+        self.return_entry.grid(row=4, column=1, padx=(0, 20), sticky="ew")
+        self.return_entry.bind("<Return>", self.queue_return_scan)
+
+        self.return_status_label = ctk.CTkLabel(transaction_frame, text="Devueltos: 0", text_color="#10B981")
+        self.return_status_label.grid(row=4, column=2, columnspan=3, sticky="w")
+
         transaction_frame.grid_columnconfigure((1, 3), weight=1) # Expansión para entradas
 
+        # Lector de códigos de barras sobre los campos de ISBN y DNI
+        # (el campo de devolución ya procesa cada código con Enter)
+        self.scanner = ScannerInput(self.route_scan)
+        self.scanner.attach(self.isbn_entry, "libro")
+        self.scanner.attach(self.dni_entry, "lector")
+
+        # Sugerencias mientras se escribe (ISBN o título; DNI o nombre del lector)
+        Autocomplete(self.isbn_entry, self.suggest_books, container=self)
+        Autocomplete(self.dni_entry, self.suggest_readers, on_select=self.scan_reader, container=self)
+
 
     def load_active_loans(self):
         """Carga los datos de préstamos activos y actualiza la tabla."""
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-            
         # Retorna: (prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_prestamo, libro_id)
         self.active_loans_data = obtener_prestamos_activos()
-        
-        for row in self.active_loans_data:
-            # Insertar los datos visibles (ID, Título, Usuario, DNI, Fecha Préstamo)
-            self.tree.insert('', 'end', 
-                             values=(row[0], row[1], row[2], row[3], row[4], row[5]))
+        self.orden.construir((row[0], row) for row in self.active_loans_data)
+        self.filter_active_loans()
+
+    def _visible_loans(self):
+        """Préstamos que coinciden con la búsqueda, en el orden elegido en los encabezados."""
+        query = normalizar(self.search_entry.get())
+        if self.headings.column:
+            ids = None
+            if query:
+                ids = [row[0] for row in self.active_loans_data if self._matches_query(row, query)]
+            ordered = self.orden.ordenar(self.headings.column, self.headings.descending, ids)
+            return [self.orden.filas[prestamo_id] for prestamo_id in ordered]
+        if not query:
+            return self.active_loans_data
+        return [row for row in self.active_loans_data if self._matches_query(row, query)]
 
     def filter_active_loans(self, event=None):
         """Filtra la tabla de préstamos activos por Título o DNI del usuario."""
-        query = self.search_entry.get().strip().lower()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # Relleno por tandas: la tabla responde mientras se insertan las filas
+        self.renderer.start(list(self._visible_loans()))
 
-        if not query:
-            data_to_show = self.active_loans_data
-        else:
-            # Filtrar por Título (índice 1) o DNI (índice 3)
-            data_to_show = [
-                row for row in self.active_loans_data
-                if query in row[1].lower() or query in row[3].lower()
-            ]
+    def _insert_row(self, row):
+        """Inserta una fila en la tabla (la llama el relleno progresivo)."""
+        # Insertar los datos visibles (ID, Título, Usuario, DNI, Fecha Préstamo)
+        # El iid es el ID del préstamo para poder localizar la fila directamente
+        self.tree.insert('', 'end', iid=row[0],
+                         values=(row[0], row[1], row[2], row[3], row[4], row[5]))
 
-        for row in data_to_show:
-            self.tree.insert('', 'end', 
-                             values=(row[0], row[1], row[2], row[3], row[4], row[5]))
+    def _matches_query(self, row, query):
+        """Indica si un préstamo coincide con la búsqueda (normalizada) por Título (índice 1) o DNI (índice 3)."""
+        return query in normalizar(row[1]) or query in row[3].lower()
 
     def on_double_click(self, event):
         """Maneja el doble clic para iniciar el proceso de Devolución."""
@@ -170,6 +251,17 @@ class HistorialView(ctk.CTkFrame):
         self.confirm_devolution_modal(prestamo_id, libro_id, titulo_libro)
 
 
+    def show_loan(self, prestamo_id):
+        """Selecciona un préstamo abierto y pide confirmar su devolución (desde la búsqueda global)."""
+        row = next((row for row in self.active_loans_data if row[0] == prestamo_id), None)
+        if not row:
+            CustomMessage(self.master, "Error de Datos", "El préstamo ya está cerrado.", is_error=True)
+            return
+        if self.tree.exists(prestamo_id):
+            self.tree.selection_set(prestamo_id)
+            self.tree.see(prestamo_id)
+        self.confirm_devolution_modal(prestamo_id, row[5], row[1])
+
     def confirm_devolution_modal(self, prestamo_id, libro_id, titulo_libro):
         """Muestra un modal de confirmación para la devolución."""
         
@@ -207,7 +299,7 @@ class HistorialView(ctk.CTkFrame):
         
         if registrar_devolucion(prestamo_id, libro_id):
             CustomMessage(self.master, "Éxito", "Devolución registrada correctamente. Libro disponible.", is_error=False)
-            self.load_active_loans() # Refrescar la tabla
+            self.remove_active_loans([prestamo_id]) # Quitar solo la fila devuelta
             # Nota: Sería ideal refrescar también la BibliotecaView si estuviera visible
         else:
             CustomMessage(self.master, "Error", "No se pudo registrar la devolución.", is_error=True)
@@ -222,33 +314,217 @@ class HistorialView(ctk.CTkFrame):
             CustomMessage(self.master, "Error de Validación", "Ingrese el ISBN del libro y el DNI del usuario.", is_error=True)
             return
 
-        # 1. Verificar Usuario
-        user_info = obtener_usuario_por_dni(dni)
-        if not user_info:
-            CustomMessage(self.master, "Error", f"Usuario con DNI '{dni}' no encontrado.", is_error=True)
+        # El préstamo manual usa el DNI escrito: el lector escaneado antes deja de estar seleccionado
+        self.current_reader = None
+
+        # Resolución de usuario y libro, validación y registro en una sola transacción
+        # Retorna: ((prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_prestamo, libro_id), error)
+        new_row, error = checkout(isbn, dni)
+        if error:
+            CustomMessage(self.master, "Error", error, is_error=True)
             return
-        user_id = user_info[0]
 
-        # 2. Verificar Libro
-        # Retorna: (id, isbn, titulo, disponible)
-        book_info = obtener_libro_por_isbn(isbn) 
-        if not book_info:
-            CustomMessage(self.master, "Error", f"Libro con ISBN '{isbn}' no encontrado.", is_error=True)
+        CustomMessage(self.master, "Éxito", "Préstamo registrado con éxito.", is_error=False)
+        self.isbn_entry.delete(0, 'end')
+        self.dni_entry.delete(0, 'end')
+        self.add_active_loan(new_row) # Añadir solo la fila nueva
+        # Nota: Sería ideal refrescar también la BibliotecaView
+
+    def add_active_loan(self, row):
+        """Añade un préstamo recién creado a la tabla sin recargar todo."""
+        # La lista está ordenada por fecha descendente: el préstamo de hoy va primero
+        self.active_loans_data.insert(0, row)
+        self.orden.agregar(row[0], row)
+
+        if self.renderer.running:
+            # La tabla aún se está rellenando con la lista anterior: se vuelve a empezar
+            self.filter_active_loans()
             return
-        
-        libro_id = book_info[0]
-        disponible = book_info[3]
-        
-        if disponible == 0:
-            CustomMessage(self.master, "Error", f"El libro '{book_info[2]}' no está disponible (ya prestado).", is_error=True)
+        query = normalizar(self.search_entry.get())
+        if query and not self._matches_query(row, query):
+            return
+        # Posición en la tabla según el orden activo (sin reinsertar las demás filas)
+        position = 0
+        if self.headings.column:
+            position = [r[0] for r in self._visible_loans()].index(row[0])
+        self.tree.insert('', position, iid=row[0],
+                         values=(row[0], row[1], row[2], row[3], row[4], row[5]))
+
+
+    def _on_search_indexes_ready(self, indexes):
+        """Guarda los índices de autocompletado una vez construidos."""
+        self.search_indexes = indexes
+
+    def suggest_books(self, text):
+        """Sugerencias de libros por prefijo de ISBN o de título (se ejecuta en segundo plano)."""
+        if not self.search_indexes:
+            return []
+        return combinar_resultados(
+            AUTOCOMPLETE_LIMIT,
+            self.search_indexes["isbn"].buscar(text, AUTOCOMPLETE_LIMIT),
+            self.search_indexes["titulo"].buscar(text, AUTOCOMPLETE_LIMIT),
+        )
+
+    def suggest_readers(self, text):
+        """Sugerencias de lectores por prefijo de DNI o de nombre (se ejecuta en segundo plano)."""
+        if not self.search_indexes:
+            return []
+        return combinar_resultados(
+            AUTOCOMPLETE_LIMIT,
+            self.search_indexes["dni"].buscar(text, AUTOCOMPLETE_LIMIT),
+            self.search_indexes["nombre"].buscar(text, AUTOCOMPLETE_LIMIT),
+        )
+
+    def route_scan(self, code, origin):
+        """
+        Dirige un código escaneado a su acción según el campo donde se leyó ("libro" o "lector").
+        Los ISBN guardados son texto libre (no siempre tienen un dígito de control válido), así que
+        el formato solo se usa como pista para los códigos leídos fuera de esos campos.
+        """
+        if origin == "libro":
+            self.scan_book(code)
+        elif origin == "lector":
+            self.scan_reader(code)
+        elif is_valid_isbn(code):
+            self.scan_book(code)
+        else:
+            self.scan_reader(code)
+
+    def scan_reader(self, dni):
+        """Selecciona al lector y precarga su registro en segundo plano."""
+        self.dni_entry.delete(0, 'end')
+        self.dni_entry.insert(0, dni)
+        self.current_reader = None
+        self._reader_pending = dni
+        self.scan_status_label.configure(text=f"Buscando lector {dni}...", text_color="gray")
+        ejecutar_en_segundo_plano(self, obtener_usuario_por_dni,
+                                  lambda user: self._on_reader_loaded(dni, user), dni)
+
+    def _on_reader_loaded(self, dni, user):
+        """Recibe el lector precargado y procesa los libros escaneados mientras tanto."""
+        if dni != self._reader_pending:
+            return # Se escaneó otro lector después; resultado obsoleto
+        self._reader_pending = None
+        pending, self._pending_isbns = self._pending_isbns, []
+
+        if not user:
+            self.scan_status_label.configure(text=f"Usuario con DNI '{dni}' no encontrado.", text_color="#EF4444")
             return
 
-        # 3. Registrar Transacción
-        if registrar_prestamo(user_id, libro_id):
-            CustomMessage(self.master, "Éxito", "Préstamo registrado con éxito.", is_error=False)
+        if user[4]:
+            # Marcado como baja por el padrón: checkout() rechazaría cada libro
+            self.scan_status_label.configure(
+                text=f"Lector: {user[1]} ({user[2]}) está marcado como baja (ya no figura en el padrón). "
+                     "Solo puede devolver libros.", text_color="#F59E0B")
+            return
+
+        self.current_reader = user
+        self.scan_status_label.configure(text=f"Lector: {user[1]} ({user[2]}). Escanee los libros.", text_color="#3B82F6")
+        for isbn in pending:
+            self.scan_book(isbn)
+
+    def scan_book(self, isbn):
+        """Presta el libro escaneado al lector seleccionado, sin ventanas modales."""
+        if self._reader_pending:
+            self._pending_isbns.append(isbn)
+            return
+        typed_dni = self.dni_entry.get().strip()
+        if typed_dni and (not self.current_reader or typed_dni != self.current_reader[2]):
+            # El DNI del campo (escrito a mano) manda sobre el último escaneado: se resuelve antes de prestar
+            self._pending_isbns.append(isbn)
+            self.scan_reader(typed_dni)
+            return
+        if not typed_dni:
+            self.current_reader = None # Se borró el DNI del campo
+        if not self.current_reader:
             self.isbn_entry.delete(0, 'end')
-            self.dni_entry.delete(0, 'end')
-            self.load_active_loans() # Refrescar la tabla
-            # Nota: Sería ideal refrescar también la BibliotecaView
+            self.isbn_entry.insert(0, isbn)
+            self.scan_status_label.configure(text="Escanee primero el DNI del lector.", text_color="#EF4444")
+            return
+
+        user_id, name, dni = self.current_reader[0], self.current_reader[1], self.current_reader[2]
+        new_row, error = checkout(isbn, dni, usuario=(user_id, name))
+        if error:
+            self.scan_status_label.configure(text=error, text_color="#EF4444")
+            return
+
+        self.isbn_entry.delete(0, 'end')
+        self.add_active_loan(new_row)
+        self.scan_status_label.configure(text=f"Lector: {name} ({dni}). Prestado: '{new_row[1]}'", text_color="#10B981")
+
+    def queue_return_scan(self, event=None):
+        """Encola el ISBN escaneado; las devoluciones se confirman en lotes pequeños."""
+        isbn = self.return_entry.get().strip()
+        self.return_entry.delete(0, 'end')
+        if not isbn:
+            return
+
+        self.return_queue.append(isbn)
+        if len(self.return_queue) >= RETURN_BATCH_SIZE:
+            self.flush_return_queue()
         else:
-            CustomMessage(self.master, "Error", "Error al registrar el préstamo.", is_error=True)
\ No newline at end of file
+            # Reinicia la espera: el lote se confirma cuando cesa la ráfaga de escaneos
+            if self._return_flush_job:
+                self.after_cancel(self._return_flush_job)
+            self._return_flush_job = self.after(RETURN_BATCH_DELAY_MS, self.flush_return_queue)
+
+    def flush_return_queue(self):
+        """Confirma en una transacción las devoluciones pendientes y actualiza la tabla."""
+        if self._return_flush_job:
+            self.after_cancel(self._return_flush_job)
+            self._return_flush_job = None
+        if not self.return_queue:
+            return
+
+        batch, self.return_queue = self.return_queue, []
+        result = registrar_devoluciones_por_isbn(batch)
+        if result is None:
+            # Se devuelven al inicio de la cola y se reintenta tras la espera del lote
+            # (p. ej. la base de datos estaba bloqueada por otro puesto)
+            self.return_queue = batch + self.return_queue
+            self.return_status_label.configure(text="Error al registrar devoluciones. Reintentando...", text_color="#EF4444")
+            self._return_flush_job = self.after(RETURN_BATCH_DELAY_MS, self.flush_return_queue)
+            return
+
+        returned, not_found = result
+        self.remove_active_loans([prestamo_id for _, prestamo_id, _ in returned])
+        self._returns_done += len(returned)
+
+        if not_found:
+            self.return_status_label.configure(
+                text=f"Devueltos: {self._returns_done} | Sin préstamo activo: {', '.join(not_found)}",
+                text_color="#EF4444"
+            )
+        else:
+            self.return_status_label.configure(text=f"Devueltos: {self._returns_done}", text_color="#10B981")
+
+    def remove_active_loans(self, prestamo_ids):
+        """Quita de la tabla y de la caché los préstamos cerrados sin recargar todo."""
+        if not prestamo_ids:
+            return
+        closed = set(prestamo_ids)
+        self.active_loans_data = [row for row in self.active_loans_data if row[0] not in closed]
+        for prestamo_id in closed:
+            self.orden.eliminar(prestamo_id)
+        if self.renderer.running:
+            # El relleno en curso volvería a insertar las filas cerradas: se vuelve a empezar
+            self.filter_active_loans()
+            return
+        for prestamo_id in closed:
+            if self.tree.exists(prestamo_id):
+                self.tree.delete(prestamo_id)
+
+    def destroy(self):
+        """Confirma los escaneos pendientes antes de cerrar la vista."""
+        self.renderer.cancel()
+        self.flush_return_queue()
+        if self.return_queue:
+            # No se pudieron confirmar: se cancela el reintento y se avisa para registrarlas a mano
+            self.after_cancel(self._return_flush_job)
+            self._return_flush_job = None
+            CustomMessage(
+                self.master, "Devoluciones no registradas",
+                "No se pudieron registrar las devoluciones de estos ISBN:\n" + "\n".join(self.return_queue),
+                is_error=True
+            )
+        super().destroy()
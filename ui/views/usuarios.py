@@ -1,8 +1,31 @@
 import customtkinter as ctk
 from tkinter import ttk
-from db.database import obtener_todos_los_usuarios
+from db import eventos
+from db.database import obtener_todos_los_usuarios, obtener_usuarios_por_ids
 from ui.forms.form_usuario import FormUsuario
 from ui.widgets.error import CustomMessage
+from ui.widgets.encabezados import SortableHeadings
+from ui.widgets.cambios import DataChangeListener
+from ui.widgets.tabla_progresiva import ProgressiveRenderer
+from utils.normalizacion import normalizar
+from utils.busqueda_difusa import IndiceDifuso
+from utils.ordenacion import OrdenColumnas, clave_texto, clave_valor
+from utils.tareas import ejecutar_en_segundo_plano
+from config import FUZZY_MAX_DISTANCE, FUZZY_MIN_QUERY_LENGTH, FUZZY_BUDGET_MS, FUZZY_LIMIT
+
+# Clave de ordenación de cada columna de la tabla
+# row: (id, nombre, dni, telefono, libros_prestados_activos, nombre_norm, marcado_baja)
+SORT_KEYS = {
+    "Nombre": lambda row: clave_texto(row[1]),
+    "DNI": lambda row: clave_texto(row[2]),
+    "Teléfono": lambda row: clave_texto(row[3]),
+    "Libros Prestados": lambda row: clave_valor(row[4]),
+    "Padrón": lambda row: clave_valor(row[6]),
+}
+
+def build_fuzzy_index(rows):
+    """Índice de erratas sobre los nombres normalizados; el valor es la posición de la fila."""
+    return IndiceDifuso(((row[5], i) for i, row in enumerate(rows) if row is not None), FUZZY_MAX_DISTANCE)
 
 class UsuariosView(ctk.CTkFrame):
     """Vista para la gestión y listado de usuarios (lectores)."""
@@ -11,13 +34,21 @@ class UsuariosView(ctk.CTkFrame):
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(2, weight=1) # Fila de la tabla
 
-        self.users_data = [] # Cache de datos de usuarios
+        self.users_data = [] # Cache de datos de usuarios (None en la posición de los eliminados)
+        self._positions = {} # id del usuario -> posición en users_data
+        self._data_version = 0 # Aumenta con cada recarga o cambio aplicado
+        self._fuzzy_build = None # Construcción del índice de erratas en curso
+        self.orden = OrdenColumnas(SORT_KEYS) # Permutaciones por columna sobre las posiciones de users_data
+        self.fuzzy_index = None # Búsqueda con erratas (se construye en segundo plano)
         self._create_styles()
         self._create_header_frame()
         self._create_search_frame()
         self._create_table_frame()
         
         self.load_users_data()
+
+        # Altas, ediciones y bajas (también las del padrón) se aplican solo a las filas cambiadas
+        self.changes = DataChangeListener(self, eventos.USUARIO, self._on_users_changed)
         
     def _create_styles(self):
         """Estilos personalizados para la tabla Treeview de Tkinter."""
@@ -55,6 +86,10 @@ class UsuariosView(ctk.CTkFrame):
         )
         self.active_users_label.grid(row=0, column=0, sticky="w")
 
+        # Avance del relleno de la tabla
+        self.progress_label = ctk.CTkLabel(header_frame, text="", font=ctk.CTkFont(size=11), text_color="gray")
+        self.progress_label.grid(row=1, column=0, sticky="w")
+
         # Botón Agregar Usuario
         ctk.CTkButton(
             header_frame,
@@ -89,7 +124,7 @@ class UsuariosView(ctk.CTkFrame):
         table_frame.grid_rowconfigure(0, weight=1)
         
         # 1. Definición de la tabla
-        columns = ("Nombre", "DNI", "Teléfono", "Libros Prestados")
+        columns = ("Nombre", "DNI", "Teléfono", "Libros Prestados", "Padrón")
         self.tree = ttk.Treeview(table_frame, columns=columns, show="headings")
         
         # 2. Encabezados de la tabla
@@ -97,12 +132,14 @@ class UsuariosView(ctk.CTkFrame):
         self.tree.heading("DNI", text="DNI", anchor="center")
         self.tree.heading("Teléfono", text="Teléfono", anchor="center")
         self.tree.heading("Libros Prestados", text="Libros Prestados", anchor="center")
+        self.tree.heading("Padrón", text="Padrón", anchor="center")
         
         # 3. Ancho de columnas
         self.tree.column("Nombre", width=300, anchor="w")
         self.tree.column("DNI", width=150, anchor="center")
         self.tree.column("Teléfono", width=150, anchor="center")
         self.tree.column("Libros Prestados", width=120, anchor="center")
+        self.tree.column("Padrón", width=90, anchor="center")
 
         # 4. Scrollbar
         scrollbar = ctk.CTkScrollbar(table_frame, command=self.tree.yview)
@@ -111,55 +148,126 @@ class UsuariosView(ctk.CTkFrame):
         self.tree.grid(row=0, column=0, sticky="nsew")
         scrollbar.grid(row=0, column=1, sticky="ns")
 
-        # 5. Click Actions (Doble clic)
+        # 5. Click Actions (Doble clic) y ordenación al pulsar los encabezados
         self.tree.bind("<Double-1>", self.on_double_click)
+        self.headings = SortableHeadings(self.tree, self.filter_users)
+        self.renderer = ProgressiveRenderer(self.tree, self._insert_row, self.progress_label)
 
 
     def load_users_data(self):
         """Carga los datos de la base de datos y actualiza la tabla."""
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-            
-        # Cargar los datos desde la DB: (id, nombre, dni, telefono, libros_prestados_activos)
+        # Cargar los datos desde la DB: (id, nombre, dni, telefono, libros_prestados_activos, nombre_norm)
         self.users_data = obtener_todos_los_usuarios()
-        
-        for row in self.users_data:
-            loans_count = row[4]
-            
-            # Insertar los datos visibles (Nombre, DNI, Teléfono, Libros Prestados)
-            self.tree.insert('', 'end', 
-                             values=(row[1], row[2], row[3], loans_count),
-                             tags=("active" if loans_count > 0 else "inactive",))
-
-        # Actualizar contador
-        self.active_users_label.configure(text=f"Usuarios Registrados: {len(self.users_data)}")
+        self._positions = {row[0]: i for i, row in enumerate(self.users_data)}
+        self._data_version += 1
+        self.orden.construir(enumerate(self.users_data))
+        self._start_fuzzy_index()
+        self.filter_users()
+        self._update_users_count()
         
         # Aplicar tags de color
         self.tree.tag_configure("active", foreground="#EF4444") # Rojo si tiene préstamos
         self.tree.tag_configure("inactive", foreground="gray")
+        self.tree.tag_configure("baja", foreground="#F59E0B") # Naranja: ya no está en el padrón
+
+    def _update_users_count(self):
+        """Actualiza el contador de usuarios registrados."""
+        self.active_users_label.configure(text=f"Usuarios Registrados: {len(self._positions)}")
+
+    def _start_fuzzy_index(self):
+        """Construye el índice de erratas fuera del hilo de Tk sobre una copia de las filas actuales."""
+        self.fuzzy_index = None
+        build = self._fuzzy_build = object()
+        version = self._data_version
+        ejecutar_en_segundo_plano(self, build_fuzzy_index,
+                                  lambda index: self._on_fuzzy_index_ready(index, build, version),
+                                  list(self.users_data))
 
+    def _on_fuzzy_index_ready(self, index, build, version):
+        """Guarda el índice de erratas si corresponde a los datos mostrados."""
+        if build is not self._fuzzy_build:
+            return # Lo sustituyó una recarga posterior
+        if version == self._data_version:
+            self.fuzzy_index = index
+        else:
+            # Hubo cambios mientras se construía: se vuelve a construir con las filas actuales
+            self._start_fuzzy_index()
+
+    def _on_users_changed(self, cambios):
+        """
+        Aplica a la caché, a las permutaciones de ordenación y al índice de erratas los lectores
+        dados de alta, editados o eliminados, releyendo solo esas filas.
+        cambios: {accion: {ids}} (ver ui.widgets.cambios).
+        """
+        changed = cambios.get(eventos.ALTA, set()) | cambios.get(eventos.CAMBIO, set())
+        rows = obtener_usuarios_por_ids(changed) if changed else []
+        if rows is None:
+            self.load_users_data()
+            return
+        # Los que ya no se encuentran se borraron después de publicar el evento
+        removed = cambios.get(eventos.BAJA, set()) | (changed - {row[0] for row in rows})
+        for user_id in removed:
+            pos = self._positions.pop(user_id, None)
+            if pos is None:
+                continue
+            self.orden.eliminar(pos)
+            self.users_data[pos] = None
+            if self.fuzzy_index:
+                self.fuzzy_index.quitar(pos)
+        for row in rows:
+            pos = self._positions.get(row[0])
+            if pos is None:
+                pos = self._positions[row[0]] = len(self.users_data)
+                self.users_data.append(row)
+                self.orden.agregar(pos, row)
+            else:
+                self.users_data[pos] = row
+                self.orden.actualizar(pos, row)
+            if self.fuzzy_index:
+                self.fuzzy_index.quitar(pos)
+                self.fuzzy_index.agregar(row[5], pos)
+        # Si el índice de erratas aún se está construyendo, se rehará al terminar
+        self._data_version += 1
+        self.filter_users()
+        self._update_users_count()
 
     def filter_users(self, event=None):
         """Filtra la tabla de usuarios basándose en el Entry de búsqueda por Nombre o DNI."""
-        query = self.search_entry.get().strip().lower()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        query = normalizar(self.search_entry.get())
 
         if not query:
-            data_to_show = self.users_data
+            visible = None # Todas las filas
         else:
-            # Filtrar por Nombre (índice 1) o DNI (índice 2)
-            data_to_show = [
-                row for row in self.users_data
-                if query in row[1].lower() or query in row[2].lower()
+            # Filtrar por Nombre normalizado (índice 5) o DNI (índice 2)
+            visible = [
+                i for i, row in enumerate(self.users_data)
+                if row is not None and (query in row[5] or query in row[2].lower())
             ]
+            if not visible and len(query) >= FUZZY_MIN_QUERY_LENGTH and self.fuzzy_index:
+                # Sin coincidencias exactas: nombres con erratas, de menos a más erratas
+                matches = self.fuzzy_index.buscar(query, FUZZY_LIMIT, FUZZY_BUDGET_MS)
+                visible = [i for i, _ in matches]
+
+        if self.headings.column:
+            # Orden elegido en los encabezados: la permutación de la columna, limitada a las visibles
+            visible = self.orden.ordenar(self.headings.column, self.headings.descending, visible)
+        elif visible is None:
+            visible = [i for i, row in enumerate(self.users_data) if row is not None]
 
-        for row in data_to_show:
-            loans_count = row[4]
-            self.tree.insert('', 'end', 
-                             values=(row[1], row[2], row[3], loans_count),
-                             tags=("active" if loans_count > 0 else "inactive",))
+        # Relleno por tandas: la tabla responde mientras se insertan las filas
+        self.renderer.start([self.users_data[i] for i in visible])
+
+    def _insert_row(self, row):
+        """Inserta una fila en la tabla (la llama el relleno progresivo)."""
+        loans_count = row[4]
+        if row[6]:
+            tag = "baja" # Marcado por la sincronización del padrón: solo puede devolver
+        else:
+            tag = "active" if loans_count > 0 else "inactive"
+        # Insertar los datos visibles (Nombre, DNI, Teléfono, Libros Prestados, Padrón)
+        self.tree.insert('', 'end', 
+                         values=(row[1], row[2], row[3], loans_count, "Baja" if row[6] else "Sí"),
+                         tags=(tag,))
 
 
     def on_double_click(self, event):
@@ -172,7 +280,7 @@ class UsuariosView(ctk.CTkFrame):
         selected_dni = self.tree.item(item_id, 'values')[1]
         
         # Buscar los datos completos del usuario usando el DNI
-        user_data = next((row for row in self.users_data if row[2] == selected_dni), None)
+        user_data = next((row for row in self.users_data if row is not None and row[2] == selected_dni), None)
 
         if user_data:
             self.open_user_form(user_data)
@@ -180,6 +288,22 @@ class UsuariosView(ctk.CTkFrame):
             CustomMessage(self.master, "Error de Datos", "No se encontraron los datos completos del usuario.", is_error=True)
 
 
+    def show_user(self, usuario_id):
+        """Abre la ficha de un lector por su id (desde la búsqueda global)."""
+        pos = self._positions.get(usuario_id)
+        user_data = self.users_data[pos] if pos is not None else None
+        if not user_data:
+            CustomMessage(self.master, "Error de Datos", "El lector ya no existe.", is_error=True)
+            return
+        self.open_user_form(user_data)
+
     def open_user_form(self, user_data=None):
         """Abre la ventana Toplevel FormUsuario en modo Agregar o Editar."""
-        FormUsuario(self.master, self.load_users_data, user_data)
\ No newline at end of file
+        # Los cambios guardados llegan a la tabla por los eventos de datos (_on_users_changed)
+        FormUsuario(self.master, None, user_data)
+
+    def destroy(self):
+        """Detiene el relleno de la tabla y la escucha de cambios antes de cerrar la vista."""
+        self.changes.cancel()
+        self.renderer.cancel()
+        super().destroy()
@@ -0,0 +1,231 @@
+import customtkinter as ctk
+from tkinter import ttk
+import datetime
+from threading import Lock
+from db.vencimientos import motor_vencidos, obtener_vencidos_por_usuario
+from db.multas import calcular_multas, obtener_multas_abiertas, obtener_multas_por_usuario, formatear_importe
+from ui.widgets.encabezados import SortableHeadings
+from utils.ordenacion import OrdenColumnas, clave_texto, clave_valor
+from utils.tareas import ejecutar_en_segundo_plano
+
+# Claves de ordenación de las columnas de cada tabla
+# Préstamos: (prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_vencimiento, dias_retraso, multa_centimos)
+LOAN_SORT_KEYS = {
+    "ID": lambda row: clave_valor(row[0]),
+    "Título del Libro": lambda row: clave_texto(row[1]),
+    "Usuario": lambda row: clave_texto(row[2]),
+    "DNI": lambda row: clave_texto(row[3]),
+    "Vencimiento": lambda row: clave_valor(row[4]),
+    "Días de Retraso": lambda row: clave_valor(row[5]),
+    "Multa": lambda row: clave_valor(row[6]),
+}
+# Lectores: (nombre, dni, prestamos_vencidos, multa_abierta_centimos)
+READER_SORT_KEYS = {
+    "Usuario": lambda row: clave_texto(row[0]),
+    "DNI": lambda row: clave_texto(row[1]),
+    "Vencidos": lambda row: clave_valor(row[2]),
+    "Multa": lambda row: clave_valor(row[3]),
+}
+
+# El motor de vencidos es compartido: dos cargas a la vez (p. ej. al cambiar de pestaña) no deben solaparse
+_lock_carga = Lock()
+
+def cargar_vencidos(today):
+    """
+    Actualiza los vencidos y recalcula las multas (escritura en lote); se ejecuta en segundo plano.
+    Retorna (filas_vencidas, multas_abiertas, multas_por_usuario, vencidos_por_usuario).
+    """
+    with _lock_carga:
+        motor_vencidos.actualizar(today)
+        calcular_multas(today) # Recalcula en lote las multas de los préstamos abiertos
+        return motor_vencidos.filas(), obtener_multas_abiertas(), obtener_multas_por_usuario(), \
+            obtener_vencidos_por_usuario(today)
+
+class VencidosView(ctk.CTkFrame):
+    """Vista de préstamos vencidos y de lectores con préstamos vencidos."""
+    def __init__(self, master):
+        super().__init__(master, fg_color="transparent")
+        self.grid_columnconfigure(0, weight=3) # Tabla de préstamos vencidos
+        self.grid_columnconfigure(1, weight=1) # Tabla de vencidos por lector
+        self.grid_rowconfigure(1, weight=1)
+
+        self._refresh_job = None
+        self.loan_order = OrdenColumnas(LOAN_SORT_KEYS) # Permutaciones por columna sobre los id de préstamo
+        self.reader_order = OrdenColumnas(READER_SORT_KEYS) # Ídem sobre los id de lector
+        self._create_styles()
+        self._create_header_frame()
+        self._create_loans_table()
+        self._create_readers_table()
+
+        self.refresh()
+
+    def _create_styles(self):
+        """Estilos personalizados para las tablas Treeview."""
+        style = ttk.Style()
+        style.theme_use("default")
+
+        # Estilo para los encabezados de Vencidos (Rojo)
+        style.configure("Vencidos.Heading",
+                        font=('Arial', 12, 'bold'),
+                        background="#EF4444",
+                        foreground="white",
+                        padding=5)
+
+        style.configure("Vencidos.Treeview",
+                        font=('Arial', 10),
+                        rowheight=25)
+
+        style.map("Vencidos.Treeview",
+                  background=[('selected', '#EF4444')],
+                  foreground=[('selected', 'white')])
+
+    def _create_header_frame(self):
+        """Crea el encabezado con el contador de vencidos y la hora de actualización."""
+        header_frame = ctk.CTkFrame(self, fg_color="transparent")
+        header_frame.grid(row=0, column=0, columnspan=2, padx=20, pady=(20, 10), sticky="ew")
+        header_frame.grid_columnconfigure(0, weight=1)
+
+        self.overdue_count_label = ctk.CTkLabel(
+            header_frame,
+            text="Préstamos Vencidos: 0",
+            font=ctk.CTkFont(size=18, weight="bold"),
+            text_color="#EF4444"
+        )
+        self.overdue_count_label.grid(row=0, column=0, sticky="w")
+
+        self.updated_label = ctk.CTkLabel(header_frame, text="", text_color="gray")
+        self.updated_label.grid(row=0, column=1, sticky="e")
+
+    def _create_loans_table(self):
+        """Crea la tabla de préstamos vencidos."""
+        table_frame = ctk.CTkFrame(self, fg_color="transparent")
+        table_frame.grid(row=1, column=0, padx=(20, 10), pady=(0, 20), sticky="nsew")
+        table_frame.grid_columnconfigure(0, weight=1)
+        table_frame.grid_rowconfigure(0, weight=1)
+
+        columns = ("ID", "Título del Libro", "Usuario", "DNI", "Vencimiento", "Días de Retraso", "Multa")
+        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", style="Vencidos.Treeview")
+
+        self.tree.heading("ID", text="ID Préstamo", anchor="center")
+        self.tree.heading("Título del Libro", text="Título del Libro", anchor="w")
+        self.tree.heading("Usuario", text="Usuario", anchor="w")
+        self.tree.heading("DNI", text="DNI Usuario", anchor="center")
+        self.tree.heading("Vencimiento", text="Vencimiento", anchor="center")
+        self.tree.heading("Días de Retraso", text="Días de Retraso", anchor="center")
+        self.tree.heading("Multa", text="Multa", anchor="center")
+
+        self.tree.column("ID", width=80, anchor="center")
+        self.tree.column("Título del Libro", width=220, anchor="w")
+        self.tree.column("Usuario", width=160, anchor="w")
+        self.tree.column("DNI", width=110, anchor="center")
+        self.tree.column("Vencimiento", width=110, anchor="center")
+        self.tree.column("Días de Retraso", width=110, anchor="center")
+        self.tree.column("Multa", width=80, anchor="center")
+
+        scrollbar = ctk.CTkScrollbar(table_frame, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+
+        # Colores por gravedad del retraso
+        self.tree.tag_configure("leve", foreground="#F59E0B")
+        self.tree.tag_configure("grave", foreground="#EF4444")
+
+        # Ordenación al pulsar los encabezados
+        self.loan_headings = SortableHeadings(self.tree, self.render_loans)
+
+    def _create_readers_table(self):
+        """Crea la tabla de lectores con préstamos vencidos."""
+        table_frame = ctk.CTkFrame(self, fg_color="transparent")
+        table_frame.grid(row=1, column=1, padx=(10, 20), pady=(0, 20), sticky="nsew")
+        table_frame.grid_columnconfigure(0, weight=1)
+        table_frame.grid_rowconfigure(0, weight=1)
+
+        columns = ("Usuario", "DNI", "Vencidos", "Multa")
+        self.readers_tree = ttk.Treeview(table_frame, columns=columns, show="headings", style="Vencidos.Treeview")
+
+        self.readers_tree.heading("Usuario", text="Usuario", anchor="w")
+        self.readers_tree.heading("DNI", text="DNI", anchor="center")
+        self.readers_tree.heading("Vencidos", text="Vencidos", anchor="center")
+        self.readers_tree.heading("Multa", text="Multa", anchor="center")
+
+        self.readers_tree.column("Usuario", width=160, anchor="w")
+        self.readers_tree.column("DNI", width=100, anchor="center")
+        self.readers_tree.column("Vencidos", width=70, anchor="center")
+        self.readers_tree.column("Multa", width=70, anchor="center")
+
+        scrollbar = ctk.CTkScrollbar(table_frame, command=self.readers_tree.yview)
+        self.readers_tree.configure(yscrollcommand=scrollbar.set)
+
+        self.readers_tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+
+        # Ordenación al pulsar los encabezados
+        self.reader_headings = SortableHeadings(self.readers_tree, self.render_readers)
+
+    def refresh(self):
+        """
+        Aplica los vencidos nuevos desde la última actualización y recalcula las multas en segundo
+        plano (el cálculo es una escritura sobre todo el libro de multas); pinta al terminar.
+        """
+        self.updated_label.configure(text="Actualizando...")
+        ejecutar_en_segundo_plano(self, cargar_vencidos, self._on_loaded, datetime.date.today())
+
+    def _on_loaded(self, result):
+        """Pinta los vencidos cargados y programa la siguiente actualización."""
+        self._schedule_next_refresh()
+        if result is None:
+            self.updated_label.configure(text="Error al actualizar los vencidos")
+            return
+        # rows: (prestamo_id, titulo, nombre_usuario, dni_usuario, fecha_prestamo, fecha_vencimiento, libro_id)
+        # fines: {prestamo_id: (dias_retraso, importe)}; reader_fines: {usuario_id: (abierto, total)}
+        # readers: (usuario_id, nombre, dni, prestamos_vencidos)
+        rows, fines, reader_fines, readers = result
+
+        # Los días de retraso son los del libro de multas (sin festivos), los mismos que dan la multa;
+        # sin multa (todo el retraso cae en festivos) son 0
+        self.loan_order.construir(
+            (row[0], (row[0], row[1], row[2], row[3], row[5], *fines.get(row[0], (0, None))))
+            for row in rows
+        )
+        self.render_loans()
+
+        self.reader_order.construir(
+            (row[0], (row[1], row[2], row[3], reader_fines.get(row[0], (0, 0))[0]))
+            for row in readers
+        )
+        self.render_readers()
+
+        self.overdue_count_label.configure(text=f"Préstamos Vencidos: {len(rows)}")
+        self.updated_label.configure(text=f"Actualizado: {datetime.datetime.now():%d/%m/%Y %H:%M}")
+
+    def _ordered(self, order, headings):
+        """Filas de una tabla en el orden elegido en sus encabezados (o en el de la consulta)."""
+        if headings.column:
+            return [order.filas[id_] for id_ in order.ordenar(headings.column, headings.descending)]
+        return list(order.filas.values())
+
+    def render_loans(self):
+        """Pinta la tabla de préstamos vencidos."""
+        for i in self.tree.get_children():
+            self.tree.delete(i)
+        for row in self._ordered(self.loan_order, self.loan_headings):
+            self.tree.insert('', 'end', iid=row[0],
+                             values=(row[0], row[1], row[2], row[3], row[4], row[5], formatear_importe(row[6])),
+                             tags=("grave" if row[5] > 7 else "leve",))
+
+    def render_readers(self):
+        """Pinta la tabla de lectores con préstamos vencidos."""
+        for i in self.readers_tree.get_children():
+            self.readers_tree.delete(i)
+        for row in self._ordered(self.reader_order, self.reader_headings):
+            self.readers_tree.insert('', 'end', values=(row[0], row[1], row[2], formatear_importe(row[3])))
+
+    def _schedule_next_refresh(self):
+        """Programa la próxima actualización para justo después de medianoche."""
+        if self._refresh_job:
+            self.after_cancel(self._refresh_job)
+        now = datetime.datetime.now()
+        next_run = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time(0, 1))
+        self._refresh_job = self.after(int((next_run - now).total_seconds() * 1000), self.refresh)
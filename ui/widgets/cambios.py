@@ -0,0 +1,64 @@
+import threading
+from db import eventos
+
+# Sondeo de los eventos publicados desde otros hilos (ms)
+POLL_INTERVAL_MS = 500
+
+
+class DataChangeListener:
+    """
+    Entrega a una vista, en el hilo de Tk, los ids cambiados de un tema de db/eventos.py.
+    Los eventos se acumulan y se entregan juntos: on_change({accion: {ids}}) se llama una vez
+    por tanda (una importación o una devolución múltiple no repinta la tabla por cada registro).
+    Los publicados en el hilo de Tk (formularios, préstamos) se entregan en cuanto queda libre;
+    los de otros hilos, en el siguiente sondeo. cancel() cancela la suscripción (al destruir la vista).
+    """
+    def __init__(self, widget, tema, on_change):
+        self.widget = widget
+        self.tema = tema
+        self.on_change = on_change
+        self._pending = {} # accion -> {ids}
+        self._lock = threading.Lock()
+        self._scheduled = None
+        self._poll_job = None
+        eventos.suscribir(tema, self._collect)
+        self._poll()
+
+    def _collect(self, tema, accion, id_):
+        """Suscriptor de eventos: solo acumula el id (se llama desde el hilo que escribió)."""
+        with self._lock:
+            self._pending.setdefault(accion, set()).add(id_)
+        if threading.current_thread() is threading.main_thread() and self._scheduled is None:
+            self._scheduled = self.widget.after_idle(self._deliver)
+
+    def _poll(self):
+        self._deliver()
+        self._poll_job = self.widget.after(POLL_INTERVAL_MS, self._poll)
+
+    def _deliver(self):
+        """Entrega los cambios acumulados."""
+        self._scheduled = None
+        with self._lock:
+            cambios, self._pending = self._pending, {}
+        if not cambios:
+            return
+        # Un registro dado de alta y borrado en la misma tanda ya no hay que mostrarlo
+        bajas = cambios.get(eventos.BAJA, set())
+        for accion in (eventos.ALTA, eventos.CAMBIO):
+            if accion in cambios:
+                cambios[accion] -= bajas
+        try:
+            self.on_change(cambios)
+        except Exception as e:
+            print(f"Error al aplicar cambios de {self.tema} a la vista: {e}")
+
+    def cancel(self):
+        """Deja de recibir eventos y cancela las entregas programadas."""
+        eventos.cancelar_suscripcion(self.tema, self._collect)
+        for job in (self._scheduled, self._poll_job):
+            if job is not None:
+                try:
+                    self.widget.after_cancel(job)
+                except Exception:
+                    pass
+        self._scheduled = self._poll_job = None
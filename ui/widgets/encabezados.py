@@ -0,0 +1,34 @@
+_ARROWS = {False: " ▲", True: " ▼"}
+
+
+class SortableHeadings:
+    """
+    Encabezados de un Treeview que ordenan al pulsarlos: el primer clic ordena ascendente,
+    el siguiente sobre la misma columna invierte el sentido.
+    on_sort() se llama tras cada cambio; la vista lee 'column' y 'descending' al volver a pintar.
+    """
+    def __init__(self, tree, on_sort, columns=None, column=None, descending=False):
+        self.tree = tree
+        self.on_sort = on_sort
+        self.column = column
+        self.descending = descending
+        self._texts = {}
+        for name in columns or tree["columns"]:
+            self._texts[name] = tree.heading(name, "text")
+            tree.heading(name, command=lambda name=name: self.toggle(name))
+        self._update_arrows()
+
+    def toggle(self, column):
+        """Ordena por la columna pulsada o invierte el sentido si ya era la activa."""
+        if column == self.column:
+            self.descending = not self.descending
+        else:
+            self.column = column
+            self.descending = False
+        self._update_arrows()
+        self.on_sort()
+
+    def _update_arrows(self):
+        for name, text in self._texts.items():
+            arrow = _ARROWS[self.descending] if name == self.column else ""
+            self.tree.heading(name, text=text + arrow)
@@ -0,0 +1,72 @@
+import customtkinter as ctk
+import tkinter as tk
+
+class BarChart(ctk.CTkFrame):
+    """Gráfico de barras verticales dibujado en un Canvas (sin dependencias externas)."""
+    def __init__(self, master, title, bar_color="#3B82F6", height=200):
+        super().__init__(master)
+        self.bar_color = bar_color
+        self.items = [] # [(etiqueta, valor)]
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        ctk.CTkLabel(
+            self,
+            text=title,
+            font=ctk.CTkFont(size=14, weight="bold")
+        ).grid(row=0, column=0, padx=10, pady=(10, 0), sticky="w")
+
+        self.canvas = tk.Canvas(self, height=height, highlightthickness=0, bg=self._canvas_color())
+        self.canvas.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+        self.canvas.bind("<Configure>", lambda e: self._draw())
+
+        self.set_loading()
+
+    def _canvas_color(self):
+        """Color de fondo acorde al modo de apariencia de CustomTkinter."""
+        return "#2B2B2B" if ctk.get_appearance_mode() == "Dark" else "#F2F2F2"
+
+    def _text_color(self):
+        return "#DCE4EE" if ctk.get_appearance_mode() == "Dark" else "#1F2937"
+
+    def set_loading(self):
+        """Muestra el estado de carga mientras se calculan los datos."""
+        self.items = None
+        self._draw()
+
+    def set_data(self, items):
+        """Dibuja las barras: items = [(etiqueta, valor)]."""
+        self.items = list(items)
+        self._draw()
+
+    def _draw(self):
+        self.canvas.delete("all")
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            return # Aún no tiene tamaño
+
+        if self.items is None or not self.items:
+            text = "Cargando..." if self.items is None else "Sin datos"
+            self.canvas.create_text(width / 2, height / 2, text=text, fill="gray")
+            return
+
+        max_value = max(value for _, value in self.items) or 1
+        label_space = 18
+        value_space = 14
+        slot = width / len(self.items)
+        bar_width = max(slot * 0.7, 1)
+        usable = height - label_space - value_space
+
+        for i, (label, value) in enumerate(self.items):
+            x0 = i * slot + (slot - bar_width) / 2
+            bar_height = usable * value / max_value
+            y0 = height - label_space - bar_height
+            self.canvas.create_rectangle(x0, y0, x0 + bar_width, height - label_space,
+                                         fill=self.bar_color, width=0)
+            if value:
+                self.canvas.create_text(x0 + bar_width / 2, y0 - 2, text=str(value), anchor="s",
+                                        fill=self._text_color(), font=('Arial', 8))
+            self.canvas.create_text(x0 + bar_width / 2, height - label_space / 2, text=str(label),
+                                    fill=self._text_color(), font=('Arial', 8))
@@ -0,0 +1,110 @@
+import customtkinter as ctk
+import tkinter as tk
+from config import PALETTE_LIMIT, PALETTE_REFRESH_MS
+
+# Texto que acompaña a cada tipo de resultado en la lista
+_TYPE_LABELS = {
+    "accion": "Acción",
+    "libro": "Libro",
+    "usuario": "Lector",
+    "prestamo": "Préstamo",
+}
+_SECTION_NAMES = {"libro": "libros", "usuario": "lectores", "prestamo": "préstamos"}
+
+
+class PaletaComandos(ctk.CTkToplevel):
+    """
+    Paleta de búsqueda global (Ctrl+K): un campo y la lista de resultados de libros, lectores,
+    préstamos abiertos y acciones.
+    La búsqueda en el índice (db/busqueda_global.py) tarda menos de un fotograma, así que se hace
+    en cada pulsación en el hilo de Tk; mientras el índice sigue cargando se repite
+    periódicamente para que aparezcan los resultados de cada sección según está lista.
+    on_select(tipo, id) recibe el resultado elegido.
+    """
+    def __init__(self, master, index, on_select):
+        super().__init__(master)
+        self.title("Buscar")
+        self.geometry("600x360")
+        self.resizable(False, False)
+        self.attributes("-topmost", True)
+        self.index = index
+        self.on_select = on_select
+        self._results = []
+        self._refresh_job = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.entry = ctk.CTkEntry(self, placeholder_text="Buscar libros, lectores, préstamos o acciones...")
+        self.entry.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="ew")
+
+        self.listbox = tk.Listbox(self, activestyle="dotbox", font=('Arial', 11), exportselection=False)
+        self.listbox.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+
+        self.status_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(size=11), text_color="gray")
+        self.status_label.grid(row=2, column=0, padx=10, pady=(0, 5), sticky="w")
+
+        self.entry.bind("<KeyRelease>", self._on_key_release)
+        self.entry.bind("<Down>", lambda e: self._move(1))
+        self.entry.bind("<Up>", lambda e: self._move(-1))
+        self.entry.bind("<Return>", self._select)
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.listbox.bind("<Double-1>", self._select)
+
+        self.after(10, self.entry.focus_set)
+        self.search()
+
+    def _on_key_release(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape"):
+            return
+        self.search()
+
+    def search(self):
+        """Actualiza la lista con los resultados del texto actual."""
+        if self._refresh_job:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+
+        text = self.entry.get().strip()
+        self._results = self.index.buscar(text, PALETTE_LIMIT) if text else []
+        self.listbox.delete(0, 'end')
+        for tipo, _, label in self._results:
+            self.listbox.insert('end', f"{_TYPE_LABELS[tipo]}:  {label}")
+        if self._results:
+            self.listbox.selection_set(0)
+
+        if self.index.completo:
+            self.status_label.configure(text="")
+        else:
+            # Resultados incrementales: se repite la búsqueda mientras faltan secciones
+            pending = [name for section, name in _SECTION_NAMES.items() if section not in self.index.listos]
+            self.status_label.configure(text=f"Cargando {', '.join(pending)}...")
+            self._refresh_job = self.after(PALETTE_REFRESH_MS, self.search)
+
+    def _move(self, step):
+        """Mueve la selección de la lista con las flechas."""
+        if not self._results:
+            return "break"
+        current = self.listbox.curselection()
+        index = (current[0] + step) if current else 0
+        index = max(0, min(index, len(self._results) - 1))
+        self.listbox.selection_clear(0, 'end')
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return "break"
+
+    def _select(self, event=None):
+        """Cierra la paleta y entrega el resultado elegido."""
+        current = self.listbox.curselection()
+        if not current:
+            return "break"
+        tipo, id_, _ = self._results[current[0]]
+        self.destroy()
+        self.on_select(tipo, id_)
+        return "break"
+
+    def destroy(self):
+        if self._refresh_job:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
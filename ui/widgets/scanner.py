@@ -0,0 +1,48 @@
+class ScannerInput:
+    """
+    Detecta las lecturas de un lector de códigos de barras USB sobre campos de texto.
+    El lector "teclea" el código en ráfaga (pocos ms entre teclas) y termina con Enter.
+    Por cada tecla solo se registra su marca de tiempo; al llegar Enter, si toda la
+    secuencia fue una ráfaga, el código completo se entrega a on_scan(code, origin)
+    y se limpia el campo. Lo tecleado a mano (más lento) no se intercepta.
+    """
+    def __init__(self, on_scan, max_gap_ms=50, min_length=6):
+        self.on_scan = on_scan
+        self.max_gap_ms = max_gap_ms # Máximo tiempo entre teclas de una misma ráfaga
+        self.min_length = min_length # Longitud mínima de un código escaneado
+        self._count = 0 # Teclas consecutivas dentro de la ráfaga actual
+        self._last_time = None
+
+    def attach(self, entry, origin):
+        """Escucha las pulsaciones del campo; origin identifica el campo en on_scan."""
+        entry.bind("<Key>", self._on_key, add=True)
+        entry.bind("<Return>", lambda event: self._on_return(event, entry, origin), add=True)
+
+    def _on_key(self, event):
+        """Registra la tecla. Es el único trabajo que se hace por carácter."""
+        if not event.char or event.keysym == "Return":
+            return
+        if self._last_time is None or event.time - self._last_time > self.max_gap_ms:
+            self._count = 0 # Empieza una nueva secuencia
+        self._count += 1
+        self._last_time = event.time
+
+    def _on_return(self, event, entry, origin):
+        """Al recibir Enter, entrega el código si la secuencia fue una ráfaga de escáner."""
+        burst_length = self._count
+        is_burst = (
+            self._last_time is not None
+            and event.time - self._last_time <= self.max_gap_ms
+            and burst_length >= self.min_length
+        )
+        self._count = 0
+        self._last_time = None
+        if not is_burst:
+            return None # Entrada manual: que sigan los demás manejadores
+
+        # Si había texto tecleado a mano queda delante: solo cuentan los caracteres de la ráfaga
+        code = entry.get()[-burst_length:].strip()
+        entry.delete(0, 'end')
+        if code:
+            self.on_scan(code, origin)
+        return "break"
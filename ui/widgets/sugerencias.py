@@ -0,0 +1,120 @@
+import tkinter as tk
+from utils.tareas import ejecutar_en_segundo_plano
+
+# Teclas que no cambian el texto y no deben lanzar una búsqueda
+_NAVIGATION_KEYS = {"Up", "Down", "Return", "Escape", "Tab", "Left", "Right",
+                    "Shift_L", "Shift_R", "Control_L", "Control_R", "Alt_L", "Alt_R"}
+
+
+class Autocomplete:
+    """
+    Lista de sugerencias bajo un CTkEntry mientras se escribe.
+    La lista se coloca dentro de 'container' (por defecto la ventana), de modo que se
+    destruye junto con él.
+    La búsqueda (search_fn(texto) -> [(etiqueta, valor)]) se ejecuta fuera del hilo de Tk;
+    las pulsaciones se agrupan (debounce) para que una ráfaga de escáner lance una sola consulta
+    y se descartan las respuestas que llegan tarde.
+    """
+    def __init__(self, entry, search_fn, on_select=None, container=None, debounce_ms=30, visible_rows=8):
+        self.entry = entry
+        self.container = container or entry.winfo_toplevel()
+        self.search_fn = search_fn
+        self.on_select = on_select
+        self.debounce_ms = debounce_ms
+        self.visible_rows = visible_rows
+
+        self._values = []
+        self._job = None
+        self._seq = 0 # Número de la última consulta lanzada
+
+        self.listbox = tk.Listbox(self.container, height=visible_rows, activestyle="dotbox",
+                                  font=('Arial', 10), exportselection=False)
+        self.listbox.bind("<Button-1>", self._click)
+
+        entry.bind("<KeyRelease>", self._on_key_release, add=True)
+        entry.bind("<Down>", lambda e: self._move(1), add=True)
+        entry.bind("<Up>", lambda e: self._move(-1), add=True)
+        entry.bind("<Return>", self._select, add=True)
+        entry.bind("<Escape>", lambda e: self.hide(), add=True)
+        entry.bind("<FocusOut>", lambda e: self.entry.after(150, self.hide), add=True)
+
+    def _on_key_release(self, event):
+        """Reprograma la búsqueda; solo se ejecuta cuando se deja de teclear."""
+        if event.keysym in _NAVIGATION_KEYS:
+            return
+        if self._job:
+            self.entry.after_cancel(self._job)
+        self._job = self.entry.after(self.debounce_ms, self._search)
+
+    def _search(self):
+        """Lanza la consulta en segundo plano."""
+        self._job = None
+        text = self.entry.get().strip()
+        self._seq += 1
+        if not text:
+            self.hide()
+            return
+        seq = self._seq
+        ejecutar_en_segundo_plano(self.entry, self.search_fn,
+                                  lambda results: self._show(seq, results), text)
+
+    def _show(self, seq, results):
+        """Muestra las sugerencias si siguen correspondiendo al texto actual."""
+        if seq != self._seq:
+            return # Respuesta obsoleta: el usuario siguió escribiendo
+        if not results:
+            self.hide()
+            return
+
+        self._values = [value for _, value in results]
+        self.listbox.delete(0, 'end')
+        for label, _ in results:
+            self.listbox.insert('end', label)
+        self.listbox.configure(height=min(len(results), self.visible_rows))
+
+        # Posicionar la lista justo debajo del campo
+        x = self.entry.winfo_rootx() - self.container.winfo_rootx()
+        y = self.entry.winfo_rooty() - self.container.winfo_rooty() + self.entry.winfo_height()
+        self.listbox.place(x=x, y=y, width=max(self.entry.winfo_width(), 300))
+        self.listbox.lift()
+
+    def _move(self, step):
+        """Mueve la selección de la lista con las flechas."""
+        if not self.listbox.winfo_ismapped():
+            return
+        current = self.listbox.curselection()
+        index = (current[0] + step) if current else (0 if step > 0 else len(self._values) - 1)
+        index = max(0, min(index, len(self._values) - 1))
+        self.listbox.selection_clear(0, 'end')
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return "break"
+
+    def _click(self, event):
+        """Elige la sugerencia pulsada (antes de que el campo pierda el foco)."""
+        self.listbox.selection_clear(0, 'end')
+        self.listbox.selection_set(self.listbox.nearest(event.y))
+        return self._select()
+
+    def _select(self, event=None):
+        """Inserta el valor elegido en el campo."""
+        if not self.listbox.winfo_ismapped():
+            return None
+        current = self.listbox.curselection()
+        if not current:
+            return None
+        value = self._values[current[0]]
+        self.entry.delete(0, 'end')
+        self.entry.insert(0, value)
+        self.hide()
+        if self.on_select:
+            self.on_select(value)
+        return "break"
+
+    def hide(self):
+        """Oculta la lista e invalida las consultas pendientes."""
+        self._seq += 1
+        try:
+            self.listbox.place_forget()
+        except tk.TclError:
+            pass # La ventana ya fue destruida
@@ -0,0 +1,79 @@
+import time
+from config import RENDER_CHUNK_BUDGET_MS, RENDER_CHUNK_PAUSE_MS
+
+
+class ProgressiveRenderer:
+    """
+    Rellena un Treeview por tandas para que la ventana siga respondiendo con tablas grandes.
+    Cada tanda inserta filas hasta agotar RENDER_CHUNK_BUDGET_MS y programa la siguiente con
+    after(), dejando a Tk procesar entre tandas los clics, el desplazamiento y el redibujado.
+    Empezar un relleno nuevo cancela el anterior; cancel() lo detiene (p. ej. al destruir la vista).
+    insert_row(row) inserta una fila; progress_label (opcional) muestra el avance.
+    """
+    def __init__(self, tree, insert_row, progress_label=None):
+        self.tree = tree
+        self.insert_row = insert_row
+        self.progress_label = progress_label
+        self._rows = []
+        self._next = 0
+        self._job = None
+        self._on_done = None
+
+    @property
+    def running(self):
+        """Indica si quedan filas por insertar."""
+        return self._job is not None
+
+    def start(self, rows, on_done=None):
+        """Vacía la tabla y empieza a insertar 'rows' (lista) por tandas."""
+        self.cancel()
+        self.tree.delete(*self.tree.get_children())
+        self._rows = rows
+        self._next = 0
+        self._on_done = on_done
+        self._step()
+
+    def cancel(self):
+        """Detiene el relleno en curso (las filas ya insertadas se quedan)."""
+        if self._job is not None:
+            try:
+                self.tree.after_cancel(self._job)
+            except Exception:
+                pass # La tabla ya fue destruida
+            self._job = None
+        self._show_progress(done=True)
+
+    def _step(self):
+        """Inserta una tanda de filas y programa la siguiente."""
+        self._job = None
+        if not self.tree.winfo_exists():
+            return
+        deadline = time.perf_counter() + RENDER_CHUNK_BUDGET_MS / 1000
+        rows, total = self._rows, len(self._rows)
+        while self._next < total:
+            self.insert_row(rows[self._next])
+            self._next += 1
+            # Comprobar el reloj cada pocas filas: perf_counter() también cuesta
+            if self._next % 32 == 0 and time.perf_counter() > deadline:
+                break
+
+        if self._next < total:
+            self._show_progress()
+            self._job = self.tree.after(RENDER_CHUNK_PAUSE_MS, self._step)
+            return
+
+        self._show_progress(done=True)
+        if self._on_done:
+            on_done, self._on_done = self._on_done, None
+            on_done()
+
+    def _show_progress(self, done=False):
+        if self.progress_label is None:
+            return
+        try:
+            if done:
+                self.progress_label.configure(text="")
+            else:
+                self.progress_label.configure(text=f"Cargando filas: {self._next:,} / {len(self._rows):,}".replace(",", "."))
+        except Exception:
+            pass # La etiqueta ya fue destruida
@@ -0,0 +1,78 @@
+"""
+    Medición del arranque de la aplicación (python main.py --profile-startup).
+    Cronometra cada fase del arranque (importaciones, inicialización de la base de datos, ventana
+    de login) y, mientras está activa, cada módulo importado por primera vez: tiempo total
+    (con los módulos que importa a su vez) y propio. El informe se imprime al mostrarse la
+    ventana de login.
+"""
+import builtins
+import sys
+import time
+from contextlib import contextmanager
+
+# Módulos que se listan en el informe (los más lentos por tiempo total)
+TOP_IMPORTACIONES = 25
+
+
+class MedidorArranque:
+    """Fases y tiempos de importación del arranque. Con activo=False no mide nada."""
+    def __init__(self, activo=False):
+        self.activo = activo
+        self.inicio = time.perf_counter()
+        self.fases = [] # (nombre, segundos)
+        self.importaciones = {} # módulo -> (total, propio)
+        self._pila = [] # Tiempo de los hijos de cada importación en curso
+        self._importar_original = None
+        if activo:
+            self._importar_original = builtins.__import__
+            builtins.__import__ = self._importar_medido
+
+    @contextmanager
+    def fase(self, nombre):
+        """Cronometra el bloque como una fase del arranque."""
+        if not self.activo:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nombre, time.perf_counter() - t0))
+
+    def _importar_medido(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Solo cuentan las importaciones que cargan módulos nuevos (las demás son una consulta a sys.modules)
+        modulos_antes = len(sys.modules)
+        t0 = time.perf_counter()
+        self._pila.append(0.0)
+        try:
+            return self._importar_original(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - t0
+            hijos = self._pila.pop()
+            if self._pila:
+                self._pila[-1] += total
+            if len(sys.modules) > modulos_antes:
+                nombre = name if level == 0 else f"{'.' * level}{name} ({(globals or {}).get('__name__', '?')})"
+                self.importaciones[nombre] = (total, total - hijos)
+
+    def detener(self):
+        """Deja de medir las importaciones."""
+        if self._importar_original is not None:
+            builtins.__import__ = self._importar_original
+            self._importar_original = None
+
+    def informe(self, hito):
+        """Texto del informe con el tiempo hasta 'hito', las fases y las importaciones más lentas."""
+        lineas = [f"Arranque: {hito} a los {(time.perf_counter() - self.inicio) * 1000:.0f} ms", "", "Fases:"]
+        lineas += [f"  {segundos * 1000:8.1f} ms  {nombre}" for nombre, segundos in self.fases]
+        lineas += ["", f"Importaciones más lentas (total / propio), {len(self.importaciones)} módulos nuevos:"]
+        lentas = sorted(self.importaciones.items(), key=lambda item: item[1][0], reverse=True)[:TOP_IMPORTACIONES]
+        lineas += [f"  {total * 1000:8.1f} / {propio * 1000:6.1f} ms  {nombre}" for nombre, (total, propio) in lentas]
+        return "\n".join(lineas)
+
+    def informar(self, hito):
+        """Imprime el informe y deja de medir (se llama al mostrarse la ventana de login)."""
+        if not self.activo:
+            return
+        self.detener()
+        print(self.informe(hito), flush=True)
@@ -0,0 +1,76 @@
+"""
+    Índices en memoria para sugerencias por prefijo (autocompletado).
+    Las claves se guardan ordenadas y cada consulta es una búsqueda binaria (bisect)
+    del rango de claves que empiezan por el prefijo: O(log n + N) por pulsación.
+"""
+from bisect import bisect_left
+from utils.normalizacion import normalizar
+
+# Carácter mayor que cualquier otro usado en las claves: cierra el rango del prefijo
+_FIN_RANGO = "\U0010ffff"
+
+
+class IndicePrefijos:
+    """
+    Índice ordenado de claves de texto. Cada entrada asocia una clave normalizada
+    (sin tildes ni mayúsculas, ver utils/normalizacion.py) a una etiqueta visible y al valor
+    que se inserta al elegirla.
+    """
+    def __init__(self, entradas=()):
+        """entradas: iterable de (clave, etiqueta, valor)."""
+        ordenadas = sorted((normalizar(clave), etiqueta, valor) for clave, etiqueta, valor in entradas if clave)
+        self.claves = [e[0] for e in ordenadas]
+        self.resultados = [(e[1], e[2]) for e in ordenadas]
+
+    def __len__(self):
+        return len(self.claves)
+
+    def buscar(self, prefijo, limite=10):
+        """Retorna hasta 'limite' (etiqueta, valor) cuyas claves empiezan por el prefijo."""
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+        inicio = bisect_left(self.claves, prefijo)
+        fin = bisect_left(self.claves, prefijo + _FIN_RANGO, inicio)
+        vistos = set()
+        encontrados = []
+        for etiqueta, valor in self.resultados[inicio:fin]:
+            if valor in vistos:
+                continue # Un mismo registro puede estar indexado por varias palabras
+            vistos.add(valor)
+            encontrados.append((etiqueta, valor))
+            if len(encontrados) >= limite:
+                break
+        return encontrados
+
+
+def indice_por_palabras(registros):
+    """
+    Crea un índice donde cada registro se encuentra por su texto completo y por
+    cada una de sus palabras (p. ej. "García" encuentra a "Ana García López").
+    registros: iterable de (texto, etiqueta, valor).
+    """
+    entradas = []
+    for texto, etiqueta, valor in registros:
+        if not texto:
+            continue
+        entradas.append((texto, etiqueta, valor))
+        palabras = texto.split()
+        for i in range(1, len(palabras)):
+            entradas.append((" ".join(palabras[i:]), etiqueta, valor))
+    return IndicePrefijos(entradas)
+
+
+def combinar_resultados(limite, *listas):
+    """Une varias listas de sugerencias sin repetir valores, respetando el límite."""
+    vistos = set()
+    combinados = []
+    for lista in listas:
+        for etiqueta, valor in lista:
+            if valor in vistos:
+                continue
+            vistos.add(valor)
+            combinados.append((etiqueta, valor))
+            if len(combinados) >= limite:
+                return combinados
+    return combinados
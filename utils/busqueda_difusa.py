@@ -0,0 +1,161 @@
+"""
+    Búsqueda tolerante a erratas (estilo SymSpell).
+    Para cada palabra del vocabulario se precalculan sus borrados (la palabra quitándole hasta
+    'distancia_max' letras, sobre un prefijo de longitud fija). Una consulta genera sus propios
+    borrados y solo compara, con distancia de edición acotada, las palabras que comparten alguno:
+    "cervantez" encuentra "cervantes" sin recorrer todo el vocabulario.
+    Los textos deben llegar ya normalizados (utils.normalizacion).
+"""
+import time
+import heapq
+from itertools import combinations
+
+# Con palabras cortas una errata cambia demasiado: se exige coincidencia exacta o casi
+_LONGITUD_DISTANCIA_1 = 3
+_LONGITUD_DISTANCIA_2 = 6
+
+# Registros puntuados entre dos comprobaciones del tiempo restante
+_TANDA_PUNTUACION = 512
+# Coste estimado (s) de elegir los mejores resultados por cada registro puntuado: se reserva
+# del presupuesto para que la selección final tampoco lo supere
+_SEGUNDOS_POR_PUNTUACION = 0.3e-6
+
+
+def distancia_maxima(palabra, distancia_max):
+    """Erratas admitidas para una palabra según su longitud."""
+    if len(palabra) < _LONGITUD_DISTANCIA_1:
+        return 0
+    if len(palabra) < _LONGITUD_DISTANCIA_2:
+        return min(1, distancia_max)
+    return distancia_max
+
+def distancia_edicion(a, b, maximo):
+    """
+    Distancia de Damerau-Levenshtein (transposiciones adyacentes) entre a y b,
+    o maximo + 1 en cuanto se sabe que la supera.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        minimo_fila = i
+        for j in range(1, len(b) + 1):
+            coste = 0 if a[i - 1] == b[j - 1] else 1
+            valor = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + coste)
+            if anterior2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                valor = min(valor, anterior2[j - 2] + 1)
+            actual[j] = valor
+            minimo_fila = min(minimo_fila, valor)
+        if minimo_fila > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return anterior[-1]
+
+def _borrados(palabra, distancia):
+    """La palabra y todas las variantes con hasta 'distancia' letras quitadas."""
+    resultado = {palabra}
+    for n in range(1, min(distancia, len(palabra)) + 1):
+        for quitar in combinations(range(len(palabra)), n):
+            resultado.add("".join(c for i, c in enumerate(palabra) if i not in quitar))
+    return resultado
+
+
+class IndiceDifuso:
+    """
+    Diccionario de borrados sobre las palabras de un conjunto de registros.
+    registros: iterable de (texto_normalizado, valor).
+    Las altas y ediciones se añaden con agregar() y las bajas se marcan con quitar(), sin
+    reconstruir el vocabulario (las palabras que ya no usa ningún registro solo cuestan memoria).
+    """
+    def __init__(self, registros, distancia_max=2, longitud_prefijo=7):
+        self.distancia_max = distancia_max
+        self.longitud_prefijo = longitud_prefijo
+        self.valores = [] # Posición de registro -> valor
+        self.palabras = {} # palabra -> [posiciones de registro]
+        self.borrados = {} # borrado del prefijo -> {palabras}
+        self._posiciones = {} # valor -> posiciones de registro vigentes
+        self._quitadas = set() # Posiciones de registros quitados
+        for texto, valor in registros:
+            self.agregar(texto, valor)
+
+    def __len__(self):
+        return len(self.valores) - len(self._quitadas)
+
+    def agregar(self, texto, valor):
+        """Añade un registro (para editar uno, quitar() su valor y volver a agregarlo)."""
+        posicion = len(self.valores)
+        self.valores.append(valor)
+        self._posiciones.setdefault(valor, []).append(posicion)
+        for palabra in set(texto.split()):
+            registros_palabra = self.palabras.get(palabra)
+            if registros_palabra is None:
+                self.palabras[palabra] = registros_palabra = []
+                self._indexar(palabra)
+            registros_palabra.append(posicion)
+
+    def quitar(self, valor):
+        """Deja de devolver los registros con ese valor."""
+        self._quitadas.update(self._posiciones.pop(valor, ()))
+
+    def _indexar(self, palabra):
+        prefijo = palabra[:self.longitud_prefijo]
+        for borrado in _borrados(prefijo, distancia_maxima(palabra, self.distancia_max)):
+            self.borrados.setdefault(borrado, set()).add(palabra)
+
+    def _palabras_parecidas(self, palabra, fin):
+        """{palabra del vocabulario: distancia} a distancia admitida de 'palabra'."""
+        maximo = distancia_maxima(palabra, self.distancia_max)
+        prefijo = palabra[:self.longitud_prefijo]
+        encontradas = {}
+        for borrado in _borrados(prefijo, maximo):
+            for candidata in self.borrados.get(borrado, ()):
+                if candidata in encontradas:
+                    continue
+                distancia = distancia_edicion(palabra, candidata, maximo)
+                if distancia <= maximo:
+                    encontradas[candidata] = distancia
+                if time.perf_counter() > fin:
+                    return encontradas
+        return encontradas
+
+    def buscar(self, consulta, limite=50, presupuesto_ms=50):
+        """
+        Registros cuyas palabras se parecen a todas las de la consulta (ya normalizada).
+        Retorna [(valor, erratas)] ordenado de menos a más erratas, hasta 'limite'.
+        Si se agota 'presupuesto_ms', retorna lo encontrado hasta entonces.
+        """
+        fin = time.perf_counter() + presupuesto_ms / 1000
+        puntuaciones = None # posición de registro -> erratas acumuladas
+        for palabra in consulta.split():
+            mejores = {}
+            agotado = False
+            for candidata, distancia in self._palabras_parecidas(palabra, fin).items():
+                posiciones = self.palabras[candidata]
+                # Las palabras frecuentes están en muchísimos registros: se comprueba el tiempo por tandas
+                for inicio in range(0, len(posiciones), _TANDA_PUNTUACION):
+                    for posicion in posiciones[inicio:inicio + _TANDA_PUNTUACION]:
+                        if posicion in self._quitadas:
+                            continue
+                        if puntuaciones is None:
+                            erratas = distancia
+                        elif posicion in puntuaciones:
+                            erratas = puntuaciones[posicion] + distancia
+                        else:
+                            continue # Todas las palabras de la consulta deben aparecer (con o sin erratas)
+                        if erratas < mejores.get(posicion, erratas + 1):
+                            mejores[posicion] = erratas
+                    if time.perf_counter() + len(mejores) * _SEGUNDOS_POR_PUNTUACION > fin:
+                        agotado = True
+                        break
+                if agotado:
+                    break
+            puntuaciones = mejores
+            if agotado or not puntuaciones or time.perf_counter() > fin:
+                break
+        if not puntuaciones:
+            return []
+        # Solo los 'limite' mejores (ordenar todos costaría más que la propia búsqueda)
+        ordenadas = heapq.nsmallest(limite, puntuaciones.items(), key=lambda item: (item[1], item[0]))
+        return [(self.valores[posicion], erratas) for posicion, erratas in ordenadas]
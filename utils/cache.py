@@ -0,0 +1,38 @@
+"""
+    Caché en memoria con caducidad (TTL), segura entre hilos.
+"""
+import time
+from threading import Lock
+
+
+class CacheTTL:
+    """Guarda valores durante 'ttl' segundos desde que se almacenan."""
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._datos = {} # clave -> (instante_de_caducidad, valor)
+        self._lock = Lock()
+
+    def obtener(self, clave, defecto=None):
+        """Retorna el valor si existe y no ha caducado; si no, 'defecto'."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return defecto
+            caduca, valor = entrada
+            if time.monotonic() >= caduca:
+                del self._datos[clave]
+                return defecto
+            return valor
+
+    def guardar(self, clave, valor):
+        """Almacena un valor con la caducidad configurada."""
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+
+    def invalidar(self, clave=None):
+        """Elimina una clave, o todas si no se indica ninguna."""
+        with self._lock:
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
@@ -0,0 +1,116 @@
+"""
+    Índice de facetas en memoria con mapas de bits.
+    Cada valor de cada faceta (categoría, autor, disponibilidad...) tiene un entero de Python
+    usado como conjunto de bits: el bit i está a 1 si la fila i del catálogo tiene ese valor.
+    Los filtros se combinan con OR dentro de una faceta y AND entre facetas, y los conteos
+    son int.bit_count(): operaciones sobre enteros, sin recorrer las filas.
+"""
+
+
+def mascara(posiciones, total=0):
+    """Conjunto de bits con las posiciones indicadas."""
+    posiciones = list(posiciones)
+    if not posiciones:
+        return 0
+    bits = bytearray((max(max(posiciones) + 1, total) + 7) // 8)
+    for posicion in posiciones:
+        bits[posicion >> 3] |= 1 << (posicion & 7)
+    return int.from_bytes(bits, "little")
+
+def posiciones(bits):
+    """Posiciones a 1 de un conjunto de bits, en orden creciente."""
+    return [i for i, bit in enumerate(bin(bits)[:1:-1]) if bit == "1"]
+
+
+class IndiceFacetas:
+    """
+    Conjuntos de bits por (faceta, valor) sobre las posiciones de una lista de filas.
+    extractores: {faceta: función(fila) -> valor}.
+    """
+    def __init__(self, extractores):
+        self.extractores = extractores
+        self.filas = []
+        self.bits = {faceta: {} for faceta in extractores} # faceta -> {valor: bits}
+        self.vivas = 0 # Filas que no se han eliminado
+
+    def construir(self, filas):
+        """Crea el índice desde cero para la lista de filas."""
+        self.filas = list(filas)
+        for faceta, extractor in self.extractores.items():
+            por_valor = {}
+            for i, fila in enumerate(self.filas):
+                por_valor.setdefault(extractor(fila), []).append(i)
+            self.bits[faceta] = {valor: mascara(pos, len(self.filas)) for valor, pos in por_valor.items()}
+        self.vivas = (1 << len(self.filas)) - 1
+
+    def agregar(self, fila):
+        """Añade una fila al final. Retorna su posición."""
+        posicion = len(self.filas)
+        self.filas.append(fila)
+        self._marcar(posicion, fila)
+        self.vivas |= 1 << posicion
+        return posicion
+
+    def actualizar(self, posicion, fila):
+        """Sustituye la fila de una posición (edición o cambio de disponibilidad)."""
+        self._desmarcar(posicion, self.filas[posicion])
+        self.filas[posicion] = fila
+        self._marcar(posicion, fila)
+
+    def eliminar(self, posicion):
+        """Quita una fila. Su posición queda vacía para no desplazar las demás."""
+        self._desmarcar(posicion, self.filas[posicion])
+        self.vivas &= ~(1 << posicion)
+
+    def _marcar(self, posicion, fila):
+        bit = 1 << posicion
+        for faceta, extractor in self.extractores.items():
+            valores = self.bits[faceta]
+            valor = extractor(fila)
+            valores[valor] = valores.get(valor, 0) | bit
+
+    def _desmarcar(self, posicion, fila):
+        bit = 1 << posicion
+        for faceta, extractor in self.extractores.items():
+            valores = self.bits[faceta]
+            valor = extractor(fila)
+            restantes = valores.get(valor, 0) & ~bit
+            if restantes:
+                valores[valor] = restantes
+            else:
+                valores.pop(valor, None)
+
+    def _bits_faceta(self, faceta, seleccionados):
+        """OR de los valores seleccionados de una faceta (todas las filas si no hay selección)."""
+        if not seleccionados:
+            return self.vivas
+        valores = self.bits[faceta]
+        bits = 0
+        for valor in seleccionados:
+            bits |= valores.get(valor, 0)
+        return bits
+
+    def filtrar(self, seleccion, base=None):
+        """
+        Filas que cumplen la selección {faceta: conjunto de valores} (OR dentro de cada
+        faceta, AND entre facetas) y están en 'base' (p. ej. el resultado de la búsqueda de texto).
+        Retorna un conjunto de bits.
+        """
+        bits = self.vivas if base is None else base & self.vivas
+        for faceta, seleccionados in seleccion.items():
+            if seleccionados:
+                bits &= self._bits_faceta(faceta, seleccionados)
+        return bits
+
+    def conteos(self, seleccion, base=None):
+        """
+        Número de filas por valor de cada faceta, aplicando la selección de las demás facetas
+        (así se ve cuántas filas añadiría marcar otro valor de la misma faceta).
+        Retorna {faceta: {valor: número}}.
+        """
+        resultado = {}
+        for faceta, valores in self.bits.items():
+            otras = {f: s for f, s in seleccion.items() if f != faceta}
+            bits = self.filtrar(otras, base)
+            resultado[faceta] = {valor: (bits & bits_valor).bit_count() for valor, bits_valor in valores.items()}
+        return resultado
@@ -0,0 +1,24 @@
+"""
+    Detección de inactividad de la interfaz.
+    Registra la última pulsación de teclado o ratón en toda la aplicación para que
+    los trabajos pesados (copias, mantenimiento) se lancen cuando nadie la está usando.
+"""
+import time
+
+EVENTOS_ACTIVIDAD = ("<KeyPress>", "<ButtonPress>", "<MouseWheel>")
+
+
+class MonitorInactividad:
+    """Mide el tiempo transcurrido desde la última interacción con la ventana raíz."""
+    def __init__(self, root):
+        self.ultima_actividad = time.monotonic()
+        for evento in EVENTOS_ACTIVIDAD:
+            # add="+" para no reemplazar otros enlaces globales
+            root.bind_all(evento, self._registrar, add="+")
+
+    def _registrar(self, event=None):
+        self.ultima_actividad = time.monotonic()
+
+    def segundos_inactivo(self):
+        """Segundos desde la última pulsación de teclado o ratón."""
+        return time.monotonic() - self.ultima_actividad
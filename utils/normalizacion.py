@@ -0,0 +1,20 @@
+"""
+    Normalización de texto para búsquedas.
+    Descompone los caracteres (NFKD) y quita las marcas diacríticas, pasa a minúsculas con
+    casefold() y sustituye la puntuación por espacios: "García-Márquez, Gabriel" y
+    "garcia marquez gabriel" dan la misma clave. Las claves normalizadas de títulos y nombres
+    se guardan en la base de datos junto a cada fila (columnas *_norm).
+"""
+import re
+import unicodedata
+
+_NO_ALFANUMERICO = re.compile(r"[^\w]+|_")
+
+
+def normalizar(texto):
+    """Clave de búsqueda de un texto ('' si es None)."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_marcas = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(_NO_ALFANUMERICO.sub(" ", sin_marcas.casefold()).split())
@@ -0,0 +1,120 @@
+"""
+    Ordenación de tablas por columna con permutaciones precalculadas.
+    Para cada columna se guarda, la primera vez que se ordena por ella, la lista de claves de
+    fila ordenada por el valor de la columna (una permutación de las filas). Ordenar o cambiar
+    de sentido no vuelve a comparar filas: basta recorrer la permutación (al derecho o al revés)
+    quedándose con las filas visibles según el filtro activo.
+    Las altas, cambios y bajas se aplican a las permutaciones ya construidas con búsqueda binaria.
+"""
+import locale
+import unicodedata
+from bisect import bisect_left
+
+_colacion = None # Función de colación: locale.strxfrm o, sin locale configurado, _sin_tildes
+
+# Si el filtro deja menos de 1/N de las filas, es más barato ordenar las visibles que recorrer la permutación
+_FRACCION_ORDENAR_VISIBLES = 16
+
+
+def _sin_tildes(texto):
+    """Clave sin tildes ni mayúsculas (más barata que utils.normalizacion, que también quita la puntuación)."""
+    return unicodedata.normalize("NFKD", texto.casefold()).encode("ascii", "ignore")
+
+def _funcion_colacion():
+    """strxfrm con el locale del sistema; si es C/POSIX, orden sin tildes ni mayúsculas."""
+    global _colacion
+    if _colacion is None:
+        try:
+            nombre = locale.setlocale(locale.LC_COLLATE, "")
+        except locale.Error:
+            nombre = "C"
+        if nombre in ("C", "POSIX") or nombre.startswith("C."):
+            _colacion = _sin_tildes
+        else:
+            _colacion = locale.strxfrm
+    return _colacion
+
+def clave_texto(texto):
+    """Clave de ordenación de un texto según las reglas del idioma."""
+    colacion = _funcion_colacion()
+    texto = texto or ""
+    # Desempate por el texto original para un orden total y estable
+    return (colacion(texto), texto)
+
+def clave_valor(valor):
+    """Clave de ordenación de un número o fecha; los vacíos (None) van al final."""
+    return (valor is None, valor if valor is not None else 0)
+
+
+class OrdenColumnas:
+    """
+    Permutaciones por columna sobre un conjunto de filas identificadas por una clave estable
+    (la posición de la fila en la caché de la vista o el id del registro).
+    claves: {columna: función(fila) -> clave de ordenación}.
+    """
+    def __init__(self, claves):
+        self.claves = claves
+        self.filas = {} # id -> fila
+        self._ordenadas = {} # columna -> [(clave, id)] ordenada
+        self._ids = {} # columna -> [id] en el mismo orden (para recorrerla rápido)
+
+    def construir(self, filas):
+        """Sustituye todas las filas. filas: iterable de (id, fila). Las permutaciones se calculan al usarlas."""
+        self.filas = dict(filas)
+        self._ordenadas.clear()
+        self._ids.clear()
+
+    def _permutacion(self, columna):
+        """Ids ordenados por la columna, construyendo la permutación si aún no existe."""
+        ids = self._ids.get(columna)
+        if ids is None:
+            clave = self.claves[columna]
+            ordenadas = sorted((clave(fila), id_) for id_, fila in self.filas.items())
+            self._ordenadas[columna] = ordenadas
+            self._ids[columna] = ids = [id_ for _, id_ in ordenadas]
+        return ids
+
+    def agregar(self, id_, fila):
+        """Añade una fila, o la sustituye si el id ya existe."""
+        if id_ in self.filas:
+            self.eliminar(id_)
+        self.filas[id_] = fila
+        for columna, ordenadas in self._ordenadas.items():
+            entrada = (self.claves[columna](fila), id_)
+            posicion = bisect_left(ordenadas, entrada)
+            ordenadas.insert(posicion, entrada)
+            self._ids[columna].insert(posicion, id_)
+
+    def actualizar(self, id_, fila):
+        """Sustituye una fila editada (p. ej. un cambio de disponibilidad)."""
+        self.agregar(id_, fila)
+
+    def eliminar(self, id_):
+        """Quita una fila."""
+        fila = self.filas.pop(id_, None)
+        if fila is None:
+            return
+        for columna, ordenadas in self._ordenadas.items():
+            entrada = (self.claves[columna](fila), id_)
+            posicion = bisect_left(ordenadas, entrada)
+            if posicion < len(ordenadas) and ordenadas[posicion] == entrada:
+                del ordenadas[posicion]
+                del self._ids[columna][posicion]
+
+    def ordenar(self, columna, descendente=False, visibles=None):
+        """
+        Ids ordenados por la columna. Con 'visibles' (iterable de ids que pasan el filtro)
+        solo se devuelven esos, sin volver a comparar filas.
+        """
+        ids = self._permutacion(columna)
+        if visibles is None:
+            return ids[::-1] if descendente else list(ids)
+        visibles = set(visibles)
+        if len(visibles) * _FRACCION_ORDENAR_VISIBLES < len(ids):
+            # Pocas filas visibles: se ordenan directamente por la clave de la columna
+            clave = self.claves[columna]
+            return sorted(visibles, key=lambda id_: (clave(self.filas[id_]), id_), reverse=descendente)
+        resultado = [id_ for id_ in ids if id_ in visibles]
+        if descendente:
+            resultado.reverse()
+        return resultado
@@ -0,0 +1,113 @@
+"""
+    Captura de perfiles de CPU (cProfile) y memoria (tracemalloc) sobre el proceso en vivo.
+    Permite perfilar la carga real sin reiniciar la aplicación bajo un profiler.
+"""
+import os
+import io
+import cProfile
+import pstats
+import tracemalloc
+import datetime
+
+from utils.path_utils import DATABASE_PATH
+
+# Carpeta donde se guardan las capturas (junto a la base de datos)
+PERFILES_DIR = os.path.join(os.path.dirname(DATABASE_PATH), "perfiles")
+
+# Número de funciones y sitios de asignación que se incluyen en los informes
+TOP_FUNCIONES = 60
+TOP_ASIGNACIONES = 40
+
+
+class PerfiladorEnVivo:
+    """
+    Inicia y detiene cProfile y tracemalloc sobre el proceso actual.
+    Nota: cProfile solo mide el hilo que lo activa (el hilo principal de Tk).
+    """
+    def __init__(self):
+        self.perfil = None
+        self.snapshot_inicial = None
+        self.inicio = None
+        self._tracemalloc_propio = False
+
+    @property
+    def activo(self):
+        """True si hay una captura en curso."""
+        return self.perfil is not None
+
+    def iniciar(self):
+        """Comienza la captura. No hace nada si ya hay una en curso."""
+        if self.activo:
+            return
+
+        # Solo paramos tracemalloc al final si lo hemos arrancado nosotros
+        self._tracemalloc_propio = not tracemalloc.is_tracing()
+        if self._tracemalloc_propio:
+            tracemalloc.start(25)
+        self.snapshot_inicial = tracemalloc.take_snapshot()
+
+        self.inicio = datetime.datetime.now()
+        self.perfil = cProfile.Profile()
+        self.perfil.enable()
+
+    def detener(self):
+        """
+        Detiene la captura y guarda los resultados.
+        Retorna la ruta de la carpeta generada o None si no había captura activa.
+        """
+        if not self.activo:
+            return None
+
+        self.perfil.disable()
+        snapshot_final = tracemalloc.take_snapshot()
+        memoria = tracemalloc.get_traced_memory()
+        if self._tracemalloc_propio:
+            tracemalloc.stop()
+
+        try:
+            return self._guardar(self.perfil, self.snapshot_inicial, snapshot_final, memoria)
+        finally:
+            self.perfil = None
+            self.snapshot_inicial = None
+            self._tracemalloc_propio = False
+
+    def _guardar(self, perfil, snapshot_inicial, snapshot_final, memoria):
+        """Escribe pstats y los informes de texto en una carpeta con marca de tiempo."""
+        fin = datetime.datetime.now()
+        carpeta = os.path.join(PERFILES_DIR, self.inicio.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(carpeta, exist_ok=True)
+
+        # 1. Datos binarios de cProfile (abrir con pstats o snakeviz)
+        perfil.dump_stats(os.path.join(carpeta, "perfil.pstats"))
+
+        # 2. Resumen legible de CPU
+        buffer = io.StringIO()
+        stats = pstats.Stats(perfil, stream=buffer)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(TOP_FUNCIONES)
+        buffer.write("\n")
+        stats.sort_stats("tottime").print_stats(TOP_FUNCIONES)
+        with open(os.path.join(carpeta, "perfil.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Captura: {self.inicio:%d/%m/%Y %H:%M:%S} - {fin:%H:%M:%S} "
+                    f"({(fin - self.inicio).total_seconds():.1f} s)\n\n")
+            f.write(buffer.getvalue())
+
+        # 3. Sitios de asignación de memoria
+        filtros = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        snapshot_final = snapshot_final.filter_traces(filtros)
+        snapshot_inicial = snapshot_inicial.filter_traces(filtros)
+        with open(os.path.join(carpeta, "memoria.txt"), "w", encoding="utf-8") as f:
+            actual, pico = memoria
+            f.write(f"Memoria trazada: {actual / 1024:.1f} KiB (pico {pico / 1024:.1f} KiB)\n\n")
+
+            f.write(f"== Crecimiento durante la captura (top {TOP_ASIGNACIONES}) ==\n")
+            for diff in snapshot_final.compare_to(snapshot_inicial, "lineno")[:TOP_ASIGNACIONES]:
+                f.write(f"{diff}\n")
+
+            f.write(f"\n== Memoria retenida al final (top {TOP_ASIGNACIONES}) ==\n")
+            for stat in snapshot_final.statistics("lineno")[:TOP_ASIGNACIONES]:
+                f.write(f"{stat}\n")
+
+        return carpeta
@@ -0,0 +1,88 @@
+"""
+    Ejecución de tareas en segundo plano para la interfaz.
+    La función se ejecuta en un hilo y su resultado se entrega en el hilo principal de Tk
+    mediante sondeo con after(), ya que Tk no es seguro entre hilos.
+"""
+import queue
+from threading import Thread, Lock
+
+# Intervalo de sondeo de resultados (ms)
+POLL_INTERVAL_MS = 20
+
+
+def ejecutar_en_segundo_plano(widget, funcion, al_terminar=None, *args):
+    """
+    Ejecuta funcion(*args) en un hilo y llama a al_terminar(resultado) en el hilo de Tk.
+    Si la función lanza una excepción, al_terminar recibe None.
+    Si el widget se destruye antes de terminar, el resultado se descarta.
+    """
+    resultados = queue.Queue(maxsize=1)
+
+    def trabajo():
+        try:
+            resultados.put(funcion(*args))
+        except Exception as e:
+            print(f"Error en tarea en segundo plano: {e}")
+            resultados.put(None)
+
+    def sondear():
+        try:
+            resultado = resultados.get_nowait()
+        except queue.Empty:
+            _programar(widget, sondear)
+            return
+        if al_terminar:
+            al_terminar(resultado)
+
+    Thread(target=trabajo, daemon=True).start()
+    _programar(widget, sondear)
+
+
+def _programar(widget, callback):
+    """Programa el siguiente sondeo solo si el widget sigue existiendo."""
+    try:
+        if widget.winfo_exists():
+            widget.after(POLL_INTERVAL_MS, callback)
+    except Exception:
+        # El widget (o la aplicación) ya fue destruido
+        pass
+
+
+class TrabajoUnico:
+    """
+    Ejecuta una función en un hilo en segundo plano sin solapar dos ejecuciones.
+    Pensado para trabajos largos sin resultado para la interfaz (copias, mantenimiento).
+    """
+    def __init__(self, funcion, nombre):
+        self.funcion = funcion
+        self.nombre = nombre
+        self.ultimo_error = None
+        self._hilo = None
+        self._lock = Lock()
+
+    @property
+    def en_curso(self):
+        """True si hay una ejecución en marcha."""
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        """Lanza la función en segundo plano. Retorna False si ya había una ejecución en curso."""
+        with self._lock:
+            if self.en_curso:
+                return False
+            self._hilo = Thread(target=self._ejecutar, daemon=True)
+            self._hilo.start()
+            return True
+
+    def esperar(self):
+        """Espera a que termine la ejecución en curso (si la hay)."""
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _ejecutar(self):
+        try:
+            self.funcion()
+            self.ultimo_error = None
+        except Exception as e:
+            self.ultimo_error = e
+            print(f"Error en {self.nombre}: {e}")
@@ -25,4 +25,22 @@ def is_valid_dni(dni: str) -> bool:
     """
     return bool(dni.strip())
 
+def is_valid_isbn(code: str) -> bool:
+    """
+    Verifica si un código es un ISBN-10 o ISBN-13 (EAN 978/979) con dígito de control válido.
+    Se ignoran guiones y espacios.
+    """
+    code = code.replace("-", "").replace(" ", "").upper()
+
+    if len(code) == 13 and code.isdigit() and code[:3] in ("978", "979"):
+        total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(code[:12]))
+        return (10 - total % 10) % 10 == int(code[12])
+
+    if len(code) == 10 and code[:9].isdigit() and (code[9].isdigit() or code[9] == "X"):
+        check = 10 if code[9] == "X" else int(code[9])
+        total = sum(int(d) * (10 - i) for i, d in enumerate(code[:9])) + check
+        return total % 11 == 0
+
+    return False
+
 # Se pueden agregar más funciones de validación aquí (contraseñas, números de teléfono, etc.)
\ No newline at end of file